@@ -0,0 +1,41 @@
+import argparse
+import logging.config
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent / "src"))
+from nuforc.SETTINGS import LOGGING_CONFIG, ROLLUP_CUBE_PATH
+from nuforc.rollup import RollupCube
+
+logging.config.dictConfig(LOGGING_CONFIG)
+logger = logging.getLogger("root")
+
+
+def execute_rollup(input_paths, cube_path=ROLLUP_CUBE_PATH, period="month", by=None):
+    cube = RollupCube(cube_path)
+    for input_path in input_paths:
+        cube.add_file(input_path)
+    logger.info(f"{cube.n_events} events in {len(cube)} cells of {cube_path}.")
+    return cube.query(period=period, by=by)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Count event files into the rollup cube and print counts per period."
+    )
+    parser.add_argument(
+        "input_paths",
+        nargs="*",
+        help="Event files not counted by a crawl yet, e.g. historical data/raw_events/*.parquet.",
+    )
+    parser.add_argument("--cube-path", default=ROLLUP_CUBE_PATH)
+    parser.add_argument(
+        "--period", default="month", choices=["day", "week", "month", "year"]
+    )
+    parser.add_argument("--by", choices=["shape", "country", "state"])
+    args = parser.parse_args()
+    print(
+        execute_rollup(
+            args.input_paths, cube_path=args.cube_path, period=args.period, by=args.by
+        ).to_string()
+    )
@@ -0,0 +1,82 @@
+import argparse
+import logging.config
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent / "src"))
+from nuforc.SETTINGS import (
+    FLAP_CLUSTERS_PATH,
+    FLAP_DISTANCE_KM,
+    FLAP_MIN_EVENTS,
+    FLAP_TIME_WINDOW,
+    LOGGING_CONFIG,
+)
+from nuforc.clustering import ClusterStore, summarize_clusters
+from nuforc.visualisation import PLAYSET_COLUMNS, make_playset
+
+logging.config.dictConfig(LOGGING_CONFIG)
+logger = logging.getLogger("root")
+
+
+def execute_flap_detection(
+    events_path,
+    locations_path,
+    clusters_path=FLAP_CLUSTERS_PATH,
+    eps_km=FLAP_DISTANCE_KM,
+    eps_time=FLAP_TIME_WINDOW,
+    min_samples=FLAP_MIN_EVENTS,
+    output_path=None,
+):
+    """
+    Cluster the geocoded events of an event store with the stored clusters and join the cluster ids back onto them.
+    """
+    events = make_playset(
+        events_path, locations_path, columns=[*PLAYSET_COLUMNS, "hash"]
+    )
+    store = ClusterStore(
+        clusters_path, eps_km=eps_km, eps_time=eps_time, min_samples=min_samples
+    )
+    store.add_events(events)
+    events = store.join(events)
+    summary = summarize_clusters(events)
+    logger.info(
+        f"{int((events['cluster_id'] >= 0).sum())} of {len(events)} events in {len(summary)} flaps."
+    )
+    if output_path is not None:
+        events.to_parquet(output_path, index=False)
+    return events, summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Flag flaps, bursts of reports close in space and time, among geocoded events."
+    )
+    parser.add_argument(
+        "events_path",
+        help="Event store, e.g. data/raw_events/events_2023_08_20.parquet.",
+    )
+    parser.add_argument(
+        "locations_path", help="Its location table written by geocode.py."
+    )
+    parser.add_argument("--clusters-path", default=FLAP_CLUSTERS_PATH)
+    parser.add_argument("--distance-km", type=float, default=FLAP_DISTANCE_KM)
+    parser.add_argument(
+        "--time-window", default=FLAP_TIME_WINDOW, help="e.g. 12h or 2D."
+    )
+    parser.add_argument("--min-events", type=int, default=FLAP_MIN_EVENTS)
+    parser.add_argument(
+        "-o",
+        "--output-path",
+        help="Parquet file of the events with their `cluster_id`.",
+    )
+    args = parser.parse_args()
+    _, flaps = execute_flap_detection(
+        args.events_path,
+        args.locations_path,
+        clusters_path=args.clusters_path,
+        eps_km=args.distance_km,
+        eps_time=args.time_window,
+        min_samples=args.min_events,
+        output_path=args.output_path,
+    )
+    print(flaps.head(20).to_string())
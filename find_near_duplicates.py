@@ -0,0 +1,60 @@
+import argparse
+import logging.config
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent / "src"))
+from nuforc.SETTINGS import (
+    LOGGING_CONFIG,
+    NEAR_DUPLICATE_THRESHOLD,
+    NEAR_DUPLICATES_DIR,
+)
+from nuforc.near_duplicates import NearDuplicateIndex
+
+logging.config.dictConfig(LOGGING_CONFIG)
+logger = logging.getLogger("root")
+
+
+def execute_near_duplicate_detection(
+    input_paths,
+    signatures_dir=NEAR_DUPLICATES_DIR,
+    threshold=NEAR_DUPLICATE_THRESHOLD,
+    output_path=None,
+):
+    index = NearDuplicateIndex(signatures_dir, threshold=threshold)
+    for input_path in input_paths:
+        pairs = index.add_file(input_path)
+        logger.info(
+            f"{len(pairs)} near-duplicate pairs among new events of {input_path}."
+        )
+    clusters = index.clusters()
+    logger.info(
+        f"{len(clusters)} of {len(index)} events in {clusters['cluster_id'].nunique()} near-duplicate clusters."
+    )
+    if output_path is not None:
+        clusters.to_csv(output_path, index=False)
+    return clusters
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sign new events and cluster near-duplicate reports by description."
+    )
+    parser.add_argument(
+        "input_paths", nargs="*", help="Event files, e.g. data/raw_events/*.parquet."
+    )
+    parser.add_argument("--signatures-dir", default=NEAR_DUPLICATES_DIR)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=NEAR_DUPLICATE_THRESHOLD,
+        help="Minimum estimated Jaccard similarity of description shingles.",
+    )
+    parser.add_argument("-o", "--output-path", default="near_duplicate_clusters.csv")
+    args = parser.parse_args()
+    execute_near_duplicate_detection(
+        args.input_paths,
+        signatures_dir=args.signatures_dir,
+        threshold=args.threshold,
+        output_path=args.output_path,
+    )
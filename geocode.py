@@ -1,26 +1,54 @@
 import logging.config
-import pickle
 from pathlib import Path
 
-import pandas as pd
-
 from src.nuforc import SETTINGS
-from src.nuforc.geocoding import NUFORCGeocoder
+from src.nuforc.event_io import (
+    LOCATION_COLUMNS,
+    read_event_frame,
+    write_location_table,
+)
+from src.nuforc.geocoding.nuforc_geocoder import NUFORCGeocoder
 
 logging.config.dictConfig(SETTINGS.LOGGING_CONFIG)
 logger = logging.getLogger("root")
 
 
-def execute_geocoding(events_filepath, geocoding_cache_filepath=None):
+def execute_geocoding(
+    events_filepath,
+    locations_filepath=None,
+    geocoding_cache_filepath=None,
+    gazetteer_filepath=None,
+):
+    """
+    Geocode the distinct locations of an event store into a location table, `locations_{date}.parquet` next to
+    `events_{date}.parquet` by default, joined back to events on `location_id` by `make_playset`.
+    """
     events_filepath = Path(events_filepath)
-    with open(events_filepath, "rb") as pickle_file:
-        data = pickle.load(pickle_file)
-    df = pd.DataFrame(data)
-    geocoder = NUFORCGeocoder(input=df)
+    if locations_filepath is None:
+        locations_filepath = events_filepath.with_name(
+            events_filepath.stem.replace("events", "locations", 1) + ".parquet"
+        )
+    locations = (
+        read_event_frame(events_filepath, columns=["location_id", *LOCATION_COLUMNS])
+        .drop_duplicates("location_id")
+        .astype({column: object for column in LOCATION_COLUMNS})
+        .reset_index(drop=True)
+    )
+    geocoder = NUFORCGeocoder(
+        input=locations, cache=geocoding_cache_filepath, gazetteer=gazetteer_filepath
+    )
     geocoder.run()
+    write_location_table(
+        geocoder.output.rename(columns={"raw_address": "address"}), locations_filepath
+    )
+    logger.info(
+        f"Geocoding finished: {geocoder.stats}. Locations saved @ {locations_filepath}"
+    )
 
 
 if __name__ == "__main__":
     execute_geocoding(
-        events_filepath=Path(SETTINGS.OUTPUT_FOLDER) / "events_2022_08_16.pkl"
+        events_filepath=Path(SETTINGS.OUTPUT_FOLDER) / "events_2022_08_16.parquet",
+        geocoding_cache_filepath=SETTINGS.GEOCODING_CACHE_PATH,
+        gazetteer_filepath=SETTINGS.GAZETTEER_PATH,
     )
@@ -0,0 +1,66 @@
+import argparse
+import logging.config
+import sys
+from pathlib import Path
+
+import geopandas as gpd
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent / "src"))
+from nuforc.SETTINGS import (
+    DASHBOARD_LAYERS_DIR,
+    DASHBOARD_MAX_ZOOM,
+    DASHBOARD_MIN_ZOOM,
+    DASHBOARD_OVERVIEW_CELL_SIZE,
+    LOGGING_CONFIG,
+)
+from nuforc.dashboard.data import write_dashboard_events
+from nuforc.visualisation import export_dashboard_layers
+
+logging.config.dictConfig(LOGGING_CONFIG)
+logger = logging.getLogger("root")
+
+
+def read_events(input_path, x="randomized_x", y="randomized_y"):
+    if Path(input_path).suffix in (".csv", ".parquet"):
+        df = (
+            pd.read_parquet(input_path)
+            if Path(input_path).suffix == ".parquet"
+            else pd.read_csv(input_path)
+        )
+        return gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df[x], df[y]), crs=4326)
+    return gpd.read_file(input_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pre-render dashboard tiles and the overview layer from located events."
+    )
+    parser.add_argument(
+        "input_path",
+        help="Events with coordinates: a CSV/Parquet file with x and y columns, or any file geopandas reads.",
+    )
+    parser.add_argument("-o", "--output-dir", default=DASHBOARD_LAYERS_DIR)
+    parser.add_argument("-x", default="randomized_x", help="Longitude column.")
+    parser.add_argument("-y", default="randomized_y", help="Latitude column.")
+    parser.add_argument("--min-zoom", type=int, default=DASHBOARD_MIN_ZOOM)
+    parser.add_argument("--max-zoom", type=int, default=DASHBOARD_MAX_ZOOM)
+    parser.add_argument("--cell-size", type=float, default=DASHBOARD_OVERVIEW_CELL_SIZE)
+    parser.add_argument("--time-column", default="occurred_time")
+    args = parser.parse_args()
+    events = read_events(args.input_path, x=args.x, y=args.y)
+    metadata = export_dashboard_layers(
+        events,
+        args.output_dir,
+        min_zoom=args.min_zoom,
+        max_zoom=args.max_zoom,
+        overview_cell_size=args.cell_size,
+    )
+    write_dashboard_events(
+        events,
+        Path(args.output_dir) / "events.parquet",
+        time_column=args.time_column,
+    )
+    logger.info(
+        f"{metadata['n_tiles']} tiles of {metadata['n_events']} events written to {args.output_dir}."
+    )
@@ -0,0 +1,51 @@
+import argparse
+import logging.config
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent / "src"))
+from nuforc.SETTINGS import LOGGING_CONFIG
+from nuforc.hash_index import HashIndex, merge_event_files
+
+logging.config.dictConfig(LOGGING_CONFIG)
+logger = logging.getLogger("root")
+
+
+def execute_merging(
+    input_paths, output_path=None, hash_index_path=None, chunksize=10000
+):
+    # Without a persistent index only duplicates among the input files are dropped.
+    hash_index = HashIndex(hash_index_path or ":memory:")
+    try:
+        n_read, n_kept = merge_event_files(
+            input_paths=input_paths,
+            hash_index=hash_index,
+            output_path=output_path,
+            chunksize=chunksize,
+        )
+    finally:
+        hash_index.close()
+    logger.info(f"{n_kept} of {n_read} events kept.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Merge raw event files, dropping repeated reports by content hash."
+    )
+    parser.add_argument(
+        "input_paths", nargs="+", help="Raw event CSV or Parquet files, oldest first."
+    )
+    parser.add_argument("-o", "--output-path", default=None)
+    parser.add_argument(
+        "--hash-index",
+        default=None,
+        help="Persistent hash index, e.g. data/hash_index.sqlite; reports already in it are dropped and new ones added.",
+    )
+    parser.add_argument("--chunksize", type=int, default=10000)
+    args = parser.parse_args()
+    execute_merging(
+        input_paths=args.input_paths,
+        output_path=args.output_path,
+        hash_index_path=args.hash_index,
+        chunksize=args.chunksize,
+    )
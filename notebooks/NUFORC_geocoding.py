@@ -15,22 +15,25 @@ from dateutil.parser import parse
 from geopy.extra.rate_limiter import RateLimiter
 from geopy.geocoders import Nominatim
 from tqdm.autonotebook import tqdm
-sys.path.append('..')
+
+sys.path.append("..")
 from IPython.display import display
 
 from src.nuforc import SETTINGS
 from src.nuforc.utility import *
 from src.nuforc.geocoding.geocoder import Geolocator
-from src.nuforc.geocoding.wrangling import replace_unparsed_with_none, join_columns
+from src.nuforc.geocoding.wrangling import (
+    replace_unparsed_with_none,
+    join_address_columns,
+)
 from datetime import date
 
-
 # In[ ]:
 
 
-df = pd.read_csv('nuforc.csv')
+df = pd.read_csv("nuforc.csv")
 df = replace_unparsed_with_none(df)
-df['address'] = df.apply(lambda row: join_columns(row['city'], row['state'], row['country']), axis=1)
+df["address"] = join_address_columns(df)
 display(df)
 
 
@@ -38,14 +41,18 @@ display(df)
 
 
 # Configure logging
-logging.basicConfig(filename="geolocation.log", level=logging.INFO,
-                    format="%(asctime)s - %(levelname)s - %(message)s")
+logging.basicConfig(
+    filename="geolocation.log",
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+)
 
 geolocator = Geolocator()
-geolocator.geolocate_addresses(df['address'].unique())
+geolocator.geolocate_addresses(df["address"].unique())
 
 output_csv_file = "geolocation_results.csv"
 geolocator.write_to_csv(output_csv_file)
 
-logging.info("Geolocation process completed and results written to 'geolocation_results.csv'.")
-
+logging.info(
+    "Geolocation process completed and results written to 'geolocation_results.csv'."
+)
@@ -24,7 +24,9 @@ from dotenv import load_dotenv
 from src.nuforc import SETTINGS
 from src.nuforc.utility import *
 from src.nuforc.geocoding.geocoder import Geolocator
-from src.nuforc.geocoding.wrangling import replace_unparsed_with_none, join_columns
+from src.nuforc.geocoding.wrangling import replace_unparsed_with_none, join_address_columns
+from src.nuforc.aggregation import aggregate_by_polygon
+from src.nuforc.anonymization import join_polygons, randomize_locations
 from datetime import date
 import geopandas as gpd
 from shapely.geometry import Point
@@ -43,7 +45,7 @@ import os
 # Events
 raw = pd.read_csv(Path(os.getenv('DATA_DIR')) / 'raw_events' / 'events_2023_07_21.csv')
 raw = replace_unparsed_with_none(raw)
-raw['address'] = raw.apply(lambda row: join_columns(row['city'], row['state'], row['country']), axis=1)
+raw['address'] = join_address_columns(raw)
 
 # Coords
 coords = pd.read_csv(Path(os.getenv('DATA_DIR')) / 'gis' / 'csv' / 'geolocated_addresses.csv', names=['address', 'latitude', 'longitude'])
@@ -80,51 +82,23 @@ df['shape'] = df['shape'].apply(lambda x: lowercase_string(x))
 # In[189]:
 
 
-gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df.longitude, df.latitude))
-gdf.crs = polygons.crs
-gdf = gpd.sjoin(gdf, polygons, how='left', op='within')
+gdf = join_polygons(df, polygons)
 
 
 # In[192]:
 
 
-# Assuming you have a DataFrame named 'df' with columns 'ZCTA5CE10' and 'shape'
-
-# Group by "ZCTA5CE10" and apply a lambda function to find the mode of "shape"
-most_frequent_shape = gdf.groupby('ZCTA5CE10')['shape'].apply(lambda x: mode(x)[0][0] if not x.empty else "N/A")
-
-# Set the index of the result DataFrame
-most_frequent_shape.index.name = 'ZCTA5CE10'
-most_frequent_shape = most_frequent_shape.reset_index()
-
-# Rename the columns for better clarity
-most_frequent_shape.columns = ['ZCTA5CE10', 'most_frequent_shape']
+# Per-ZCTA event counts, modal shape and shape/time histograms in one pass.
+aggregates = aggregate_by_polygon(gdf)
+most_frequent_shape = aggregates['summary']['most_frequent_shape'].reset_index()
 most_frequent_shape.to_csv(f"I:\\Dropbox\\Python\\nuforc\\gis\\csv\\most_frequent_shape.csv")
 
 
 # In[193]:
 
 
-random_points = []
-# Generate random points within each polygon and add them to the new GeoDataFrame
-
-for idx, row in tqdm(gdf.iterrows()):
-    polygon = polygons[polygons['ZCTA5CE10'] == row['ZCTA5CE10']]
-    s = gpd.GeoSeries(polygon['geometry'])
-    
-    random_point = s.sample_points(size=1)
-    try:
-        row['randomized_x'] = random_point.x.iloc[0]
-        row['randomized_y'] = random_point.y.iloc[0]
-    except:
-        continue
-    random_points.append(row)
-
-
-# In[195]:
-
-
-randomized_locations_df = pd.DataFrame(random_points)
+# Move every event to a random point of its ZCTA; events outside every ZCTA are dropped.
+randomized_locations_df = randomize_locations(df, polygons)
 
 
 # In[201]:
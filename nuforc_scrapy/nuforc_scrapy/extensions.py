@@ -0,0 +1,97 @@
+# Define here your extensions
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/extensions.html
+
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+sys.path.append(str(Path(__file__).resolve().parents[2] / "src"))
+from nuforc.telemetry import STAGES, CrawlMetrics
+
+# Spider callbacks reading index pages; responses to any other callback are event pages.
+INDEX_CALLBACKS = {"parse", "parse_subpage"}
+
+
+class CrawlTelemetry:
+    """
+    Collects crawl metrics in the spider's `metrics`, shared with the spider and pipelines that time their own stages:
+    download latency and status code of every response, retries, scraped and dropped items. When the spider closes
+    they are written to `CRAWL_METRICS_PATH` (JSON summary for `.json` paths, Prometheus text otherwise) and the
+    per-stage busy time is added to the crawl stats.
+    """
+
+    def __init__(self, metrics_path, stats):
+        self.metrics_path = Path(metrics_path)
+        self.stats = stats
+        self.metrics = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("CRAWL_TELEMETRY_ENABLED", True):
+            raise NotConfigured
+        load_dotenv()
+        current_date = datetime.now().strftime("%Y_%m_%d")
+        metrics_path = crawler.settings.get("CRAWL_METRICS_PATH")
+        if not metrics_path:
+            data_dir = os.getenv("DATA_DIR")
+            if not data_dir:
+                raise NotConfigured(
+                    "Set CRAWL_METRICS_PATH or DATA_DIR to collect crawl metrics."
+                )
+            metrics_path = Path(data_dir) / f"crawl_metrics_{current_date}.prom"
+        extension = cls(metrics_path=metrics_path, stats=crawler.stats)
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(
+            extension.response_received, signal=signals.response_received
+        )
+        crawler.signals.connect(extension.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(extension.item_dropped, signal=signals.item_dropped)
+        return extension
+
+    def spider_opened(self, spider):
+        self.metrics = getattr(spider, "metrics", None)
+        if self.metrics is None:
+            self.metrics = spider.metrics = CrawlMetrics()
+
+    def response_received(self, response, request, spider):
+        callback = getattr(request.callback, "__name__", "parse")
+        stage = "index_fetch" if callback in INDEX_CALLBACKS else "event_fetch"
+        latency = request.meta.get("download_latency")
+        if latency is not None:
+            self.metrics.observe(stage, latency)
+        self.metrics.record_status(stage, response.status)
+
+    def item_scraped(self, item, response, spider):
+        self.metrics.inc("events")
+
+    def item_dropped(self, item, response, exception, spider):
+        self.metrics.inc("dropped_items")
+
+    def spider_closed(self, spider, reason):
+        # Retries happen in Scrapy's RetryMiddleware, which only reports them in the crawl stats.
+        for key, value in self.stats.get_stats().items():
+            if key.startswith("retry/reason_count/"):
+                self.metrics.inc(
+                    "retries", value, stage="fetch", reason=key.split("/", 2)[2]
+                )
+
+        self.metrics.finish()
+        summary = self.metrics.summary()
+        for stage in STAGES:
+            self.stats.set_value(
+                f"telemetry/{stage}/busy_seconds",
+                summary["stages"][stage]["busy_seconds"],
+            )
+        self.stats.set_value("telemetry/busiest_stage", summary["busiest_stage"])
+        self.metrics.write(self.metrics_path)
+        spider.logger.info(
+            f"Crawl metrics saved @ {self.metrics_path}; busiest stage: {summary['busiest_stage']}"
+        )
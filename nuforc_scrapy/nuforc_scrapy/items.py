@@ -3,24 +3,12 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/items.html
 import sys
-from functools import *
 from pathlib import Path
 
 from scrapy import Field, Item
 
-sys.path.append(str(Path.cwd().parents[2] / "src"))
-from nuforc.wrangling import (
-    extract_city,
-    extract_country,
-    extract_description,
-    extract_duration,
-    extract_shape,
-    extract_state,
-    extract_state_abbreviation,
-    extract_time,
-    preprocess_text,
-    hash_string
-)
+sys.path.append(str(Path(__file__).resolve().parents[2] / "src"))
+from nuforc.wrangling import hash_string, parse_event_text, preprocess_text
 from nuforc.geocoding.wrangling import join_columns
 
 
@@ -34,77 +22,36 @@ def pick_first(iterable):
     return None
 
 
-def final_processing(iterable, wrapping_func):
-    """
-    Custom function to process the output of pick_first.
-    Accepts a wrapping function to apply additional processing.
-    """
-    selected_value = pick_first(iterable)
-    if selected_value is not None:
-        return wrapping_func(selected_value)
-    return None
-
-
 class NuforcEventItem(Item):
-    # Primary fields
-    occurred_time = Field(
-        input_processor=preprocess_text,
-        output_processor=lambda x: final_processing(
-            x, partial(extract_time, time_type="occurred_time")
-        ),
-    )
-    reported_time = Field(
-        input_processor=preprocess_text,
-        output_processor=lambda x: final_processing(
-            x, partial(extract_time, time_type="reported_time")
-        ),
-    )
-    entered_as_time = Field(
-        input_processor=preprocess_text,
-        output_processor=lambda x: final_processing(
-            x, partial(extract_time, time_type="entered_as_time")
-        ),
-    )
-    shape = Field(
-        input_processor=preprocess_text,
-        output_processor=lambda x: final_processing(x, extract_shape),
-    )
-    duration = Field(
-        input_processor=preprocess_text,
-        output_processor=lambda x: final_processing(x, extract_duration),
-    )
-    city = Field(
-        input_processor=preprocess_text,
-        output_processor=lambda x: final_processing(x, extract_city),
-    )
-    state = Field(
-        input_processor=preprocess_text,
-        output_processor=lambda x: final_processing(x, extract_state),
-    )
-    state_abbreviation = Field(
-        input_processor=preprocess_text,
-        output_processor=lambda x: final_processing(x, extract_state_abbreviation),
-    )
-    country = Field(
-        input_processor=preprocess_text,
-        output_processor=lambda x: final_processing(x, extract_country),
-    )
-    description = Field(
-        input_processor=preprocess_text,
-        output_processor=lambda x: final_processing(x, extract_description),
-    )
+    url = Field(output_processor=pick_first)
+
+    # Primary fields, parsed from `raw_text` in one pass by `set_parsed_fields`.
+    occurred_time = Field()
+    reported_time = Field()
+    entered_as_time = Field()
+    shape = Field()
+    duration = Field()
+    city = Field()
+    state = Field()
+    state_abbreviation = Field()
+    country = Field()
+    description = Field()
     raw_text = Field(input_processor=preprocess_text, output_processor=pick_first)
 
     # Calculated fields.
     hash = Field()
     address = Field()
 
+    def set_parsed_fields(self):
+        # Values already loaded, e.g. `url` from the response, take precedence over parsed ones.
+        for field, value in parse_event_text(self["raw_text"]).items():
+            if field in self.fields and field not in self:
+                self[field] = value
+
     def set_hash_field(self):
-        self['hash'] = hash_string(self['raw_text'])
+        self["hash"] = hash_string(self["raw_text"])
 
     def set_address_field(self):
-        self['address'] = join_columns(city=self['city'], state=self['state'], country=self['country'])
-
-
-
-
+        self["address"] = join_columns(
+            city=self["city"], state=self["state"], country=self["country"]
+        )
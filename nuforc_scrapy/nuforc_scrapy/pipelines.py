@@ -8,9 +8,111 @@
 import csv
 import os
 import shutil
+import sys
 from dotenv import load_dotenv
 from pathlib import Path
 from datetime import datetime
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[2] / "src"))
+from nuforc.event_io import ParquetEventWriter
+from nuforc.hash_index import HashIndex
+from nuforc.rollup import RollupCube
+from nuforc.telemetry import timed
+from scrapy import signals
+from scrapy.exceptions import DropItem
+
+
+def get_hash_index_path(settings):
+    return (
+        settings.get("HASH_INDEX_PATH")
+        or Path(os.getenv("DATA_DIR")) / "hash_index.sqlite"
+    )
+
+
+def get_unused_filename(stem, suffix, directories):
+    """
+    `{stem}{suffix}`, or `{stem}_{n}{suffix}` with the smallest n that exists in none of `directories`, so a later
+    crawl on the same day does not overwrite the output of one whose reports are already in the hash index.
+    """
+    filename = f"{stem}{suffix}"
+    n = 0
+    while any((Path(directory) / filename).exists() for directory in directories):
+        n += 1
+        filename = f"{stem}_{n}{suffix}"
+    return filename
+
+
+def register_output_file(spider, path):
+    """
+    Record a finished output file in the spider's `output_paths`, for pipelines acting on the crawl's outputs.
+    """
+    if getattr(spider, "output_paths", None) is None:
+        spider.output_paths = []
+    spider.output_paths.append(Path(path))
+
+
+class DeduplicationPipeline:
+    """
+    Drops items whose content hash is already in the hash index, i.e. reports stored by this or any earlier crawl,
+    or that repeat a report of this crawl, before any output pipeline sees them. Uses the spider's `hash_index` when
+    it has one.
+
+    Hashes are only added to the index once the output pipelines have stored the item: an item is recorded when it
+    passes every pipeline (`item_scraped`), and recorded items are committed when this pipeline closes, which Scrapy
+    does after every later pipeline, i.e. once the output files are written. Items of a crawl that crashes or whose
+    sink fails are crawled again next time.
+    """
+
+    def __init__(self, index_path, stats):
+        self.index_path = index_path
+        self.stats = stats
+        self.index = None
+        self.owns_index = False
+        # Hashes let through in this crawl, and the (hash, url) pairs of items stored by every pipeline.
+        self.seen = set()
+        self.scraped = []
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        load_dotenv()
+        pipeline = cls(
+            index_path=get_hash_index_path(crawler.settings), stats=crawler.stats
+        )
+        crawler.signals.connect(pipeline.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(pipeline.item_error, signal=signals.item_error)
+        return pipeline
+
+    def open_spider(self, spider):
+        self.index = getattr(spider, "hash_index", None)
+        if self.index is None:
+            self.index = HashIndex(self.index_path)
+            self.owns_index = True
+
+    def process_item(self, item, spider):
+        event_hash = item["hash"]
+        if event_hash in self.seen or event_hash in self.index:
+            self.stats.inc_value("deduplication/duplicate_events")
+            raise DropItem(f"Duplicate report {item.get('url')}")
+        self.seen.add(event_hash)
+        return item
+
+    def item_scraped(self, item, response, spider):
+        self.scraped.append((item["hash"], item.get("url")))
+
+    def item_error(self, item, response, spider, failure):
+        # A later pipeline failed on the item; let a copy of the report through again.
+        self.seen.discard(item["hash"])
+
+    def close_spider(self, spider):
+        if self.scraped:
+            event_hashes, urls = zip(*self.scraped)
+            self.index.add_many(list(event_hashes), list(urls))
+            self.scraped = []
+        if self.owns_index:
+            self.index.close()
+        else:
+            self.index.commit()
 
 
 class CsvPipeline:
@@ -19,9 +121,14 @@ class CsvPipeline:
         self.validate_directory_tree()
         self.output_dir = Path(os.getenv("DATA_DIR"))
 
-        current_date = datetime.now().strftime('%Y_%m_%d')
-        self.output_filepath = self.output_dir / "raw_scrapy_output" / f"events_{current_date}.csv"
-        self.output_copy_filepath = self.output_dir / "raw_events" / f"events_{current_date}.csv"
+        current_date = datetime.now().strftime("%Y_%m_%d")
+        filename = get_unused_filename(
+            f"events_{current_date}",
+            ".csv",
+            [self.output_dir / "raw_scrapy_output", self.output_dir / "raw_events"],
+        )
+        self.output_filepath = self.output_dir / "raw_scrapy_output" / filename
+        self.output_copy_filepath = self.output_dir / "raw_events" / filename
         self.file = open(self.output_filepath, "w", newline="", encoding="utf-8")
         self.writer = None
 
@@ -38,13 +145,106 @@ class CsvPipeline:
                 path.mkdir(parents=True, exist_ok=True)
 
     def process_item(self, item, spider):
-        if self.writer is None:
-            fieldnames = item.keys()
-            self.writer = csv.DictWriter(self.file, fieldnames=fieldnames)
-            self.writer.writeheader()
-        self.writer.writerow(item)
+        with timed(getattr(spider, "metrics", None), "sink_write"):
+            if self.writer is None:
+                fieldnames = item.keys()
+                self.writer = csv.DictWriter(self.file, fieldnames=fieldnames)
+                self.writer.writeheader()
+            self.writer.writerow(item)
         return item
 
     def close_spider(self, spider):
         self.file.close()
         shutil.copy2(self.output_filepath, self.output_copy_filepath)
+        register_output_file(spider, self.output_filepath)
+        register_output_file(spider, self.output_copy_filepath)
+
+
+class ParquetPipeline:
+    """
+    Writes items to `raw_events/events_{date}.parquet` (`events_{date}_{n}.parquet` for later crawls on the same day)
+    with the fixed `EVENT_SCHEMA`, one row group per `PARQUET_ROW_GROUP_SIZE` items; the file only appears once the
+    spider closes.
+    """
+
+    def __init__(self, row_group_size=10000):
+        load_dotenv()
+        self.output_dir = Path(os.getenv("DATA_DIR"))
+        self.row_group_size = row_group_size
+
+        current_date = datetime.now().strftime("%Y_%m_%d")
+        self.output_filepath = (
+            self.output_dir
+            / "raw_events"
+            / get_unused_filename(
+                f"events_{current_date}", ".parquet", [self.output_dir / "raw_events"]
+            )
+        )
+        self.writer = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            row_group_size=crawler.settings.getint("PARQUET_ROW_GROUP_SIZE", 10000)
+        )
+
+    def open_spider(self, spider):
+        self.writer = ParquetEventWriter(
+            self.output_filepath, row_group_size=self.row_group_size
+        )
+
+    def process_item(self, item, spider):
+        with timed(getattr(spider, "metrics", None), "sink_write"):
+            self.writer.write(item)
+        return item
+
+    def close_spider(self, spider):
+        with timed(getattr(spider, "metrics", None), "sink_write"):
+            self.writer.close()
+        register_output_file(spider, self.output_filepath)
+        spider.logger.info(
+            f"{self.writer.n_events} events saved @ {self.output_filepath}"
+        )
+
+
+class RollupPipeline:
+    """
+    Counts new items per occurrence day, shape, country and state and adds the counts to the rollup cube when the
+    spider closes. Runs after `DeduplicationPipeline`, so every report is counted once across crawls.
+
+    The cube is updated once every pipeline has closed, and the crawl's output files (`output_paths`) are marked as
+    counted in it, so `build_rollup_cube.py` skips them.
+    """
+
+    columns = ["occurred_time", "shape", "country", "state", "state_abbreviation"]
+
+    def __init__(self, cube_path):
+        self.cube_path = cube_path
+        self.rows = []
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        load_dotenv()
+        cube_path = (
+            crawler.settings.get("ROLLUP_CUBE_PATH")
+            or Path(os.getenv("DATA_DIR")) / "rollup_cube.parquet"
+        )
+        pipeline = cls(cube_path=cube_path)
+        # Output pipelines finish their files in `close_spider`; `spider_closed` is sent after all of them.
+        crawler.signals.connect(pipeline.spider_closed, signal=signals.spider_closed)
+        return pipeline
+
+    def process_item(self, item, spider):
+        self.rows.append({column: item.get(column) for column in self.columns})
+        return item
+
+    def spider_closed(self, spider):
+        output_paths = getattr(spider, "output_paths", None) or []
+        if not self.rows and not output_paths:
+            return
+        cube = RollupCube(self.cube_path)
+        cube.mark_counted(output_paths)
+        cube.add_events(pd.DataFrame(self.rows, columns=self.columns))
+        spider.logger.info(
+            f"{len(self.rows)} events counted in the rollup cube @ {self.cube_path}"
+        )
@@ -7,6 +7,12 @@
 #     https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 #     https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
 BOT_NAME = "nuforc_scrapy"
 
 SPIDER_MODULES = ["nuforc_scrapy.spiders"]
@@ -97,7 +103,32 @@ LOG_LEVEL = "DEBUG"
 LOG_STDOUT = False
 LOG_FORMAT = "%(asctime)s [%(name)s] %(levelname)s: %(message)s"
 
+# SQLite file persisting resolved `Location:` strings between crawls (in-memory only when unset).
+LOCATION_CACHE_PATH = os.getenv("LOCATION_CACHE_PATH")
+
+# Directory of the on-disk response cache revalidated with conditional GETs (disabled when unset).
+HTTP_CONDITIONAL_CACHE_DIR = os.getenv("HTTP_CACHE_DIR")
+DOWNLOADER_MIDDLEWARES = {
+    # Runs after decompression (590) and redirects (600), so the cached body is the final page.
+    "nuforc_scrapy.middlewares.ConditionalCacheMiddleware": 580,
+}
+
+# Per-stage timings, status codes and retries, written when the spider closes; defaults to
+# $DATA_DIR/crawl_metrics_{date}.prom (Prometheus text; use a .json path for a JSON summary).
+EXTENSIONS = {
+    "nuforc_scrapy.extensions.CrawlTelemetry": 500,
+}
+CRAWL_METRICS_PATH = os.getenv("CRAWL_METRICS_PATH")
+
 # Add this to enable the pickle export pipeline
 ITEM_PIPELINES = {
+    "nuforc_scrapy.pipelines.DeduplicationPipeline": 0,
     "nuforc_scrapy.pipelines.CsvPipeline": 1,
+    "nuforc_scrapy.pipelines.ParquetPipeline": 2,
+    "nuforc_scrapy.pipelines.RollupPipeline": 3,
 }
+PARQUET_ROW_GROUP_SIZE = 10000
+# Content hashes of every stored report; defaults to $DATA_DIR/hash_index.sqlite.
+HASH_INDEX_PATH = os.getenv("HASH_INDEX_PATH")
+# Event counts per day, shape, country and state; defaults to $DATA_DIR/rollup_cube.parquet.
+ROLLUP_CUBE_PATH = os.getenv("ROLLUP_CUBE_PATH")
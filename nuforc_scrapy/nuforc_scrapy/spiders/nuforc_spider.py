@@ -5,47 +5,177 @@ from urllib.parse import urljoin
 
 import scrapy
 from dotenv import load_dotenv
+from scrapy import signals
 from scrapy.loader import ItemLoader
 
 from nuforc_scrapy.items import NuforcEventItem
+from nuforc_scrapy.pipelines import get_hash_index_path
+
+sys.path.append(str(Path(__file__).resolve().parents[3] / "src"))
+from nuforc.crawl_state import CrawlState, parse_report_count
+from nuforc.hash_index import HashIndex, merge_event_files
+from nuforc.telemetry import CrawlMetrics
+from nuforc.wrangling import (
+    LocationResolver,
+    get_location_resolver,
+    set_location_resolver,
+)
 
-sys.path.append(str(Path.cwd().parents[2] / "src"))
 load_dotenv()
 
 
 class NuforcSpider(scrapy.Spider):
     name = "nuforc_spider"
     start_urls = ["https://nuforc.org/webreports/ndxevent.html"]
+    available_modes = ["full", "incremental"]
+
+    def __init__(self, mode="full", *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        assert (
+            mode in self.available_modes
+        ), f"Invalid crawl mode chosen; available crawl modes are: {self.available_modes}"
+        self.mode = mode
+        self.data_dir = Path(os.getenv("DATA_DIR"))
+        # Monthly index report counts are always recorded, so a full crawl seeds the next incremental one.
+        self.crawl_state = CrawlState.load(self.data_dir)
+        self.hash_index = None
+        # Stage timings; collected and written by the `CrawlTelemetry` extension.
+        self.metrics = CrawlMetrics()
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        location_cache_path = crawler.settings.get("LOCATION_CACHE_PATH")
+        if location_cache_path:
+            set_location_resolver(LocationResolver(cache_path=location_cache_path))
+        spider.hash_index = spider.open_hash_index(
+            get_hash_index_path(crawler.settings)
+        )
+        # An event counts as processed once the pipelines stored or dropped it; a month with an item a pipeline failed
+        # on is crawled again next time.
+        crawler.signals.connect(spider.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(spider.item_dropped, signal=signals.item_dropped)
+        crawler.signals.connect(spider.item_error, signal=signals.item_error)
+        return spider
+
+    def open_hash_index(self, path):
+        hash_index = HashIndex(path)
+        # Seed a new index from the raw event files of crawls that predate it.
+        if len(hash_index) == 0:
+            raw_event_paths = sorted(
+                raw_event_path
+                for suffix in ("csv", "parquet")
+                for raw_event_path in (self.data_dir / "raw_events").glob(
+                    f"events_*.{suffix}"
+                )
+            )
+            if raw_event_paths:
+                n_read, n_kept = merge_event_files(raw_event_paths, hash_index)
+                self.logger.info(
+                    f"Hash index seeded with {n_kept} of {n_read} stored events."
+                )
+        return hash_index
+
+    def closed(self, reason):
+        if reason == "finished":
+            self.crawl_state.save(self.data_dir)
+
+        if self.hash_index is not None:
+            self.hash_index.close()
+
+        location_resolver = get_location_resolver()
+        location_resolver.flush()
+        for key, value in location_resolver.stats().items():
+            self.crawler.stats.set_value(f"location_resolver/{key}", value)
 
     def parse(self, response):
-        for url in response.css("a::attr(href)").getall():
+        report_counts = {}
+        with self.metrics.time("html_parse"):
+            for row in response.css("tr"):
+                url = row.css("a::attr(href)").get()
+                if url is not None:
+                    url = urljoin("https://nuforc.org/webreports/", url)
+                    report_counts[url] = parse_report_count(
+                        " ".join(row.css("td:nth-child(2) ::text").getall())
+                    )
+            urls = response.css("a::attr(href)").getall()
+
+        for url in urls:
             url = urljoin("https://nuforc.org/webreports/", url)
-            yield response.follow(url, self.parse_subpage)
+            report_count = report_counts.get(url)
+            if self.mode == "incremental" and not self.crawl_state.is_month_changed(
+                url, report_count
+            ):
+                self.crawler.stats.inc_value("incremental/skipped_months")
+                continue
+            # The month's count is recorded once all of its events are processed.
+            self.crawl_state.start_month(url, report_count)
+            yield response.follow(url, self.parse_subpage, cb_kwargs={"month_url": url})
 
-    def parse_subpage(self, response):
-        for url in response.css("a::attr(href)").getall():
+    def parse_subpage(self, response, month_url=None):
+        with self.metrics.time("html_parse"):
+            urls = response.css("a::attr(href)").getall()
+        event_urls = []
+        for url in urls:
             url = urljoin("https://nuforc.org/webreports/", url)
-            yield response.follow(url, self.parse_event_page)
-
-    def parse_event_page(self, response):
-        loader = ItemLoader(item=NuforcEventItem(), response=response)
-
-        # Primary fields.
-        loader.add_xpath("occurred_time", "//body//text()")
-        loader.add_xpath("reported_time", "//body//text()")
-        loader.add_xpath("entered_as_time", "//body//text()")
-        loader.add_xpath("shape", "//body//text()")
-        loader.add_xpath("duration", "//body//text()")
-        loader.add_xpath("city", "//body//text()")
-        loader.add_xpath("state", "//body//text()")
-        loader.add_xpath("state_abbreviation", "//body//text()")
-        loader.add_xpath("country", "//body//text()")
-        loader.add_xpath("description", "//body//text()")
-        loader.add_xpath("raw_text", "//body//text()")
-        item = loader.load_item()
-
-        # Calculated fields.
-        item.set_hash_field()
-        item.set_address_field()
+            if self.mode == "incremental" and self.hash_index.contains_url(url):
+                self.crawler.stats.inc_value("incremental/skipped_events")
+                continue
+            event_urls.append(url)
+
+        # Counted before the first request is yielded, so the month cannot look finished while requests are pending.
+        self.crawl_state.expect_events(month_url, len(event_urls))
+        for url in event_urls:
+            # Not filtered, so every expected event page reaches the callback or the errback.
+            yield response.follow(
+                url,
+                self.parse_event_page,
+                errback=self.event_page_failed,
+                cb_kwargs={"month_url": month_url},
+                dont_filter=True,
+            )
+
+    @staticmethod
+    def get_month_url(response):
+        request = getattr(response, "request", None)
+        return request.cb_kwargs.get("month_url") if request is not None else None
+
+    def item_scraped(self, item, response, spider):
+        self.crawl_state.finish_event(self.get_month_url(response))
+
+    def item_dropped(self, item, response, exception, spider):
+        # Dropped items are duplicates of reports already stored.
+        self.crawl_state.finish_event(self.get_month_url(response))
+
+    def item_error(self, item, response, spider, failure):
+        self.crawl_state.finish_event(self.get_month_url(response), succeeded=False)
+
+    def event_page_failed(self, failure):
+        self.crawl_state.finish_event(
+            failure.request.cb_kwargs.get("month_url"), succeeded=False
+        )
+
+    def parse_event_page(self, response, month_url=None):
+        try:
+            with self.metrics.time("html_parse"):
+                loader = ItemLoader(item=NuforcEventItem(), response=response)
+
+                # The URL as linked from the monthly index, before any redirects.
+                loader.add_value(
+                    "url", response.meta.get("redirect_urls", [response.url])[0]
+                )
+                loader.add_xpath("raw_text", "//body//text()")
+                item = loader.load_item()
+
+            with self.metrics.time("field_extraction"):
+                # Primary fields.
+                item.set_parsed_fields()
 
+                # Calculated fields.
+                item.set_hash_field()
+                item.set_address_field()
+        except Exception:
+            self.crawl_state.finish_event(month_url, succeeded=False)
+            raise
+        # Reports already stored are dropped by `DeduplicationPipeline`; the month is updated by the item signals.
         yield item
@@ -0,0 +1,39 @@
+import argparse
+import logging.config
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent / "src"))
+from nuforc.SETTINGS import LOGGING_CONFIG
+from nuforc.reparsing import reparse_events
+
+logging.config.dictConfig(LOGGING_CONFIG)
+logger = logging.getLogger("root")
+
+
+def execute_reparsing(input_path, output_path=None, chunksize=10000, max_workers=None):
+    reparse_events(
+        input_path=input_path,
+        output_path=output_path,
+        chunksize=chunksize,
+        max_workers=max_workers,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Re-derive event fields from the raw text of a raw events file."
+    )
+    parser.add_argument(
+        "input_path", help="Raw events CSV, e.g. raw_events/events_2023_08_20.csv."
+    )
+    parser.add_argument("-o", "--output-path", default=None)
+    parser.add_argument("--chunksize", type=int, default=10000)
+    parser.add_argument("--max-workers", type=int, default=None)
+    args = parser.parse_args()
+    execute_reparsing(
+        input_path=args.input_path,
+        output_path=args.output_path,
+        chunksize=args.chunksize,
+        max_workers=args.max_workers,
+    )
@@ -1,21 +1,31 @@
 import logging.config
 
-from src.nuforc.SETTINGS import DEFAULT_ENGINE_SETTINGS
-from src.nuforc.SETTINGS import LOGGING_CONFIG
+from src.nuforc.async_scraping import AsyncNUFORCScraper
 from src.nuforc.scraping import NUFORCScraper
+from src.nuforc.SETTINGS import DEFAULT_ENGINE_SETTINGS, LOGGING_CONFIG
 
 logging.config.dictConfig(LOGGING_CONFIG)
 logger = logging.getLogger("root")
 
 
 def execute_scraping():
-    scraper = NUFORCScraper(
+    scraper_kwargs = dict(
         scraping_mode=DEFAULT_ENGINE_SETTINGS.scraping_mode,
         timespan_start=DEFAULT_ENGINE_SETTINGS.timespan_start,
         timespan_end=DEFAULT_ENGINE_SETTINGS.timespan_end,
         n_scraping_retries=DEFAULT_ENGINE_SETTINGS.n_scraping_retries,
         output_folder=DEFAULT_ENGINE_SETTINGS.output_folder,
+        metrics_format=DEFAULT_ENGINE_SETTINGS.metrics_format,
     )
+    if DEFAULT_ENGINE_SETTINGS.scraping_engine == "async":
+        scraper = AsyncNUFORCScraper(
+            max_connections=DEFAULT_ENGINE_SETTINGS.max_connections,
+            max_connections_per_host=DEFAULT_ENGINE_SETTINGS.max_connections_per_host,
+            requests_per_second=DEFAULT_ENGINE_SETTINGS.requests_per_second,
+            **scraper_kwargs,
+        )
+    else:
+        scraper = NUFORCScraper(**scraper_kwargs)
     scraper.scrape()
     scraper.save_events()
 
@@ -0,0 +1,60 @@
+import argparse
+import logging.config
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent / "src"))
+from nuforc.search import SearchIndex
+from nuforc.SETTINGS import LOGGING_CONFIG, SEARCH_INDEX_DIR
+
+logging.config.dictConfig(LOGGING_CONFIG)
+logger = logging.getLogger("root")
+
+
+def execute_indexing(input_paths, index_dir=SEARCH_INDEX_DIR):
+    index = SearchIndex(index_dir)
+    for input_path in input_paths:
+        n_indexed = index.add_file(input_path)
+        logger.info(f"{n_indexed} new events indexed from {input_path}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build or query the full-text search index over event descriptions."
+    )
+    parser.add_argument("--index-dir", default=SEARCH_INDEX_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = subparsers.add_parser(
+        "index", help="Add new events of event files to the index."
+    )
+    index_parser.add_argument(
+        "input_paths", nargs="+", help="Event files, e.g. data/raw_events/*.parquet."
+    )
+
+    query_parser = subparsers.add_parser("query", help="Search the index.")
+    query_parser.add_argument("query", help='E.g. "triangle AND silent".')
+    query_parser.add_argument("--shape", action="append")
+    query_parser.add_argument("--state", action="append")
+    query_parser.add_argument("--country", action="append")
+    query_parser.add_argument("--start", help="First occurrence date included.")
+    query_parser.add_argument("--end", help="First occurrence date excluded.")
+    query_parser.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args()
+    if args.command == "index":
+        execute_indexing(args.input_paths, index_dir=args.index_dir)
+    else:
+        results = SearchIndex(args.index_dir).search(
+            args.query,
+            shape=args.shape,
+            state=args.state,
+            country=args.country,
+            start=args.start,
+            end=args.end,
+            limit=args.limit,
+        )
+        with pd.option_context("display.width", 160, "display.max_colwidth", 60):
+            print(results.to_string(index=False))
@@ -1,7 +1,6 @@
-from os import environ
 from dataclasses import dataclass
-from datetime import date
-from datetime import timedelta
+from datetime import date, timedelta
+from os import environ
 
 from dotenv import load_dotenv
 
@@ -15,6 +14,13 @@ class ScraperSettings:
     timespan_end = (date.today() - timedelta(days=30)).strftime("%Y/%m/%d")
     n_scraping_retries: int = 30
     output_folder = environ.get("OUTPUT_FOLDER") or "data"
+    # "async" runs on a shared aiohttp connection pool; "threaded" is the original requests-based scraper.
+    scraping_engine: str = "async"
+    max_connections: int = 32
+    max_connections_per_host: int = 16
+    requests_per_second: float = 20.0
+    # Crawl metrics written next to the events: "prom" (Prometheus text) or "json" (summary).
+    metrics_format: str = environ.get("CRAWL_METRICS_FORMAT") or "prom"
 
 
 DEFAULT_ENGINE_SETTINGS = ScraperSettings()
@@ -30,12 +36,61 @@ OUTPUT_FOLDER = environ.get("OUTPUT_FOLDER")
 """
 Geocoder settings.
 """
+# SQLite cache of geocoded addresses; repeat runs only geocode addresses missing from it.
+GEOCODING_CACHE_PATH = environ.get("GEOCODING_CACHE_PATH") or "geocoding_cache.sqlite"
+# Optional offline gazetteer (GeoNames dump or city/state/country/latitude/longitude CSV) tried before Nominatim.
+GAZETTEER_PATH = environ.get("GAZETTEER_PATH")
+
+
+"""
+Search settings.
+"""
+# Full-text search index over event descriptions, built and queried by search_events.py.
+SEARCH_INDEX_DIR = environ.get("SEARCH_INDEX_DIR") or "search_index"
+
+
+"""
+Near-duplicate settings.
+"""
+# MinHash signatures of event descriptions, kept next to the events for near-duplicate checks.
+NEAR_DUPLICATES_DIR = (
+    environ.get("NEAR_DUPLICATES_DIR") or f"{OUTPUT_FOLDER or 'data'}/near_duplicates"
+)
+NEAR_DUPLICATE_THRESHOLD = float(environ.get("NEAR_DUPLICATE_THRESHOLD") or 0.8)
+
+
+"""
+Clustering settings.
+"""
+# Cluster ids of geocoded events, extended by detect_flaps.py with every new batch of events.
+FLAP_CLUSTERS_PATH = (
+    environ.get("FLAP_CLUSTERS_PATH")
+    or f"{OUTPUT_FOLDER or 'data'}/flap_clusters.parquet"
+)
+# ST-DBSCAN neighborhood: reports at most this far apart in space and time, and the reports a core report needs.
+FLAP_DISTANCE_KM = float(environ.get("FLAP_DISTANCE_KM") or 30)
+FLAP_TIME_WINDOW = environ.get("FLAP_TIME_WINDOW") or "1D"
+FLAP_MIN_EVENTS = int(environ.get("FLAP_MIN_EVENTS") or 5)
+
+
+"""
+Rollup settings.
+"""
+# Event counts per day, shape, country and state, updated by each crawl and read by the dashboard charts.
+ROLLUP_CUBE_PATH = (
+    environ.get("ROLLUP_CUBE_PATH") or f"{OUTPUT_FOLDER or 'data'}/rollup_cube.parquet"
+)
 
 
 """
 Dashboard settings.
 """
 DASHBOARD_APP_DIR = "dashboard"
+# Output of make_dashboard_layers.py: tiles/{z}/{x}/{y}.png, overview.geojson and metadata.json.
+DASHBOARD_LAYERS_DIR = environ.get("DASHBOARD_LAYERS_DIR") or "dashboard_layers"
+DASHBOARD_MIN_ZOOM = 0
+DASHBOARD_MAX_ZOOM = 10
+DASHBOARD_OVERVIEW_CELL_SIZE = 1.0
 
 """
 API keys.
@@ -85,6 +140,48 @@ LOGGING_CONFIG = {
             "formatter": "simple",
             "propagate": False,
         },
+        "model.modules.reparsing": {
+            "level": "INFO",
+            "handlers": ["console"],
+            "formatter": "simple",
+            "propagate": False,
+        },
+        "model.modules.anonymization": {
+            "level": "INFO",
+            "handlers": ["console"],
+            "formatter": "simple",
+            "propagate": False,
+        },
+        "model.modules.aggregation": {
+            "level": "INFO",
+            "handlers": ["console"],
+            "formatter": "simple",
+            "propagate": False,
+        },
+        "model.modules.clustering": {
+            "level": "INFO",
+            "handlers": ["console"],
+            "formatter": "simple",
+            "propagate": False,
+        },
+        "model.modules.near_duplicates": {
+            "level": "INFO",
+            "handlers": ["console"],
+            "formatter": "simple",
+            "propagate": False,
+        },
+        "model.modules.search": {
+            "level": "INFO",
+            "handlers": ["console"],
+            "formatter": "simple",
+            "propagate": False,
+        },
+        "model.modules.visualisation": {
+            "level": "INFO",
+            "handlers": ["console"],
+            "formatter": "simple",
+            "propagate": False,
+        },
     },
     "root": {"level": "INFO", "handlers": ["console"]},
 }
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("model.modules.aggregation")
+
+"""
+Per-polygon (e.g. ZCTA) event statistics for choropleth layers.
+"""
+
+AGGREGATE_TABLES = ("summary", "shapes", "hours", "years")
+# Bump when the aggregate tables change, so stale cache entries are not read back.
+_AGGREGATION_VERSION = 1
+
+
+def _joint_counts(row_codes, column_codes, n_rows, n_columns):
+    """
+    Contingency table of two code arrays in one `np.bincount`; pairs with a negative (missing) code are skipped.
+    """
+    valid = (row_codes >= 0) & (column_codes >= 0)
+    counts = np.bincount(
+        row_codes[valid] * n_columns + column_codes[valid],
+        minlength=n_rows * n_columns,
+    )
+    return counts.reshape(n_rows, n_columns)
+
+
+def aggregate_by_polygon(
+    events, polygon_id="ZCTA5CE10", shape_column="shape", time_column="occurred_time"
+):
+    """
+    Count events per polygon, with their modal shape, shape distribution and hour of day and year histograms.
+
+    Every statistic comes from integer codes (polygon and shape categories, hours, years) counted with `np.bincount`;
+    events without a polygon are left out.
+
+    Returns:
+        Dictionary of DataFrames indexed by `polygon_id`:
+            `summary`: `count` and `most_frequent_shape` (ties go to the alphabetically first shape; None if no event
+                has a shape).
+            `shapes`: event count per shape.
+            `hours`: event count per hour of day, in `hour_00` to `hour_23`.
+            `years`: event count per year of `time_column`, in `year_YYYY` columns.
+    """
+    events = events[events[polygon_id].notna()]
+    polygon_codes, polygon_ids = pd.factorize(events[polygon_id], sort=True)
+    polygon_index = pd.Index(polygon_ids, name=polygon_id)
+    n_polygons = len(polygon_ids)
+
+    # String categories come out sorted, so argmax ties go to the alphabetically first shape.
+    shapes = events[shape_column].astype("category")
+    shape_counts = _joint_counts(
+        polygon_codes,
+        shapes.cat.codes.to_numpy(),
+        n_polygons,
+        len(shapes.cat.categories),
+    )
+
+    times = pd.to_datetime(events[time_column], errors="coerce")
+    hours = times.dt.hour.fillna(-1).to_numpy(dtype=int)
+    hour_counts = _joint_counts(polygon_codes, hours, n_polygons, 24)
+    years = times.dt.year
+    first_year = int(years.min()) if years.notna().any() else 0
+    year_codes = (years - first_year).fillna(-1).to_numpy(dtype=int)
+    n_years = int(year_codes.max()) + 1 if len(year_codes) else 0
+    year_counts = _joint_counts(polygon_codes, year_codes, n_polygons, n_years)
+
+    categories = np.asarray(shapes.cat.categories, dtype=object)
+    most_frequent_shape = np.full(n_polygons, None, dtype=object)
+    has_shape = shape_counts.sum(axis=1) > 0
+    most_frequent_shape[has_shape] = categories[shape_counts[has_shape].argmax(axis=1)]
+    summary = pd.DataFrame(
+        {
+            "count": np.bincount(polygon_codes, minlength=n_polygons),
+            "most_frequent_shape": most_frequent_shape,
+        },
+        index=polygon_index,
+    )
+    return {
+        "summary": summary,
+        "shapes": pd.DataFrame(
+            shape_counts,
+            index=polygon_index,
+            columns=[str(shape) for shape in categories],
+        ),
+        "hours": pd.DataFrame(
+            hour_counts,
+            index=polygon_index,
+            columns=[f"hour_{hour:02d}" for hour in range(24)],
+        ),
+        "years": pd.DataFrame(
+            year_counts,
+            index=polygon_index,
+            columns=[f"year_{first_year + year}" for year in range(n_years)],
+        ),
+    }
+
+
+def hash_file(path, chunk_size=2**20):
+    hash_object = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hash_object.update(chunk)
+    return hash_object.hexdigest()
+
+
+def _read_events(path, columns):
+    path = Path(path)
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns, dtype={columns[0]: str})
+
+
+def aggregate_file(
+    input_path,
+    cache_dir,
+    polygon_id="ZCTA5CE10",
+    shape_column="shape",
+    time_column="occurred_time",
+):
+    """
+    `aggregate_by_polygon` over an events file (CSV or Parquet), cached on disk.
+
+    Results are stored as Parquet files under `cache_dir/<key>/`, where the key hashes the file content and the
+    arguments; an unchanged input is answered from the cache without parsing it.
+
+    Returns:
+        Dictionary of DataFrames, as `aggregate_by_polygon`.
+    """
+    columns = [polygon_id, shape_column, time_column]
+    key_source = json.dumps(
+        [hash_file(input_path), columns, _AGGREGATION_VERSION]
+    ).encode()
+    cache_path = Path(cache_dir) / hashlib.sha256(key_source).hexdigest()[:32]
+
+    if cache_path.is_dir():
+        logger.info(f"Aggregates of {input_path} read from cache {cache_path}.")
+        return {
+            table: pd.read_parquet(cache_path / f"{table}.parquet")
+            for table in AGGREGATE_TABLES
+        }
+
+    aggregates = aggregate_by_polygon(
+        _read_events(input_path, columns),
+        polygon_id=polygon_id,
+        shape_column=shape_column,
+        time_column=time_column,
+    )
+    # Write next to the final location and rename, so a crashed run never leaves a partial cache entry.
+    temporary_path = cache_path.with_name(f"{cache_path.name}.tmp{os.getpid()}")
+    temporary_path.mkdir(parents=True, exist_ok=True)
+    for table, df in aggregates.items():
+        df.to_parquet(temporary_path / f"{table}.parquet")
+    try:
+        temporary_path.rename(cache_path)
+    except OSError:
+        # Another run cached the same input first.
+        for path in temporary_path.iterdir():
+            path.unlink()
+        temporary_path.rmdir()
+    logger.info(f"Aggregates of {input_path} cached at {cache_path}.")
+    return aggregates
@@ -0,0 +1,130 @@
+import logging
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+logger = logging.getLogger("model.modules.anonymization")
+
+"""
+Location anonymization: events are moved to a uniformly random point of the polygon (e.g. ZCTA) they fall in.
+"""
+
+
+def join_polygons(
+    events, polygons, polygon_id="ZCTA5CE10", x="longitude", y="latitude"
+):
+    """
+    Spatial join of event points onto the polygons containing them, through the polygons' STRtree index.
+
+    Args:
+        events: DataFrame with point coordinates in `x` and `y` columns.
+        polygons: GeoDataFrame with a `polygon_id` column, e.g. the Census ZCTA shapefile.
+
+    Returns:
+        GeoDataFrame of the events with the `polygon_id` (NaN outside every polygon) and `index_right` columns.
+    """
+    gdf = gpd.GeoDataFrame(
+        events, geometry=gpd.points_from_xy(events[x], events[y]), crs=polygons.crs
+    )
+    return gpd.sjoin(
+        gdf, polygons[[polygon_id, "geometry"]], how="left", predicate="within"
+    )
+
+
+def sample_points_in_polygons(geometries, max_candidates=64, max_rounds=100, seed=None):
+    """
+    Draw one uniformly random point inside each geometry by vectorized rejection sampling in its bounding box.
+
+    Each round draws several candidates per unresolved geometry, scaled to the geometry's area to bounding box ratio,
+    and tests them all with one `shapely.contains_xy` call; rounds repeat until every geometry has a point. Invalid
+    geometries, geometries without area and those still without a point after `max_rounds` rounds get their
+    representative point (`shapely.point_on_surface`) instead.
+
+    Args:
+        geometries: Array-like of polygons, repeated once per point wanted in them.
+        max_candidates: Cap on candidates per geometry and round.
+        max_rounds: Cap on sampling rounds.
+        seed: Seed or `numpy.random.Generator`.
+
+    Returns:
+        Tuple of (x, y) arrays; NaN for empty geometries.
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    rng = np.random.default_rng(seed)
+    x = np.full(len(geometries), np.nan)
+    y = np.full(len(geometries), np.nan)
+
+    bounds = shapely.bounds(geometries)
+    box_area = (bounds[:, 2] - bounds[:, 0]) * (bounds[:, 3] - bounds[:, 1])
+    area = shapely.area(geometries)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        acceptance = area / box_area
+        n_candidates = np.clip(
+            np.ceil(2 / np.nan_to_num(acceptance, nan=1.0, posinf=1.0)),
+            1,
+            max_candidates,
+        ).astype(int)
+    shapely.prepare(geometries)
+
+    pending = np.flatnonzero(
+        ~shapely.is_empty(geometries)
+        & shapely.is_valid(geometries)
+        & (box_area > 0)
+        & (area > 0)
+    )
+    for _ in range(max_rounds):
+        if not len(pending):
+            break
+        owner = np.repeat(pending, n_candidates[pending])
+        candidate_x = rng.uniform(bounds[owner, 0], bounds[owner, 2])
+        candidate_y = rng.uniform(bounds[owner, 1], bounds[owner, 3])
+        inside = shapely.contains_xy(geometries[owner], candidate_x, candidate_y)
+        # First accepted candidate of every geometry.
+        accepted_owner, first = np.unique(owner[inside], return_index=True)
+        accepted = np.flatnonzero(inside)[first]
+        x[accepted_owner] = candidate_x[accepted]
+        y[accepted_owner] = candidate_y[accepted]
+        pending = pending[np.isnan(x[pending])]
+
+    fallback = np.flatnonzero(np.isnan(x) & ~shapely.is_empty(geometries))
+    if len(fallback):
+        points = shapely.point_on_surface(geometries[fallback])
+        x[fallback] = shapely.get_x(points)
+        y[fallback] = shapely.get_y(points)
+    return x, y
+
+
+def randomize_locations(
+    events,
+    polygons,
+    polygon_id="ZCTA5CE10",
+    x="longitude",
+    y="latitude",
+    seed=None,
+):
+    """
+    Replace every event's location with a random point of the polygon containing it.
+
+    Events are joined onto `polygons`, then all points are sampled at once, grouped by polygon. Events outside every
+    polygon are dropped.
+
+    Returns:
+        GeoDataFrame of the joined events with `randomized_x` and `randomized_y` columns.
+    """
+    joined = join_polygons(events, polygons, polygon_id=polygon_id, x=x, y=y)
+    joined = joined[joined[polygon_id].notna()].copy()
+
+    codes, ids = pd.factorize(joined[polygon_id])
+    polygon_geometries = (
+        polygons.drop_duplicates(polygon_id).set_index(polygon_id).geometry.loc[ids]
+    )
+    geometries = polygon_geometries.to_numpy()[codes]
+    joined["randomized_x"], joined["randomized_y"] = sample_points_in_polygons(
+        geometries, seed=seed
+    )
+    logger.info(
+        f"{len(joined)} of {len(events)} events randomized within {len(ids)} polygons."
+    )
+    return joined
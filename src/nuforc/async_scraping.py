@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import time
+
+import aiohttp
+from bs4 import BeautifulSoup
+from tqdm.autonotebook import tqdm
+
+from src.nuforc.event_io import EventStoreWriter
+from src.nuforc.scraping import NUFORCScraper, make_raw_event
+from src.nuforc.wrangling import RawEventProcessor
+
+logger = logging.getLogger("model.modules.scraping")
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; rv:91.0) Gecko/20100101 Firefox/91.0"
+}
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket; refills `rate` tokens per second up to `capacity` and makes `acquire` wait for a token.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError(f"Token bucket rate must be positive, got {rate}.")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class AsyncNUFORCScraper(NUFORCScraper):
+    """
+    NUFORCScraper running on a single asyncio event loop with one shared keep-alive connection pool.
+
+    Monthly index pages are parsed as soon as they arrive and their event URLs are queued straight to the event
+    workers, so event downloads start before the last index page is fetched; events are flushed to the output file in
+    batches as in NUFORCScraper. Concurrency is bounded by the connection
+    pool (`max_connections`, `max_connections_per_host`) and request rate by a token bucket (`requests_per_second`).
+    """
+
+    def __init__(
+        self,
+        scraping_mode="full",
+        timespan_start=None,
+        timespan_end=None,
+        n_scraping_retries=10,
+        output_folder="output",
+        batch_size=1000,
+        max_connections=32,
+        max_connections_per_host=16,
+        requests_per_second=20.0,
+        request_timeout=30,
+        headers=DEFAULT_HEADERS,
+        metrics_format="prom",
+    ):
+        super().__init__(
+            scraping_mode=scraping_mode,
+            timespan_start=timespan_start,
+            timespan_end=timespan_end,
+            n_scraping_retries=n_scraping_retries,
+            output_folder=output_folder,
+            max_workers=max_connections,
+            batch_size=batch_size,
+            metrics_format=metrics_format,
+        )
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.requests_per_second = requests_per_second
+        self.request_timeout = request_timeout
+        self.headers = headers
+
+    async def _fetch(self, session, rate_limiter, url, page_label="", stage="fetch"):
+        """
+        Download a page, retrying connection errors and timeouts with exponential backoff. The download time, retries
+        included, is recorded under `stage`.
+
+        Returns:
+            (status code, page text), or (None, None) once retries run out.
+        """
+        start = time.perf_counter()
+        for attempt in range(1, self.n_scraping_retries + 1):
+            await rate_limiter.acquire()
+            try:
+                async with session.get(url) as response:
+                    text = await response.text(errors="replace")
+                    logger.debug(f"{page_label} {url} downloaded.")
+                    self.metrics.observe(stage, time.perf_counter() - start)
+                    self.metrics.record_status(stage, response.status)
+                    return response.status, text
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt < self.n_scraping_retries:
+                    logger.warning(
+                        f"{page_label} {url} download failed. Retries left: {self.n_scraping_retries - attempt}. Cause: {e!r}"
+                    )
+                    self.metrics.record_retry(stage, type(e).__name__)
+                    await asyncio.sleep(min(0.1 * 2**attempt, 10))
+        logger.critical(f"{page_label} {url} download failed after max retries.")
+        self.metrics.inc("failed_downloads", stage=stage)
+        return None, None
+
+    def _read_month_root_page(self, page_text):
+        with self.metrics.time("html_parse"):
+            soup = BeautifulSoup(page_text, "html.parser")
+            return list(self.iter_event_urls(soup))
+
+    def _read_event(self, event_url, status_code, page_text):
+        with self.metrics.time("html_parse"):
+            raw_event = make_raw_event(status_code, page_text)
+        with self.metrics.time("field_extraction"):
+            return RawEventProcessor(
+                raw_event=raw_event, report_url=event_url
+            ).read_event()
+
+    async def _produce_event_urls(self, session, rate_limiter, month_root_urls, queue):
+        # Producers share one iterator of month URLs, so only a handful of index pages are in flight at a time.
+        loop = asyncio.get_running_loop()
+        for month_root_url in month_root_urls:
+            try:
+                status_code, page_text = await self._fetch(
+                    session,
+                    rate_limiter,
+                    month_root_url,
+                    page_label="Month root page",
+                    stage="index_fetch",
+                )
+                if status_code != 200:
+                    logger.critical(
+                        f"Month root page at {month_root_url} could not be read."
+                    )
+                    continue
+                # HTML parsing is CPU-bound; keep it off the event loop so downloads continue meanwhile.
+                event_urls = await loop.run_in_executor(
+                    None, self._read_month_root_page, page_text
+                )
+            except Exception:
+                # As in `iter_month_event_urls`: one bad month must not stop the producers, or the workers never
+                # get their sentinels and the whole run is aborted.
+                logger.critical(
+                    f"Month root page at {month_root_url} returned an unhandled exception during scraping attempt."
+                )
+                continue
+            for event_url in event_urls:
+                await queue.put(event_url)
+
+    async def _consume_event_urls(
+        self, session, rate_limiter, queue, seen, batch, sink, progress
+    ):
+        loop = asyncio.get_running_loop()
+        while True:
+            event_url = await queue.get()
+            try:
+                if event_url is None:
+                    return
+                if event_url in seen:
+                    continue
+                seen.add(event_url)
+                status_code, page_text = await self._fetch(
+                    session,
+                    rate_limiter,
+                    event_url,
+                    page_label="Event page",
+                    stage="event_fetch",
+                )
+                event = await loop.run_in_executor(
+                    None, self._read_event, event_url, status_code, page_text
+                )
+                batch.append(event)
+                if len(batch) >= self.batch_size:
+                    self.write_batch(sink, batch)
+                    batch.clear()
+                progress.update()
+            except Exception as e:
+                self.metrics.inc("failed_events")
+                logger.critical(
+                    f"NUFORC event at {event_url} returned an unhandled exception during scraping attempt. {e}"
+                )
+            finally:
+                queue.task_done()
+
+    async def _scrape(self, month_root_urls, sink):
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections, limit_per_host=self.max_connections_per_host
+        )
+        timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+        rate_limiter = TokenBucket(self.requests_per_second)
+        n_workers = self.max_connections
+        n_producers = max(1, n_workers // 8)
+        queue = asyncio.Queue(maxsize=n_workers * 16)
+        month_root_urls = iter(month_root_urls)
+        seen = set()
+        batch = []
+
+        async with aiohttp.ClientSession(
+            connector=connector, timeout=timeout, headers=self.headers
+        ) as session:
+            with tqdm(desc="Reading events. ") as progress:
+                workers = [
+                    asyncio.ensure_future(
+                        self._consume_event_urls(
+                            session, rate_limiter, queue, seen, batch, sink, progress
+                        )
+                    )
+                    for _ in range(n_workers)
+                ]
+                await asyncio.gather(
+                    *(
+                        self._produce_event_urls(
+                            session, rate_limiter, month_root_urls, queue
+                        )
+                        for _ in range(n_producers)
+                    )
+                )
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+        self.write_batch(sink, batch)
+
+    def scrape(self):
+        self.month_root_urls_to_scrape = self.select_month_root_urls()
+        logger.info(
+            f"Scraping events from {self.timespan_start} to {self.timespan_end} "
+            f"across {len(self.month_root_urls_to_scrape)} monthly index pages."
+        )
+        self.events_path = self.make_events_path()
+        with EventStoreWriter(self.events_path, row_group_size=self.batch_size) as sink:
+            asyncio.run(self._scrape(self.month_root_urls_to_scrape, sink))
+        self.n_events = sink.n_events
+        logger.info(f"{self.n_events} events saved @ {self.events_path}")
+        self.report_metrics()
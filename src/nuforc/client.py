@@ -1,5 +1,8 @@
-from requests import session
+from requests import Response, session
 from requests.adapters import HTTPAdapter, Retry
+from requests.structures import CaseInsensitiveDict
+
+from .http_cache import ResponseCache
 
 
 class NUFORC_HTTP_Client:
@@ -9,6 +12,7 @@ class NUFORC_HTTP_Client:
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; rv:91.0) Gecko/20100101 Firefox/91.0"
         },
         n_retries=10,
+        cache_dir=None,
     ):
         self.session = session()
 
@@ -22,6 +26,32 @@ class NUFORC_HTTP_Client:
 
         self.session.mount("http://", HTTPAdapter(max_retries=self._n_retries))
 
+        # Set response cache; pages are revalidated with conditional requests.
+        self.cache = ResponseCache(cache_dir) if cache_dir is not None else None
+
+    def _make_cached_response(self, url, not_modified_response):
+        entry = self.cache.get(url)
+        response = Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = url
+        response._content = entry["body"]
+        response.headers = CaseInsensitiveDict(not_modified_response.headers)
+        response.headers.update(entry["headers"])
+        response.request = not_modified_response.request
+        response.elapsed = not_modified_response.elapsed
+        response.from_cache = True
+        return response
+
     def get_response(self, url):
-        response = self.session.get(url, headers=self._headers)
+        if self.cache is None:
+            return self.session.get(url, headers=self._headers)
+
+        headers = {**self._headers, **self.cache.conditional_headers(url)}
+        response = self.session.get(url, headers=headers)
+        if response.status_code == 304 and self.cache.get(url) is not None:
+            return self._make_cached_response(url, response)
+        if response.status_code == 200:
+            self.cache.store(url, response.headers, response.content)
+        response.from_cache = False
         return response
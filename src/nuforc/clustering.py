@@ -0,0 +1,386 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.neighbors import BallTree
+
+logger = logging.getLogger("model.modules.clustering")
+
+"""
+Spatiotemporal clustering of geocoded events (ST-DBSCAN) to flag flaps, bursts of reports close in space and time.
+"""
+
+EARTH_RADIUS_KM = 6371.0088
+NOISE = -1
+ASSIGNMENT_SCHEMA = pa.schema(
+    [
+        ("hash", pa.string()),
+        ("occurred_time", pa.timestamp("s")),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("cluster_id", pa.int64()),
+    ]
+)
+_PARAMETERS_KEY = b"nuforc.cluster_parameters"
+
+
+def neighbor_pairs(latitude, longitude, times, eps_km, eps_time):
+    """
+    Pairs of points at most `eps_km` apart on the sphere and `eps_time` apart in time. Points are bucketed by time in
+    `eps_time` buckets, so each bucket is only searched against itself and the next one, with a BallTree on haversine
+    distances.
+
+    Args:
+        latitude, longitude: Degrees.
+        times: datetime64 array without missing values.
+        eps_time: Timedelta.
+
+    Returns:
+        (i, j) index arrays with i < j, every pair once.
+    """
+    # Milliseconds, so sub-second times and fractional windows are compared exactly.
+    eps_ms = max(pd.Timedelta(eps_time) / pd.Timedelta(1, "ms"), 1.0)
+    milliseconds = np.asarray(times, dtype="datetime64[ms]").astype(np.int64)
+    order = np.argsort(milliseconds, kind="stable")
+    milliseconds = milliseconds[order]
+    coordinates = np.radians(
+        np.column_stack([np.asarray(latitude)[order], np.asarray(longitude)[order]])
+    )
+    buckets = np.floor_divide(milliseconds, eps_ms)
+    bucket_values, bucket_starts = np.unique(buckets, return_index=True)
+    bucket_ends = np.append(bucket_starts[1:], len(buckets))
+    radius = eps_km / EARTH_RADIUS_KM
+
+    first, second = [], []
+    for k, (start, end) in enumerate(zip(bucket_starts, bucket_ends)):
+        # Candidates: this bucket and the next one, a contiguous run of the time-sorted points.
+        stop = (
+            bucket_ends[k + 1]
+            if k + 1 < len(bucket_values)
+            and bucket_values[k + 1] == bucket_values[k] + 1
+            else end
+        )
+        if stop - start < 2:
+            continue
+        tree = BallTree(coordinates[start:stop], metric="haversine")
+        neighbors = tree.query_radius(coordinates[start:end], r=radius)
+        counts = np.fromiter(map(len, neighbors), dtype=np.int64, count=end - start)
+        i = np.repeat(np.arange(start, end), counts)
+        j = np.concatenate(neighbors) + start
+        keep = (j > i) & (milliseconds[j] - milliseconds[i] <= eps_ms)
+        first.append(i[keep])
+        second.append(j[keep])
+
+    if not first:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return order[np.concatenate(first)], order[np.concatenate(second)]
+
+
+def st_dbscan(latitude, longitude, times, eps_km=30, eps_time="1D", min_samples=5):
+    """
+    ST-DBSCAN: points with at least `min_samples` points (themselves included) within `eps_km` and `eps_time` are
+    core points, connected cores form a cluster and other points join the cluster of a core neighbor.
+
+    Returns:
+        int64 labels, `NOISE` (-1) for points outside every cluster; clusters are numbered in order of their first
+        point in the input.
+    """
+    n = len(latitude)
+    labels = np.full(n, NOISE, dtype=np.int64)
+    i, j = neighbor_pairs(latitude, longitude, times, eps_km, eps_time)
+    degree = np.bincount(np.concatenate([i, j]), minlength=n) + 1
+    is_core = degree >= min_samples
+    if not is_core.any():
+        return labels
+
+    core_edges = is_core[i] & is_core[j]
+    graph = coo_matrix(
+        (np.ones(core_edges.sum(), dtype=np.int8), (i[core_edges], j[core_edges])),
+        shape=(n, n),
+    )
+    _, components = connected_components(graph, directed=False)
+    labels[is_core] = components[is_core]
+
+    # Border points take the cluster of their first core neighbor.
+    border_first = np.concatenate(
+        [i[is_core[j] & ~is_core[i]], j[is_core[i] & ~is_core[j]]]
+    )
+    border_core = np.concatenate(
+        [j[is_core[j] & ~is_core[i]], i[is_core[i] & ~is_core[j]]]
+    )
+    order = np.lexsort((border_core, border_first))
+    border_first, border_core = border_first[order], border_core[order]
+    is_first = np.r_[True, border_first[1:] != border_first[:-1]][: len(order)]
+    labels[border_first[is_first]] = labels[border_core[is_first]]
+
+    clustered = labels != NOISE
+    _, first_positions, inverse = np.unique(
+        labels[clustered], return_index=True, return_inverse=True
+    )
+    labels[clustered] = np.argsort(np.argsort(first_positions))[inverse]
+    return labels
+
+
+def cluster_events(
+    events, eps_km=30, eps_time="1D", min_samples=5, time_column="occurred_time"
+):
+    """
+    `st_dbscan` cluster ids of events with `latitude`, `longitude` and `time_column` columns, as a Series aligned with
+    `events`; events missing any of them are `NOISE`.
+    """
+    times = pd.to_datetime(events[time_column], errors="coerce")
+    located = (
+        events["latitude"].notna().to_numpy()
+        & events["longitude"].notna().to_numpy()
+        & times.notna().to_numpy()
+    )
+    cluster_ids = np.full(len(events), NOISE, dtype=np.int64)
+    cluster_ids[located] = st_dbscan(
+        events["latitude"].to_numpy(float)[located],
+        events["longitude"].to_numpy(float)[located],
+        times.to_numpy()[located],
+        eps_km=eps_km,
+        eps_time=eps_time,
+        min_samples=min_samples,
+    )
+    return pd.Series(cluster_ids, index=events.index, name="cluster_id")
+
+
+def summarize_clusters(events, time_column="occurred_time"):
+    """
+    One row per cluster of events with a `cluster_id` column: size, time span, centroid and most common shape.
+    """
+    clustered = events[events["cluster_id"] != NOISE]
+    groups = clustered.groupby("cluster_id")
+    summary = groups.agg(
+        n_events=("cluster_id", "size"),
+        start=(time_column, "min"),
+        end=(time_column, "max"),
+        latitude=("latitude", "mean"),
+        longitude=("longitude", "mean"),
+    )
+    if "shape" in clustered.columns:
+        summary["shape"] = groups["shape"].agg(
+            lambda shapes: shapes.mode().iat[0] if shapes.notna().any() else None
+        )
+    return summary.sort_values("n_events", ascending=False)
+
+
+class ClusterStore:
+    """
+    Cluster ids of geocoded events in one Parquet file, extended incrementally: new events are clustered together with
+    the stored events within `window` of them, so a day of reports is processed in seconds. Cluster ids are stable;
+    clusters joined by new events keep the lowest id. Results match a full `cluster_events` run except for clusters
+    spanning more than `window` around the new events.
+
+    Args:
+        path: Assignment file; an empty store if it does not exist yet.
+        eps_km, eps_time, min_samples: `st_dbscan` parameters, fixed when the file is created.
+        window: How far back and ahead of new events stored events are reclustered.
+    """
+
+    def __init__(self, path, eps_km=30, eps_time="1D", min_samples=5, window="30D"):
+        self.path = Path(path)
+        self.eps_km = float(eps_km)
+        self.eps_time = pd.Timedelta(eps_time)
+        self.min_samples = int(min_samples)
+        self.window = pd.Timedelta(window)
+        parameters = {
+            "eps_km": self.eps_km,
+            "eps_seconds": self.eps_time.total_seconds(),
+            "min_samples": self.min_samples,
+        }
+        if self.path.exists():
+            table = pq.read_table(self.path)
+            stored = json.loads((table.schema.metadata or {})[_PARAMETERS_KEY])
+            if stored != parameters:
+                raise ValueError(
+                    f"Clusters @ {self.path} were built with {stored}, not {parameters}."
+                )
+            self.assignments = table.to_pandas()
+        else:
+            self.assignments = ASSIGNMENT_SCHEMA.empty_table().to_pandas()
+        self.parameters = parameters
+
+    def __len__(self):
+        return len(self.assignments)
+
+    def add_events(self, events):
+        """
+        Cluster events whose `hash` is not stored yet with the stored events around them, and save the store.
+
+        Args:
+            events: DataFrame with `hash`, `occurred_time`, `latitude` and `longitude` columns, e.g. from
+                `make_playset`; events without coordinates or time are stored as noise.
+
+        Returns:
+            `hash` and `cluster_id` of the new events.
+        """
+        new = (
+            events[~self._is_stored(events["hash"])]
+            .drop_duplicates("hash")[
+                [name for name in ASSIGNMENT_SCHEMA.names if name != "cluster_id"]
+            ]
+            .assign(
+                occurred_time=lambda df: pd.to_datetime(
+                    df["occurred_time"], errors="coerce"
+                )
+            )
+            .reset_index(drop=True)
+        )
+        if new.empty:
+            return new.assign(cluster_id=pd.Series(dtype="int64"))[
+                ["hash", "cluster_id"]
+            ]
+
+        stored = self.assignments
+        nearby = self._near(stored["occurred_time"], new["occurred_time"])
+        batch = pd.concat(
+            [stored[nearby].drop(columns="cluster_id"), new], ignore_index=True
+        )
+        labels = cluster_events(
+            batch,
+            eps_km=self.eps_km,
+            eps_time=self.eps_time,
+            min_samples=self.min_samples,
+        ).to_numpy()
+        old_ids = np.concatenate(
+            [
+                stored.loc[nearby, "cluster_id"].to_numpy(np.int64),
+                np.full(len(new), NOISE),
+            ]
+        )
+        cluster_ids, merged = self._merge_labels(labels, old_ids)
+
+        stored_ids = stored["cluster_id"].to_numpy(np.int64).copy()
+        stored_ids[nearby.to_numpy()] = cluster_ids[: nearby.sum()]
+        self.assignments = pd.concat(
+            [
+                stored.assign(cluster_id=stored_ids),
+                new.assign(cluster_id=cluster_ids[nearby.sum() :]),
+            ],
+            ignore_index=True,
+        )
+        if merged:
+            self.assignments["cluster_id"] = self.assignments["cluster_id"].replace(
+                merged
+            )
+        self.save()
+        n_clustered = int(
+            (self.assignments["cluster_id"].iloc[len(stored) :] != NOISE).sum()
+        )
+        logger.info(
+            f"{n_clustered} of {len(new)} new events in clusters; {len(stored[nearby])} stored events reclustered."
+        )
+        return self.assignments.iloc[len(stored) :][["hash", "cluster_id"]].reset_index(
+            drop=True
+        )
+
+    def _is_stored(self, hashes):
+        # Arrow's hash-based lookup; pandas' `isin` on string columns walks the stored hashes in Python.
+        is_stored = pc.is_in(
+            pa.array(hashes.astype(object), type=pa.string()),
+            value_set=pa.array(
+                self.assignments["hash"].astype(object), type=pa.string()
+            ),
+        )
+        return is_stored.to_numpy(zero_copy_only=False)
+
+    def _near(self, stored_times, new_times):
+        """
+        Mask of stored events within `window` of some new event.
+        """
+        new_times = np.sort(new_times.dropna().to_numpy())
+        if not len(new_times):
+            return pd.Series(False, index=stored_times.index)
+        times = stored_times.to_numpy()
+        position = np.searchsorted(new_times, times)
+        before = new_times[np.clip(position - 1, 0, len(new_times) - 1)]
+        after = new_times[np.clip(position, 0, len(new_times) - 1)]
+        distance = np.minimum(np.abs(times - before), np.abs(after - times))
+        return pd.Series(
+            stored_times.notna().to_numpy()
+            & (distance <= self.window.to_timedelta64()),
+            index=stored_times.index,
+        )
+
+    def _merge_labels(self, labels, old_ids):
+        """
+        Stable ids for batch labels: batch clusters sharing stored ids, directly or through other batch clusters, all
+        take the lowest of those ids; the others get new ids. Stored events never fall back to noise.
+
+        Returns:
+            (cluster ids, dict of stored ids merged into a lower one -> that id)
+        """
+        cluster_ids = old_ids.copy()
+        in_cluster = labels != NOISE
+        if not in_cluster.any():
+            return cluster_ids, {}
+        next_id = int(self.assignments["cluster_id"].max() + 1) if len(self) else 0
+
+        # Graph of batch labels (nodes 0..n_labels-1) linked to the stored ids of their events (the nodes after).
+        _, label_index = np.unique(labels[in_cluster], return_inverse=True)
+        n_labels = label_index.max() + 1
+        has_id = old_ids[in_cluster] != NOISE
+        stored_ids, id_index = np.unique(
+            old_ids[in_cluster][has_id], return_inverse=True
+        )
+        n_nodes = n_labels + len(stored_ids)
+        graph = coo_matrix(
+            (
+                np.ones(has_id.sum(), dtype=np.int8),
+                (label_index[has_id], n_labels + id_index),
+            ),
+            shape=(n_nodes, n_nodes),
+        )
+        _, component = connected_components(graph, directed=False)
+
+        # Every component holds a batch label; it takes its lowest stored id, else a new id in order of its labels.
+        n_components = component.max() + 1
+        target = np.full(n_components, np.iinfo(np.int64).max)
+        np.minimum.at(target, component[n_labels:], stored_ids)
+        first_label = np.full(n_components, n_labels)
+        np.minimum.at(first_label, component[:n_labels], np.arange(n_labels))
+        without_id = np.flatnonzero(target == np.iinfo(np.int64).max)
+        without_id = without_id[np.argsort(first_label[without_id], kind="stable")]
+        target[without_id] = next_id + np.arange(len(without_id))
+
+        cluster_ids[in_cluster] = target[component[label_index]]
+        stored_targets = target[component[n_labels:]]
+        is_merged = stored_targets != stored_ids
+        merged = dict(
+            zip(
+                stored_ids[is_merged].tolist(),
+                stored_targets[is_merged].tolist(),
+            )
+        )
+        return cluster_ids, merged
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(
+            self.assignments, schema=ASSIGNMENT_SCHEMA, preserve_index=False
+        ).replace_schema_metadata(
+            {_PARAMETERS_KEY: json.dumps(self.parameters).encode()}
+        )
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, self.path)
+
+    def join(self, events):
+        """
+        `events` with the `cluster_id` of every stored event joined on `hash`; events not stored yet are `NOISE`.
+        """
+        joined = events.merge(
+            self.assignments[["hash", "cluster_id"]], on="hash", how="left"
+        )
+        joined["cluster_id"] = joined["cluster_id"].fillna(NOISE).astype("int64")
+        return joined
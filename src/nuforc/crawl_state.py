@@ -0,0 +1,103 @@
+import json
+import logging
+import re
+from pathlib import Path
+
+logger = logging.getLogger("model.modules.scraping")
+
+"""
+What previous crawls have already stored, for incremental crawling.
+"""
+
+REPORT_COUNT_REGEX = re.compile(r"\d[\d,]*")
+
+
+def parse_report_count(text):
+    """
+    Read the report count of a monthly index row of `ndxevent.html`, e.g. `1,024`.
+
+    Returns:
+        Report count as an int, or None if the text holds no number.
+    """
+    if text is None:
+        return None
+    match = REPORT_COUNT_REGEX.search(text)
+    if match is None:
+        return None
+    return int(match.group().replace(",", ""))
+
+
+class CrawlState:
+    """
+    Report count of every monthly index as of the last finished crawl; stored events are looked up in the `HashIndex`.
+    """
+
+    state_filename = "crawl_state.json"
+
+    def __init__(self, month_report_counts=None):
+        self.month_report_counts = dict(month_report_counts or {})
+        # Months being crawled: month URL -> [report count, events left to process, whether one failed].
+        self.pending_months = {}
+
+    @classmethod
+    def load(cls, data_dir):
+        """
+        Load the crawl state kept under `data_dir`, the `DATA_DIR` the Scrapy pipelines write to.
+        """
+        month_report_counts = {}
+        state_path = Path(data_dir) / cls.state_filename
+        if state_path.exists():
+            with open(state_path, encoding="utf-8") as f:
+                month_report_counts = json.load(f)["month_report_counts"]
+
+        logger.info(f"Crawl state loaded: {len(month_report_counts)} monthly indexes.")
+        return cls(month_report_counts=month_report_counts)
+
+    def save(self, data_dir):
+        """
+        Persist the monthly index report counts.
+        """
+        state_path = Path(data_dir) / self.state_filename
+        temporary_path = state_path.with_name(f"{state_path.name}.tmp")
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump({"month_report_counts": self.month_report_counts}, f, indent=1)
+        temporary_path.replace(state_path)
+
+    def is_month_changed(self, month_url, report_count):
+        # Months without a readable count are always treated as changed.
+        if report_count is None:
+            return True
+        return self.month_report_counts.get(month_url) != report_count
+
+    def start_month(self, month_url, report_count):
+        """
+        Track a month being crawled; its report count is only recorded once all its events are processed, so a month
+        whose crawl fails or is interrupted is crawled again next time.
+        """
+        if report_count is not None:
+            self.pending_months[month_url] = [report_count, None, False]
+
+    def expect_events(self, month_url, n_events):
+        """
+        Set how many event pages of a month's index are being requested.
+        """
+        month = self.pending_months.get(month_url)
+        if month is None:
+            return
+        month[1] = n_events
+        if n_events == 0:
+            self._finish_month(month_url)
+
+    def finish_event(self, month_url, succeeded=True):
+        month = self.pending_months.get(month_url)
+        if month is None or month[1] is None:
+            return
+        month[1] -= 1
+        month[2] = month[2] or not succeeded
+        if month[1] <= 0:
+            self._finish_month(month_url)
+
+    def _finish_month(self, month_url):
+        report_count, _, failed = self.pending_months.pop(month_url)
+        if not failed:
+            self.month_report_counts[month_url] = report_count
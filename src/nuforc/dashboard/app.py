@@ -1,7 +1,28 @@
+import os
+import sys
+from pathlib import Path
+
 import geopandas as gpd
 from greppo import app
 
-events = gpd.read_file(r"nuforc_geojson.json")
+# greppo serves the app from its own directory, src/nuforc/dashboard.
+sys.path.append(str(Path.cwd().parents[1]))
+from nuforc.dashboard.data import get_dashboard_data, get_rollup_cube
+
+# "tiles" loads only the small overview layer and fetches pre-rendered event tiles per view (see
+# make_dashboard_layers.py); "geojson" loads every event at startup.
+DASHBOARD_MODE = os.environ.get("DASHBOARD_MODE", "tiles")
+DASHBOARD_LAYERS_DIR = Path(os.environ.get("DASHBOARD_LAYERS_DIR", "dashboard_layers"))
+# Where the tiles are served, e.g. by `python -m http.server 8001 --directory dashboard_layers`.
+DASHBOARD_TILES_URL = os.environ.get(
+    "DASHBOARD_TILES_URL", "http://localhost:8001/tiles/{z}/{x}/{y}.png"
+)
+# Event counts kept up to date by the crawls (see build_rollup_cube.py).
+ROLLUP_CUBE_PATH = Path(
+    os.environ.get(
+        "ROLLUP_CUBE_PATH", Path.cwd().parents[2] / "data" / "rollup_cube.parquet"
+    )
+)
 
 app.base_layer(
     name="Open Street Map",
@@ -11,11 +32,65 @@ app.base_layer(
     attribution="(C) OpenStreetMap contributors",
 )
 
+if DASHBOARD_MODE == "tiles":
+    app.base_layer(
+        name="UFO Events",
+        visible=True,
+        url=DASHBOARD_TILES_URL,
+        subdomains=None,
+        attribution="NUFORC",
+    )
 
-app.vector_layer(
-    data=events,
-    name="UFO Events",
-)
+    overview = gpd.read_file(DASHBOARD_LAYERS_DIR / "overview.geojson")
+    app.vector_layer(
+        data=overview,
+        name="UFO Events overview",
+        visible=False,
+    )
+
+    # Only the events in this window are read, from row groups of events.parquet that can hold them.
+    min_longitude = app.number(name="Min longitude", value=-90.0)
+    max_longitude = app.number(name="Max longitude", value=-80.0)
+    min_latitude = app.number(name="Min latitude", value=38.0)
+    max_latitude = app.number(name="Max latitude", value=44.0)
+    start_year = app.number(name="From year", value=2010)
+    end_year = app.number(name="To year", value=2014)
+
+    window_events = get_dashboard_data(DASHBOARD_LAYERS_DIR / "events.parquet").query(
+        bbox=(min_longitude, min_latitude, max_longitude, max_latitude),
+        start=f"{int(start_year)}-01-01",
+        end=f"{int(end_year) + 1}-01-01",
+        columns=("shape", "occurred_time"),
+    )
+    app.vector_layer(
+        data=window_events.assign(
+            occurred_time=window_events["occurred_time"].astype(str)
+        ),
+        name="UFO Events in window",
+        visible=True,
+    )
+
+    if ROLLUP_CUBE_PATH.exists():
+        # Served from the rollup cube, so the chart never scans the events.
+        monthly_counts = get_rollup_cube(ROLLUP_CUBE_PATH).query(
+            period="month",
+            start=f"{int(start_year)}-01-01",
+            end=f"{int(end_year) + 1}-01-01",
+        )
+        app.line_chart(
+            name="Reports per month",
+            description="UFO reports per month of occurrence in the selected years.",
+            x=[str(period) for period in monthly_counts.index],
+            y=monthly_counts["count"].tolist(),
+            color="#984ea3",
+        )
+else:
+    events = gpd.read_file(r"nuforc_geojson.json")
+
+    app.vector_layer(
+        data=events,
+        name="UFO Events",
+    )
 
 
 app.base_layer(provider="CartoDB Positron")
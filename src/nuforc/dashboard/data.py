@@ -0,0 +1,165 @@
+import logging
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from ..rollup import RollupCube
+
+logger = logging.getLogger("model.modules.visualisation")
+
+"""
+Viewport and time window queries over a GeoParquet events file, for the dashboard.
+"""
+
+
+def _interleave_bits(values, n_bits):
+    result = np.zeros(len(values), dtype=np.int64)
+    for bit in range(n_bits):
+        result |= ((values >> bit) & 1) << (2 * bit)
+    return result
+
+
+def spatial_sort_key(longitude, latitude):
+    """
+    Z-order (Morton) code of the 1° cell of every point, so points sorted by it are stored close in space.
+    """
+    x = np.clip(np.floor(np.asarray(longitude) + 180), 0, 359).astype(np.int64)
+    y = np.clip(np.floor(np.asarray(latitude) + 90), 0, 179).astype(np.int64)
+    return _interleave_bits(x, 9) | (_interleave_bits(y, 9) << 1)
+
+
+def write_dashboard_events(
+    gdf, path, time_column="occurred_time", row_group_size=5000, years_per_slab=10
+):
+    """
+    Write events as GeoParquet laid out for pruning: rows are sorted by `years_per_slab` time slab, then spatially, so
+    every row group covers a compact area and time span and its min/max statistics rule it out for most queries.
+    Plain `longitude` and `latitude` columns are added for those statistics.
+    """
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(4326)
+    gdf = gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty].copy()
+    gdf["longitude"] = gdf.geometry.x
+    gdf["latitude"] = gdf.geometry.y
+    gdf[time_column] = pd.to_datetime(gdf[time_column], errors="coerce")
+
+    slab = (gdf[time_column].dt.year // years_per_slab).fillna(-1).to_numpy(int)
+    order = np.lexsort(
+        (
+            gdf[time_column].to_numpy(),
+            spatial_sort_key(gdf["longitude"], gdf["latitude"]),
+            slab,
+        )
+    )
+    gdf = gdf.iloc[order].reset_index(drop=True)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = path.with_name(f"{path.name}.tmp{os.getpid()}")
+    gdf.to_parquet(temporary_path, index=False, row_group_size=row_group_size)
+    os.replace(temporary_path, path)
+    logger.info(f"{len(gdf)} dashboard events written to {path}.")
+
+
+class DashboardData:
+    """
+    Reads events written by `write_dashboard_events`, keeping only the requested columns and the rows in a bounding
+    box and time window; row groups whose statistics fall outside them are skipped unread. The `cache_size` most
+    recent query results are kept; they are shared, so do not modify them.
+
+    Args:
+        path: GeoParquet events file.
+        time_column: Timestamp column `start`/`end` filter on.
+    """
+
+    def __init__(self, path, time_column="occurred_time", cache_size=64):
+        self.path = Path(path)
+        self.time_column = time_column
+        self._dataset = ds.dataset(str(self.path), format="parquet")
+        self._time_type = self._dataset.schema.field(time_column).type
+        self._query = lru_cache(maxsize=cache_size)(self._read)
+
+    def _read(self, bbox, start, end, columns):
+        expression = ds.scalar(True)
+        if bbox is not None:
+            min_longitude, min_latitude, max_longitude, max_latitude = bbox
+            expression &= (ds.field("longitude") >= min_longitude) & (
+                ds.field("longitude") <= max_longitude
+            )
+            expression &= (ds.field("latitude") >= min_latitude) & (
+                ds.field("latitude") <= max_latitude
+            )
+        if start is not None:
+            expression &= ds.field(self.time_column) >= pa.scalar(
+                start, type=self._time_type
+            )
+        if end is not None:
+            expression &= ds.field(self.time_column) < pa.scalar(
+                end, type=self._time_type
+            )
+
+        if columns is not None:
+            columns = list(dict.fromkeys([*columns, "longitude", "latitude"]))
+        else:
+            columns = [
+                name for name in self._dataset.schema.names if name != "geometry"
+            ]
+        df = self._dataset.to_table(columns=columns, filter=expression).to_pandas()
+        # Points are rebuilt from the coordinate columns, so the WKB geometry column is never read.
+        return gpd.GeoDataFrame(
+            df,
+            geometry=gpd.points_from_xy(df["longitude"], df["latitude"]),
+            crs=4326,
+        )
+
+    def query(self, bbox=None, start=None, end=None, columns=None):
+        """
+        Args:
+            bbox: (min_longitude, min_latitude, max_longitude, max_latitude), or None for everywhere.
+            start: First time included, or None.
+            end: First time excluded, or None.
+            columns: Columns to read besides `longitude` and `latitude`; None reads them all.
+
+        Returns:
+            GeoDataFrame of the matching events with point geometries.
+        """
+        return self._query(
+            tuple(float(bound) for bound in bbox) if bbox is not None else None,
+            pd.Timestamp(start).to_pydatetime() if start is not None else None,
+            pd.Timestamp(end).to_pydatetime() if end is not None else None,
+            tuple(columns) if columns is not None else None,
+        )
+
+    def cache_info(self):
+        return self._query.cache_info()
+
+
+@lru_cache(maxsize=8)
+def _load_dashboard_data(path, time_column, modified_time):
+    return DashboardData(path, time_column=time_column)
+
+
+def get_dashboard_data(path, time_column="occurred_time"):
+    """
+    Shared `DashboardData` per file, so its query cache outlives the dashboard script, which greppo re-runs on every
+    input change; reloaded once the file is rebuilt.
+    """
+    return _load_dashboard_data(Path(path), time_column, os.stat(path).st_mtime_ns)
+
+
+@lru_cache(maxsize=1)
+def _load_rollup_cube(path, modified_time):
+    return RollupCube(path)
+
+
+def get_rollup_cube(path):
+    """
+    Shared `RollupCube` of the file, reloaded only once a crawl has updated it.
+    """
+    return _load_rollup_cube(Path(path), os.stat(path).st_mtime_ns)
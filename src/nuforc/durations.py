@@ -0,0 +1,134 @@
+import threading
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import parsedatetime
+
+from nuforc.regexes import (
+    DURATION_CHARACTERS_TO_REMOVE_REGEX,
+    DURATION_NUMBER_WORDS,
+    DURATION_REGEX,
+    DURATION_REPLACEMENTS,
+    DURATION_REPLACEMENTS_REGEX,
+    DURATION_UNITS,
+)
+
+"""
+Event duration parsing.
+
+Durations are matched against the precompiled `DURATION_REGEX` grammar and converted to seconds; `parsedatetime` is
+only consulted for strings the grammar does not cover.
+"""
+
+_calendars = threading.local()
+
+
+def _get_calendar():
+    # `parsedatetime.Calendar` keeps per-parse context, so each thread gets its own.
+    if not hasattr(_calendars, "calendar"):
+        _calendars.calendar = parsedatetime.Calendar()
+    return _calendars.calendar
+
+
+def clean_time_string(t):
+    t = str(t).lower().strip()
+    # Splits.
+    if "-" in t:
+        t = t.split("-")[1]
+    # Characters to remove.
+    t = DURATION_CHARACTERS_TO_REMOVE_REGEX.sub("", t)
+    # Sequences to replace.
+    t = DURATION_REPLACEMENTS_REGEX.sub(lambda m: DURATION_REPLACEMENTS[m.group(0)], t)
+    return t
+
+
+def parse_duration(t):
+    """
+    Parse a duration with `parsedatetime`.
+
+    Returns:
+        `timedelta`, or None if `parsedatetime` can't read the string.
+    """
+    t = clean_time_string(t)
+
+    basetime = datetime.now().replace(microsecond=0)
+    time_struct, parse_status = _get_calendar().parse(t, sourceTime=basetime)
+    if parse_status == 0:
+        return None
+
+    parsed = datetime(*time_struct[:6])
+    time = parsed - basetime
+    return time
+
+
+def parse_duration_number(number):
+    number = number.lower()
+    if "/" in number:
+        numerator, denominator = number.split("/")
+        return int(numerator) / int(denominator) if int(denominator) else np.nan
+    word = number.split()[0]
+    if word in DURATION_NUMBER_WORDS:
+        return DURATION_NUMBER_WORDS[word]
+    return float(number)
+
+
+@lru_cache(maxsize=2**16)
+def parse_duration_seconds(text):
+    """
+    Parse a duration such as `5 minutes`, `1-2 hrs` or `30 sec` into seconds.
+
+    Ranges resolve to their upper bound. Strings the duration grammar does not cover fall back to `parse_duration`.
+    Results are cached, so repeated durations are parsed once.
+
+    Args:
+        text: Duration string, e.g. the `Duration:` segment of a report.
+
+    Returns:
+        Duration in seconds as a float, NaN if it can't be parsed.
+    """
+    if text is None:
+        return np.nan
+
+    match = DURATION_REGEX.search(text)
+    if match is not None:
+        number = match.group("upper") or match.group("value")
+        return float(parse_duration_number(number) * DURATION_UNITS[match.lastgroup][0])
+
+    duration = parse_duration(text)
+    # `parsedatetime` reads clock times such as `00:05:00` as a moment of the day, which yields negative offsets.
+    if duration is None or duration.total_seconds() < 0:
+        return np.nan
+    return duration.total_seconds()
+
+
+def parse_durations(durations):
+    """
+    Column-wise `parse_duration_seconds`.
+
+    Args:
+        durations: Series of duration strings.
+
+    Returns:
+        Float Series of durations in seconds, NaN where unparseable or missing.
+    """
+    durations = durations.astype(object).where(durations.notna(), None)
+    parts = durations.str.extract(DURATION_REGEX)
+
+    numbers = parts["upper"].fillna(parts["value"])
+    unique_numbers = numbers.dropna().unique()
+    number_values = dict(
+        zip(unique_numbers, (parse_duration_number(n) for n in unique_numbers))
+    )
+    unit_seconds = pd.Series(np.nan, index=durations.index)
+    for unit, (seconds, _) in DURATION_UNITS.items():
+        unit_seconds = unit_seconds.mask(parts[unit].notna(), seconds)
+    seconds = numbers.map(number_values).astype(float) * unit_seconds
+
+    # Strings outside the duration grammar go through the cached fallback.
+    unmatched = durations[numbers.isna() & durations.notna()]
+    fallback = {
+        duration: parse_duration_seconds(duration) for duration in unmatched.unique()
+    }
+    return seconds.fillna(unmatched.map(fallback)).astype(float)
@@ -0,0 +1,252 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .wrangling import hash_string
+
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+LOCATION_COLUMNS = ["city", "state", "state_abbreviation", "country"]
+
+# Columns of the Parquet event files; times are naive local report times, `duration` is in seconds. Location columns
+# are dictionary-encoded and `location_id` (see `make_location_ids`) keys them into a location table.
+EVENT_SCHEMA = pa.schema(
+    [
+        ("url", pa.string()),
+        ("occurred_time", pa.timestamp("s")),
+        ("reported_time", pa.timestamp("s")),
+        ("entered_as_time", pa.timestamp("s")),
+        ("shape", _CATEGORY),
+        ("duration", pa.float64()),
+        ("city", _CATEGORY),
+        ("state", _CATEGORY),
+        ("state_abbreviation", _CATEGORY),
+        ("country", _CATEGORY),
+        ("location_id", pa.int64()),
+        ("description", pa.string()),
+        ("raw_text", pa.string()),
+        ("hash", pa.string()),
+        ("address", pa.string()),
+    ]
+)
+
+# Columns of a location table: one geocoded row per `location_id`.
+LOCATION_SCHEMA = pa.schema(
+    [
+        ("location_id", pa.int64()),
+        ("city", _CATEGORY),
+        ("state", _CATEGORY),
+        ("state_abbreviation", _CATEGORY),
+        ("country", _CATEGORY),
+        ("address", pa.string()),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+    ]
+)
+
+
+def make_location_ids(df):
+    """
+    Integer id of every row's (city, state, state abbreviation, country): the first 8 bytes of the SHA-256 of the
+    values, so the same location gets the same id in every file, run and library version without a shared registry.
+
+    Returns:
+        int64 array.
+    """
+    locations = df[LOCATION_COLUMNS].astype(object)
+    locations = locations.where(locations.notna(), "").astype(str)
+    keys = locations[LOCATION_COLUMNS[0]].str.cat(
+        [locations[column] for column in LOCATION_COLUMNS[1:]], sep="\x1f"
+    )
+    codes, unique_keys = pd.factorize(keys)
+    ids = np.array(
+        [
+            int.from_bytes(
+                hashlib.sha256(key.encode()).digest()[:8], "little", signed=True
+            )
+            for key in unique_keys
+        ],
+        dtype=np.int64,
+    )
+    return ids[codes]
+
+
+def event_to_record(event):
+    """
+    `EVENT_SCHEMA` record of a `NUFORCEvent`.
+    """
+    record = {name: getattr(event, name, None) for name in EVENT_SCHEMA.names}
+    raw_text = getattr(event, "raw_event", None)
+    record["raw_text"] = raw_text
+    record["hash"] = hash_string(raw_text) if raw_text else None
+    return record
+
+
+def iter_events(path):
+    """
+    Yield events from a legacy events pickle, either a single list or one pickled batch per frame.
+    """
+    with open(path, "rb") as f:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
+
+
+def load_events(path):
+    return list(iter_events(path))
+
+
+def event_keys(events):
+    """
+    Key identifying every event of a DataFrame with `hash` and `url` columns: its content hash, or its URL for events
+    without one, i.e. with empty raw text.
+
+    Returns:
+        Series aligned with `events`.
+    """
+    return events["hash"].where(events["hash"].notna(), events["url"])
+
+
+class ParquetEventWriter:
+    """
+    Buffers event records (mappings of `EVENT_SCHEMA` columns) and writes a Parquet row group every `row_group_size`
+    records. It writes to a temporary file that replaces `path` on `close`, so an aborted crawl leaves the previous output
+    untouched.
+    """
+
+    def __init__(self, path, row_group_size=10000, schema=EVENT_SCHEMA):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.row_group_size = row_group_size
+        self.schema = schema
+        self._tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        self._writer = pq.ParquetWriter(self._tmp_path, schema, compression="zstd")
+        self._columns = {name: [] for name in schema.names}
+        self._n_buffered = 0
+        self.n_events = 0
+
+    def write(self, record):
+        for name, values in self._columns.items():
+            values.append(record.get(name))
+        self._n_buffered += 1
+        if self._n_buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self._n_buffered:
+            return
+        if "location_id" in self.schema.names:
+            self._columns["location_id"] = make_location_ids(
+                pd.DataFrame({name: self._columns[name] for name in LOCATION_COLUMNS})
+            )
+        arrays = [
+            pa.array(self._columns[field.name], type=field.type, from_pandas=True)
+            for field in self.schema
+        ]
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self.n_events += self._n_buffered
+        self._columns = {name: [] for name in self.schema.names}
+        self._n_buffered = 0
+
+    def close(self):
+        if self._writer is None:
+            return
+        self.flush()
+        self._writer.close()
+        self._writer = None
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class EventStoreWriter(ParquetEventWriter):
+    """
+    `ParquetEventWriter` taking batches of `NUFORCEvent`; `row_group_size` events make a row group.
+    """
+
+    def write(self, events):
+        for event in events:
+            super().write(event_to_record(event))
+
+
+def read_event_table(path, columns=None, filters=None):
+    """
+    Memory-mapped read of a Parquet event file, or a directory of them.
+
+    Args:
+        columns: Columns to read; all of `EVENT_SCHEMA` by default.
+        filters: pyarrow filters, e.g. `[("occurred_time", ">=", datetime(2020, 1, 1))]`, used to skip row groups.
+
+    Returns:
+        pyarrow.Table; call `.to_pandas()` for a DataFrame with categorical shape/state/country columns.
+    """
+    return pq.read_table(path, columns=columns, filters=filters, memory_map=True)
+
+
+def read_event_frame(path, columns=None, filters=None):
+    """
+    Events as a DataFrame, from a Parquet event file or a legacy events pickle; location columns and `shape`
+    are categorical and `location_id` is set either way.
+
+    Args:
+        columns: Columns to read; all of `EVENT_SCHEMA` by default.
+        filters: pyarrow filters, applied to Parquet files only.
+    """
+    if Path(path).suffix != ".pkl":
+        return read_event_table(path, columns=columns, filters=filters).to_pandas()
+
+    df = pd.DataFrame.from_records(
+        [event_to_record(event) for event in iter_events(path)],
+        columns=EVENT_SCHEMA.names,
+    )
+    df["location_id"] = make_location_ids(df)
+    df = df.astype({name: "category" for name in ["shape", *LOCATION_COLUMNS]})
+    return df[columns] if columns is not None else df
+
+
+def write_location_table(df, path):
+    """
+    Write the `LOCATION_SCHEMA` columns of `df`, deduplicated on `location_id`, to a Parquet file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df = df.drop_duplicates("location_id")[LOCATION_SCHEMA.names]
+    table = pa.Table.from_pandas(df, schema=LOCATION_SCHEMA, preserve_index=False)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+
+
+def read_location_table(path):
+    """
+    Location table as a DataFrame; also reads a legacy geocoding output pickle of events with coordinates.
+    """
+    if Path(path).suffix != ".pkl":
+        return pq.read_table(path, memory_map=True).to_pandas()
+
+    df = pd.DataFrame(pd.read_pickle(path))
+    df["location_id"] = make_location_ids(df)
+    df = df.rename(columns={"raw_address": "address"}).drop_duplicates("location_id")
+    return df.reindex(columns=LOCATION_SCHEMA.names)
@@ -0,0 +1,272 @@
+import concurrent.futures
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from tqdm.autonotebook import tqdm
+
+logger = logging.getLogger("model.modules.geocoding")
+
+"""
+Batch geocoding of unique addresses through a pluggable backend, checkpointed to a persistent cache.
+"""
+
+
+class GeocodingError(Exception):
+    """
+    Raised by backends for transient failures (timeouts, quota errors); such addresses are retried and never cached.
+    """
+
+
+class NominatimBackend:
+    """
+    Geocoding backend on OpenStreetMap Nominatim through geopy; its usage policy allows one request per second.
+    """
+
+    name = "nominatim"
+
+    def __init__(self, user_agent="nuforc_geocoder", timeout=10):
+        from geopy.exc import GeopyError
+        from geopy.geocoders import Nominatim
+
+        self._geolocator = Nominatim(user_agent=user_agent, timeout=timeout)
+        self._errors = (GeopyError,)
+
+    def geocode(self, address):
+        """
+        Returns:
+            (latitude, longitude), or None if the address is unknown.
+        """
+        try:
+            location = self._geolocator.geocode(address)
+        except self._errors as e:
+            raise GeocodingError(str(e)) from e
+        if location is None:
+            return None
+        return location.latitude, location.longitude
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter spacing calls to `wait` at least `1 / requests_per_second` apart.
+    """
+
+    def __init__(self, requests_per_second):
+        self.min_interval = 1 / requests_per_second if requests_per_second else 0
+        self._next_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.min_interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+class GeocodeCache:
+    """
+    SQLite table of geocoded addresses. Addresses the backend could not resolve are stored too, with null
+    coordinates, so they are not looked up again.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS geocodes (address TEXT PRIMARY KEY, latitude REAL, longitude REAL, "
+            "backend TEXT, geocoded_at TEXT)"
+        )
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM geocodes"
+            ).fetchone()
+        return count
+
+    def get_many(self, addresses, chunksize=500):
+        """
+        Returns:
+            Dict of cached address -> (latitude, longitude), or None for addresses known to be unresolvable.
+        """
+        addresses = list(addresses)
+        found = {}
+        with self._lock:
+            for i in range(0, len(addresses), chunksize):
+                chunk = addresses[i : i + chunksize]
+                rows = self._connection.execute(
+                    f"SELECT address, latitude, longitude FROM geocodes "
+                    f"WHERE address IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                for address, latitude, longitude in rows:
+                    found[address] = None if latitude is None else (latitude, longitude)
+        return found
+
+    def put_many(self, results, backend=None):
+        """
+        Upsert address -> (latitude, longitude) or None results and commit them.
+        """
+        geocoded_at = datetime.now().isoformat(timespec="seconds")
+        rows = [
+            (address, *(coordinates or (None, None)), backend, geocoded_at)
+            for address, coordinates in results.items()
+        ]
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._connection.commit()
+
+    def to_frame(self):
+        with self._lock:
+            return pd.read_sql_query("SELECT * FROM geocodes", self._connection)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class BatchGeocoder:
+    """
+    Geocodes unique addresses, consulting `cache` first and sending only the misses to `backend`, from up to
+    `max_workers` threads and at most `requests_per_second` requests overall. Results are written to the cache every
+    `checkpoint_every` lookups, so an interrupted run resumes where it stopped.
+
+    Args:
+        backend: Object with a `geocode(address)` method returning (latitude, longitude) or None and raising
+            `GeocodingError` on transient failures, e.g. `NominatimBackend`.
+        cache: `GeocodeCache`, or a path to one.
+        gazetteer: Offline backend, e.g. `Gazetteer`, tried for every cache miss before `backend`; its lookups are
+            not rate limited.
+    """
+
+    def __init__(
+        self,
+        backend,
+        cache,
+        max_workers=1,
+        requests_per_second=1.0,
+        n_retries=3,
+        retry_delay=2,
+        checkpoint_every=50,
+        gazetteer=None,
+    ):
+        self.backend = backend
+        self.gazetteer = gazetteer
+        self.cache = cache if isinstance(cache, GeocodeCache) else GeocodeCache(cache)
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.n_retries = n_retries
+        self.retry_delay = retry_delay
+        self.checkpoint_every = checkpoint_every
+        self.stats = {"hits": 0, "offline_hits": 0, "misses": 0, "failures": 0}
+
+    def _geocode_with_retry(self, address):
+        for attempt in range(1, self.n_retries + 1):
+            self.rate_limiter.wait()
+            try:
+                return self.backend.geocode(address)
+            except GeocodingError as e:
+                if attempt == self.n_retries:
+                    raise
+                logger.warning(
+                    f"Geocoding request for address: '{address}' failed. Retrying... Attempt {attempt}. Cause: {e}"
+                )
+                time.sleep(self.retry_delay * attempt)
+
+    def _checkpoint(self, results):
+        if results:
+            self.cache.put_many(results, backend=getattr(self.backend, "name", None))
+            results.clear()
+
+    def geocode(self, addresses):
+        """
+        Geocode addresses; duplicates, nulls and empty strings are skipped.
+
+        Returns:
+            DataFrame with `address`, `latitude` and `longitude` columns, one row per unique address; coordinates are
+            NaN where the address could not be resolved.
+        """
+        addresses = [
+            address
+            for address in pd.unique(pd.Series(list(addresses), dtype=object))
+            if isinstance(address, str) and address
+        ]
+        geocoded = self.cache.get_many(addresses)
+        to_geocode = [address for address in addresses if address not in geocoded]
+        self.stats["hits"] += len(geocoded)
+
+        if self.gazetteer is not None and to_geocode:
+            resolved = {}
+            for address in to_geocode:
+                coordinates = self.gazetteer.geocode(address)
+                if coordinates is not None:
+                    resolved[address] = coordinates
+            self.cache.put_many(resolved, backend=self.gazetteer.name)
+            geocoded.update(resolved)
+            to_geocode = [address for address in to_geocode if address not in resolved]
+            self.stats["offline_hits"] += len(resolved)
+
+        self.stats["misses"] += len(to_geocode)
+        logger.info(
+            f"{len(addresses)} unique addresses: {self.stats['hits']} cached, {self.stats['offline_hits']} found "
+            f"offline, {len(to_geocode)} to geocode."
+        )
+
+        pending = {}
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers
+        ) as executor:
+            future_to_address = {
+                executor.submit(self._geocode_with_retry, address): address
+                for address in to_geocode
+            }
+            try:
+                for future in tqdm(
+                    concurrent.futures.as_completed(future_to_address),
+                    total=len(future_to_address),
+                    desc="Geocoding",
+                    unit="address",
+                ):
+                    address = future_to_address[future]
+                    try:
+                        pending[address] = future.result()
+                    except GeocodingError:
+                        self.stats["failures"] += 1
+                        logger.warning(f"Could not geocode address: {address}")
+                        continue
+                    geocoded[address] = pending[address]
+                    if len(pending) >= self.checkpoint_every:
+                        self._checkpoint(pending)
+            finally:
+                # Keep whatever arrived before an interruption, including results `as_completed` had not yielded yet
+                # and lookups that were already running.
+                for future in future_to_address:
+                    future.cancel()
+                concurrent.futures.wait(future_to_address)
+                for future, address in future_to_address.items():
+                    if (
+                        not future.cancelled()
+                        and address not in geocoded
+                        and future.exception() is None
+                    ):
+                        pending[address] = future.result()
+                self._checkpoint(pending)
+
+        return pd.DataFrame(
+            [
+                (address, *(geocoded.get(address) or (None, None)))
+                for address in addresses
+            ],
+            columns=["address", "latitude", "longitude"],
+        ).astype({"latitude": float, "longitude": float})
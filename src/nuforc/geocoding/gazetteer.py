@@ -0,0 +1,234 @@
+import heapq
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+import us
+from iso3166 import countries
+
+from ..lookups.geography_lookups import (
+    CAN_PROVINCE_NAMES,
+    GEONAMES_CANADA_ADMIN1_CODES,
+)
+
+logger = logging.getLogger("model.modules.geocoding")
+
+"""
+Offline geocoding against a local gazetteer, e.g. a GeoNames `cities500.txt` dump.
+"""
+
+_NON_ALPHANUMERIC_REGEX = re.compile(r"[^0-9a-z]+")
+_CANADIAN_PROVINCE_ABBREVIATIONS = {
+    name.lower(): abbreviation for abbreviation, name in CAN_PROVINCE_NAMES.items()
+}
+# Constituent countries NUFORC reports use for the UK; GeoNames files them all under GB.
+_GB_NAMES = {"england", "scotland", "wales", "northern ireland", "united kingdom"}
+
+# Columns of a GeoNames dump used to build the index; the files have no header.
+GEONAMES_COLUMNS = {
+    1: "city",
+    2: "ascii_city",
+    4: "latitude",
+    5: "longitude",
+    8: "country",
+    10: "state",
+    14: "population",
+}
+
+
+@lru_cache(maxsize=2**16)
+def normalize_name(name):
+    """
+    Lowercase, strip accents and punctuation and collapse whitespace, e.g. `St. Jérôme` -> `st jerome`.
+    """
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c)).lower()
+    return _NON_ALPHANUMERIC_REGEX.sub(" ", name).strip()
+
+
+@lru_cache(maxsize=2**12)
+def normalize_country(name):
+    """
+    ISO 3166 alpha-2 code of a country name or code, e.g. `USA` -> `US`; the normalized name if it is not a country.
+    """
+    if name is None:
+        return None
+    normalized = normalize_name(name)
+    if normalized in _GB_NAMES:
+        return "GB"
+    country = countries.get(name.strip(), None)
+    if country is None:
+        return normalized or None
+    return country.alpha2
+
+
+@lru_cache(maxsize=2**12)
+def normalize_state(name, country=None):
+    """
+    Postal abbreviation of a US state or Canadian province, from its name or abbreviation; None for other regions,
+    whose gazetteer codes do not follow report spelling.
+    """
+    if name is None:
+        return None
+    if country == "US":
+        state = us.states.lookup(name.strip())
+        return state.abbr if state is not None else None
+    if country == "CA":
+        stripped = name.strip()
+        if stripped.upper() in CAN_PROVINCE_NAMES:
+            return stripped.upper()
+        return _CANADIAN_PROVINCE_ABBREVIATIONS.get(stripped.lower())
+    return None
+
+
+def _trigrams(name):
+    padded = f"  {name} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class Gazetteer:
+    """
+    In-memory hash index of places keyed by normalized (city, state, country), where state is a US/Canadian postal
+    abbreviation or None; the most populous place wins for a key. Names with no exact match are looked up in a trigram
+    index of the places in the same state and country, built on first use, and matched by edit similarity.
+
+    Args:
+        places: DataFrame with `city`, `state`, `country`, `latitude`, `longitude` and optionally `population`.
+        fuzzy_threshold: Minimum `difflib` similarity ratio for a fuzzy match; None disables fuzzy matching.
+        n_fuzzy_candidates: Number of trigram candidates compared by edit similarity.
+    """
+
+    name = "gazetteer"
+
+    def __init__(self, places, fuzzy_threshold=0.85, n_fuzzy_candidates=20):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.n_fuzzy_candidates = n_fuzzy_candidates
+        self._index = {}
+        self._names_by_region = defaultdict(set)
+        self._trigram_indexes = {}
+
+        if "population" not in places.columns:
+            places = places.assign(population=0)
+        places = places.sort_values("population", ascending=False, kind="stable")
+        for city, state, country, latitude, longitude in zip(
+            places["city"],
+            places["state"],
+            places["country"],
+            places["latitude"],
+            places["longitude"],
+        ):
+            if not isinstance(city, str):
+                continue
+            country = normalize_country(country) if isinstance(country, str) else None
+            state = normalize_state(state, country) if isinstance(state, str) else None
+            city = normalize_name(city)
+            coordinates = (float(latitude), float(longitude))
+            # Keys without the state serve reports that only name a city and country.
+            for key_state in {state, None}:
+                self._index.setdefault((city, key_state, country), coordinates)
+                self._names_by_region[key_state, country].add(city)
+        logger.info(f"Gazetteer loaded with {len(self._index)} place keys.")
+
+    def __len__(self):
+        return len(self._index)
+
+    @classmethod
+    def from_geonames(cls, path, **kwargs):
+        """
+        Load a tab-separated GeoNames dump, e.g. `cities500.txt` from https://download.geonames.org/export/dump/.
+        Both the UTF-8 and the ASCII name of every place are indexed.
+        """
+        df = pd.read_csv(
+            path,
+            sep="\t",
+            header=None,
+            usecols=list(GEONAMES_COLUMNS),
+            dtype={8: str, 10: str},
+            keep_default_na=False,
+            quoting=3,
+        ).rename(columns=GEONAMES_COLUMNS)
+        df["state"] = df["state"].where(
+            df["country"] != "CA", df["state"].map(GEONAMES_CANADA_ADMIN1_CODES)
+        )
+        places = pd.concat(
+            [
+                df.drop(columns="ascii_city"),
+                df.drop(columns="city").rename(columns={"ascii_city": "city"}),
+            ],
+            ignore_index=True,
+        )
+        return cls(places, **kwargs)
+
+    @classmethod
+    def from_csv(cls, path, **kwargs):
+        return cls(pd.read_csv(path, keep_default_na=False), **kwargs)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """
+        Load a gazetteer file; `.txt`/`.tsv` files are read as GeoNames dumps, anything else as CSV.
+        """
+        if Path(path).suffix in (".txt", ".tsv"):
+            return cls.from_geonames(path, **kwargs)
+        return cls.from_csv(path, **kwargs)
+
+    def _fuzzy_match(self, city, state, country):
+        region = (state, country)
+        trigram_index = self._trigram_indexes.get(region)
+        if trigram_index is None:
+            trigram_index = defaultdict(list)
+            for name in self._names_by_region.get(region, ()):
+                for trigram in _trigrams(name):
+                    trigram_index[trigram].append(name)
+            self._trigram_indexes[region] = trigram_index
+
+        # Trigrams shortlist candidates sharing the most substrings; edit similarity picks the match among them.
+        shared = defaultdict(int)
+        for trigram in _trigrams(city):
+            for name in trigram_index.get(trigram, ()):
+                shared[name] += 1
+        candidates = heapq.nlargest(self.n_fuzzy_candidates, shared, key=shared.get)
+        best_name, best_score = None, self.fuzzy_threshold
+        for name in candidates:
+            score = SequenceMatcher(None, city, name).ratio()
+            if score >= best_score:
+                best_name, best_score = name, score
+        return best_name
+
+    def lookup(self, city, state=None, country=None):
+        """
+        Returns:
+            (latitude, longitude), or None if the place is not in the gazetteer.
+        """
+        if not city:
+            return None
+        country = normalize_country(country)
+        state = normalize_state(state, country)
+        city = normalize_name(city)
+        # A known state is never relaxed, so a missing `Springfield, VT` does not resolve to another Springfield.
+        coordinates = self._index.get((city, state, country))
+        if coordinates is None and self.fuzzy_threshold is not None:
+            match = self._fuzzy_match(city, state, country)
+            if match is not None:
+                coordinates = self._index[match, state, country]
+        return coordinates
+
+    def geocode(self, address):
+        """
+        Geocode a `City, State, ST, Country` address as built by `NUFORCGeocoder`; any parts between the city and the
+        country are tried as the state.
+        """
+        parts = [part.strip() for part in address.split(",") if part.strip()]
+        if len(parts) < 2:
+            return None
+        city, *states, country = parts
+        country_code = normalize_country(country)
+        for state in states:
+            if normalize_state(state, country_code) is not None:
+                return self.lookup(city, state, country)
+        return self.lookup(city, None, country)
@@ -1,7 +1,5 @@
 import logging
 import os
-from geopy.geocoders import Nominatim
-from geopy.extra.rate_limiter import RateLimiter
 import pickle
 import time
 from datetime import date
@@ -12,25 +10,57 @@ import pandas as pd
 import requests
 from tqdm.autonotebook import tqdm
 
+from .batch import BatchGeocoder, GeocodeCache, NominatimBackend
+from .gazetteer import Gazetteer
+from .wrangling import join_address_columns, replace_unparsed_with_none
 
 logger = logging.getLogger("model.modules.geocoding")
 
 
 class NUFORCGeocoder:
+    """
+    Incremental geocoding of NUFORC events: only addresses missing from the cache are sent to the backend, and their
+    results are upserted into the cache, so a repeat run costs time proportional to new addresses.
+
+    Args:
+        input: Events DataFrame with the `address_columns`.
+        cache: `GeocodeCache` or path to its SQLite file; an in-memory cache if None.
+        backend: Geocoding backend; Nominatim, limited to one request per second, if None.
+        gazetteer: `Gazetteer` or path to a gazetteer file, consulted before `backend` for every new address.
+    """
+
     def __init__(
         self,
         input,
         cache=None,
         address_columns=None,
         user_agent=f"{os.getenv('SYSTEM')}_nuforc_geocoder",
+        backend=None,
+        requests_per_second=1.0,
+        max_workers=1,
+        gazetteer=None,
     ):
         self.input = input
-        self.cache = cache
-        if address_columns == None:
-            self.address_columns = ["city", "state", "state_abbreviation", "country"]
+        if address_columns is None:
+            address_columns = ["city", "state", "state_abbreviation", "country"]
+        self.address_columns = address_columns
         self.input_df = input
-        self.geolocator = Nominatim(user_agent=user_agent)
-        self.geocode = RateLimiter(self.geolocator.geocode, min_delay_seconds=1)
+        if not isinstance(cache, GeocodeCache):
+            cache = GeocodeCache(cache or ":memory:")
+        self.cache = cache
+        self.backend = backend or NominatimBackend(user_agent=user_agent)
+        if gazetteer is not None and not isinstance(gazetteer, Gazetteer):
+            gazetteer = Gazetteer.load(gazetteer)
+        self.gazetteer = gazetteer
+        self.geocoder = BatchGeocoder(
+            backend=self.backend,
+            cache=self.cache,
+            max_workers=max_workers,
+            requests_per_second=requests_per_second,
+            gazetteer=self.gazetteer,
+        )
+        self.output = None
+        self.stats = {}
 
     def make_address(
         self, street=None, city=None, state=None, state_abbreviation=None, country=None
@@ -45,42 +75,41 @@ class NUFORCGeocoder:
         except:
             return None
 
-    def geocode_with_rate_limiter(self, geolocator, address):
-        geocode = RateLimiter(self.geolocator.geocode, min_delay_seconds=1)
+    def make_addresses(self, df):
+        """
+        Vectorized `make_address` over the address columns.
+        """
+        return join_address_columns(
+            replace_unparsed_with_none(df[self.address_columns]),
+            columns=self.address_columns,
+        )
 
     def save_output(self):
-        if self.output:
+        if self.output is not None:
             self.output.to_pickle("geocoding_output.pkl")
 
     def run(self):
-        tqdm.pandas(desc="Making raw addresses.")
-        self.input_df["raw_address"] = self.input_df.progress_apply(
-            lambda x: self.make_address(
-                x["city"], x["state"], x["state_abbreviation"], x["country"]
-            ),
-            axis=1,
-        )
+        """
+        Geocode the events' addresses and left-join the coordinates onto every event; call `save_output` to pickle the
+        result.
+        """
+        self.input_df["raw_address"] = self.make_addresses(self.input_df)
+        addresses = self.input_df["raw_address"].unique()
+        addresses = addresses[addresses != ""]
 
-        tqdm.pandas(desc="Geocoding.")
-        df = pd.DataFrame(self.input_df["raw_address"].unique()).rename(
-            columns={0: "raw_address"}
+        # Only the distinct addresses of this input are looked up in the cache; addresses found there, resolved or
+        # not, are never sent to the backend again.
+        geocodes = self.geocoder.geocode(addresses).rename(
+            columns={"address": "raw_address"}
+        )
+        self.stats = {"addresses": len(addresses), **self.geocoder.stats}
+        logger.info(
+            f"{self.stats['addresses']} unique addresses: {self.stats['hits']} cache hits, "
+            f"{self.stats['offline_hits']} found offline, {self.stats['misses']} sent to the backend, "
+            f"{self.stats['failures']} failed."
         )
-        if self.cache:
-            df = pd.merge(left=df, right=self.cache, on="raw_address")
-            to_geocode_df = df[df["geocoded"].isna()]
-            to_geocode_df["geocoded"] = to_geocode_df["raw_address"].progress_apply(
-                self.geocode
-            )
-            df = pd.merge(left=df, right=to_geocode_df, on="raw_address")
-            self.output = df.copy()
-        else:
-            to_geocode_df = df.copy()
-            to_geocode_df["geocoded"] = to_geocode_df["raw_address"].progress_apply(
-                self.geocode
-            )
-            df = pd.merge(left=df, right=to_geocode_df, on="raw_address")
-            self.output = df.copy()
-            self.save_output()
+        self.output = self.input_df.merge(geocodes, on="raw_address", how="left")
+        return self.output
 
     # class NUFORCGeocoder:
     #     available_input_types = {'.pkl'}
@@ -233,20 +262,20 @@ class NUFORCGeocoder:
     #         self.sleep_time = sleep_time
     #         self.call = self._make_geocode_api_call()
     #
-    def _make_geocode_api_call(self):
-        address_parts = [
-            part.replace(" ", "+") for part in self.raw_address if type(part) == str
-        ]
-        if len(address_parts) <= 1:
-            address = address_parts[0]
-        else:
-            address = ",".join(address_parts)
-
-        call = f"https://maps.googleapis.com/maps/api/geocode/{self.output_format}?address={address}&language={self.language}&key={self.google_api_key}"
-        return call
+    #     def _make_geocode_api_call(self):
+    #         address_parts = [
+    #             part.replace(" ", "+") for part in self.raw_address if type(part) == str
+    #         ]
+    #         if len(address_parts) <= 1:
+    #             address = address_parts[0]
+    #         else:
+    #             address = ",".join(address_parts)
+    #
+    #         call = f"https://maps.googleapis.com/maps/api/geocode/{self.output_format}?address={address}&language={self.language}&key={self.google_api_key}"
+    #         return call
+    #
 
 
-#
 #     def get_geocode_api_response(self):
 #         """
 #         Calls the Google Geocode API for a response.
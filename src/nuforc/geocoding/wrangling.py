@@ -1,3 +1,6 @@
+import pandas as pd
+
+
 def replace_unparsed_with_none(dataframe):
     """
     Function to replace all occurrences of "unparsed" with None in the entire DataFrame.
@@ -28,4 +31,23 @@ def join_columns(city, state, country):
     values = [str(val) for val in (city, state, country) if val is not None]
 
     # Combine the three columns using a comma separator
-    return ', '.join(values)
\ No newline at end of file
+    return ', '.join(values)
+
+
+def join_address_columns(dataframe, columns=("city", "state", "country")):
+    """
+    Vectorized `join_columns` over whole DataFrame columns.
+
+    Parameters:
+        dataframe (pandas DataFrame): The DataFrame holding the address columns.
+        columns (tuple): Names of the columns to join, in order.
+
+    Returns:
+        pandas Series: The joined result of the columns, skipping missing values.
+    """
+    address = pd.Series(pd.NA, index=dataframe.index, dtype="string")
+    for column in columns:
+        part = dataframe[column].astype("string")
+        joined = address.str.cat(part, sep=", ").fillna(part)
+        address = address.where(part.isna(), joined)
+    return address.fillna("").astype(object)
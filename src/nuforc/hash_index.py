@@ -0,0 +1,180 @@
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from .wrangling import hash_string
+
+logger = logging.getLogger("model.modules.scraping")
+
+"""
+Persistent index of stored event content hashes, shared by the crawler, the Scrapy pipelines and merges of raw event
+files.
+"""
+
+
+class HashIndex:
+    """
+    SQLite-backed set of event content hashes (`hash_string` of the raw text), with the URL each hash was first stored
+    under. Membership checks and inserts are single B-tree lookups, so deduplicating n events is O(n) regardless of how
+    many are already stored.
+
+    Args:
+        path: SQLite database file; created if missing.
+        commit_every: Number of inserts between commits.
+    """
+
+    def __init__(self, path, commit_every=1000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.commit_every = commit_every
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS events "
+            "(hash TEXT PRIMARY KEY, url TEXT, first_seen TEXT) WITHOUT ROWID"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS events_url ON events (url)"
+        )
+        self._connection.commit()
+        self._lock = threading.Lock()
+        self._n_pending = 0
+
+    def __contains__(self, event_hash):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM events WHERE hash = ?", (event_hash,)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def contains_url(self, url):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM events WHERE url = ? LIMIT 1", (url,)
+            ).fetchone()
+        return row is not None
+
+    def add(self, event_hash, url=None):
+        """
+        Record a hash.
+
+        Returns:
+            True if the hash was new, False if it was already stored.
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO events (hash, url, first_seen) VALUES (?, ?, ?)",
+                (event_hash, url, datetime.now().isoformat(timespec="seconds")),
+            )
+            is_new = cursor.rowcount == 1
+            if is_new:
+                self._n_pending += 1
+                if self._n_pending >= self.commit_every:
+                    self._commit()
+        return is_new
+
+    def add_many(self, event_hashes, urls=None):
+        """
+        Record hashes in order; a hash repeated within `event_hashes` only counts as new the first time.
+
+        Returns:
+            List of booleans, True where the hash was new.
+        """
+        if urls is None:
+            urls = [None] * len(event_hashes)
+        return [
+            self.add(event_hash, url) for event_hash, url in zip(event_hashes, urls)
+        ]
+
+    def _commit(self):
+        self._connection.commit()
+        self._n_pending = 0
+
+    def commit(self):
+        with self._lock:
+            self._commit()
+
+    def close(self):
+        with self._lock:
+            self._commit()
+            self._connection.close()
+
+
+def _iter_event_chunks(path, chunksize):
+    path = Path(path)
+    if path.suffix == ".parquet":
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(
+            path, chunksize=chunksize, dtype=str, keep_default_na=False
+        )
+
+
+def merge_event_files(input_paths, hash_index, output_path=None, chunksize=10000):
+    """
+    Merge raw event files (CSV or Parquet) into one CSV, keeping the first occurrence of every report.
+
+    Files are streamed in chunks and every row is checked against `hash_index`, so reports already stored by earlier
+    crawls or merges are dropped too. Rows without a `hash` get one computed from `raw_text`. Without `output_path`
+    the files are only added to the index, e.g. to seed it from existing dumps.
+
+    Args:
+        input_paths: Raw event files, e.g. `raw_events/events_*.csv`; read in the given order.
+        hash_index: `HashIndex` instance.
+        output_path: Output CSV file, written to a temporary file and moved into place once complete.
+        chunksize: Number of rows per chunk.
+
+    Returns:
+        Tuple of (rows read, rows kept).
+    """
+    n_read, n_kept = 0, 0
+    columns = None
+    temporary_path = None
+    if output_path is not None:
+        output_path = Path(output_path)
+        temporary_path = output_path.with_name(f"{output_path.name}.tmp")
+        temporary_path.unlink(missing_ok=True)
+
+    for path in input_paths:
+        for chunk in _iter_event_chunks(path, chunksize):
+            if "hash" not in chunk.columns:
+                chunk["hash"] = None
+            missing = chunk["hash"].isna() | (chunk["hash"] == "")
+            if missing.any():
+                chunk.loc[missing, "hash"] = chunk.loc[missing, "raw_text"].map(
+                    hash_string
+                )
+            urls = chunk["url"].tolist() if "url" in chunk.columns else None
+            is_new = hash_index.add_many(chunk["hash"].tolist(), urls)
+            new_rows = chunk[is_new]
+            n_read += len(chunk)
+            n_kept += len(new_rows)
+            if temporary_path is not None and len(new_rows):
+                # Files of different crawls may order columns differently; keep the first file's header.
+                if columns is None:
+                    columns = list(new_rows.columns)
+                new_rows.reindex(columns=columns).to_csv(
+                    temporary_path,
+                    mode="a",
+                    header=not temporary_path.exists(),
+                    index=False,
+                )
+        logger.info(f"{path} merged; {n_kept} of {n_read} events kept so far.")
+
+    hash_index.commit()
+    if temporary_path is not None:
+        if not temporary_path.exists():
+            temporary_path.touch()
+        os.replace(temporary_path, output_path)
+    return n_read, n_kept
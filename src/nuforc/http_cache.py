@@ -0,0 +1,92 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+logger = logging.getLogger("model.modules.utility")
+
+"""
+On-disk response cache revalidated with HTTP conditional requests.
+"""
+
+
+class ResponseCache:
+    """
+    Response bodies keyed by URL, stored with their `ETag`/`Last-Modified` validators.
+
+    Only responses carrying a validator are stored: those are the ones a server can answer with `304 Not Modified`.
+    Each URL maps to a `<sha1>.json` metadata file and a `<sha1>.body` file under `cache_dir`.
+    """
+
+    validator_headers = {"ETag": "If-None-Match", "Last-Modified": "If-Modified-Since"}
+    stored_headers = ["ETag", "Last-Modified", "Content-Type"]
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, url, suffix):
+        key = hashlib.sha1(url.encode()).hexdigest()
+        return self.cache_dir / f"{key}{suffix}"
+
+    def get(self, url):
+        """
+        Returns:
+            Dictionary with `url`, `headers` and `body`, or None if the URL isn't cached.
+        """
+        metadata_path = self._path(url, ".json")
+        body_path = self._path(url, ".body")
+        if not metadata_path.exists() or not body_path.exists():
+            return None
+        with open(metadata_path, encoding="utf-8") as f:
+            entry = json.load(f)
+        entry["body"] = body_path.read_bytes()
+        return entry
+
+    def conditional_headers(self, url):
+        """
+        Request headers revalidating the cached response for `url`; empty if it isn't cached.
+        """
+        entry = self.get(url)
+        if entry is None:
+            return {}
+        return {
+            request_header: entry["headers"][header]
+            for header, request_header in self.validator_headers.items()
+            if header in entry["headers"]
+        }
+
+    def store(self, url, headers, body):
+        """
+        Cache a `200 OK` response. Responses without validators are skipped.
+
+        Args:
+            url: Requested URL.
+            headers: Mapping of response header names to string values.
+            body: Response body as bytes.
+
+        Returns:
+            Whether the response was stored.
+        """
+        # Header names are matched case-insensitively (Scrapy title-cases `ETag` as `Etag`).
+        headers = {name.lower(): value for name, value in headers.items()}
+        headers = {
+            header: headers[header.lower()]
+            for header in self.stored_headers
+            if header.lower() in headers
+        }
+        if not any(header in headers for header in self.validator_headers):
+            return False
+
+        # Write to temporary files and move them into place, so readers never see a half-written entry.
+        for suffix, data in [
+            (".body", body),
+            (".json", json.dumps({"url": url, "headers": headers}).encode()),
+        ]:
+            path = self._path(url, suffix)
+            temporary_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            temporary_path.write_bytes(data)
+            os.replace(temporary_path, path)
+        logger.debug(f"{url} stored in response cache.")
+        return True
@@ -14,6 +14,23 @@ CAN_PROVINCE_NAMES = {
     "YT": "Yukon",
 }
 
+# GeoNames admin1 codes of Canadian provinces, mapped to postal abbreviations.
+GEONAMES_CANADA_ADMIN1_CODES = {
+    "01": "AB",
+    "02": "BC",
+    "03": "MB",
+    "04": "NB",
+    "05": "NL",
+    "07": "NS",
+    "08": "ON",
+    "09": "PE",
+    "10": "QC",
+    "11": "SK",
+    "12": "YT",
+    "13": "NT",
+    "14": "NU",
+}
+
 NON_ISO_3166_COUNTRY_NAMES = {
     "russia": "Russian Federation",
     "uk/england": "England",
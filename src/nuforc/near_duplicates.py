@@ -0,0 +1,360 @@
+import json
+import logging
+import os
+import re
+from itertools import chain
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from .event_io import event_keys, read_event_frame
+
+logger = logging.getLogger("model.modules.near_duplicates")
+
+"""
+Near-duplicate report detection: MinHash signatures of description shingles, with LSH banding to find candidate
+pairs without comparing every pair of reports.
+"""
+
+_WORD_REGEX = re.compile(r"\w+")
+_MAX_UINT32 = np.iinfo(np.uint32).max
+
+
+def _shingle_hashes(texts, shingle_size):
+    """
+    64-bit hashes of the word `shingle_size`-grams of every text; texts shorter than a shingle contribute their words.
+
+    Returns:
+        (hashes, document index of every hash), ordered by document.
+    """
+    token_lists = [
+        _WORD_REGEX.findall(text.lower()) if isinstance(text, str) else []
+        for text in texts
+    ]
+    lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(texts))
+    words = np.fromiter(
+        chain.from_iterable(token_lists), dtype=object, count=int(lengths.sum())
+    )
+    token_hashes = pd.util.hash_array(words) if len(words) else np.zeros(0, np.uint64)
+    token_documents = np.repeat(np.arange(len(texts)), lengths)
+
+    # Shingle hash: the position-weighted sum of its word hashes, wrapping around 64 bits.
+    n_shingles = max(len(token_hashes) - shingle_size + 1, 0)
+    shingle_hashes = np.zeros(n_shingles, dtype=np.uint64)
+    weights = np.random.default_rng(0).integers(
+        1, 2**63, size=shingle_size, dtype=np.uint64
+    ) | np.uint64(1)
+    for offset in range(shingle_size):
+        shingle_hashes += token_hashes[offset : offset + n_shingles] * weights[offset]
+    shingle_documents = token_documents[:n_shingles]
+    is_whole = (
+        shingle_documents
+        == token_documents[shingle_size - 1 : shingle_size - 1 + n_shingles]
+    )
+
+    is_short = (lengths > 0) & (lengths < shingle_size)
+    short_tokens = is_short[token_documents]
+    hashes = np.concatenate([shingle_hashes[is_whole], token_hashes[short_tokens]])
+    documents = np.concatenate(
+        [shingle_documents[is_whole], token_documents[short_tokens]]
+    )
+    order = np.argsort(documents, kind="stable")
+    return hashes[order], documents[order]
+
+
+def minhash_signatures(texts, num_perm=128, shingle_size=3, seed=1):
+    """
+    MinHash signatures of the word shingles of `texts`, with `num_perm` multiply-shift hash functions.
+
+    Returns:
+        uint32 array of shape (len(texts), num_perm); rows of texts without words are all `2**32 - 1`.
+    """
+    hashes, documents = _shingle_hashes(texts, shingle_size)
+    signatures = np.full((len(texts), num_perm), _MAX_UINT32, dtype=np.uint32)
+    if not len(hashes):
+        return signatures
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    increments = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    present, starts = np.unique(documents, return_index=True)
+    for permutation in range(num_perm):
+        permuted = (
+            hashes * multipliers[permutation] + increments[permutation]
+        ) >> np.uint64(32)
+        signatures[present, permutation] = np.minimum.reduceat(permuted, starts).astype(
+            np.uint32
+        )
+    return signatures
+
+
+def lsh_parameters(threshold, num_perm):
+    """
+    Number of bands and rows per band minimizing the sum of the false positive and false negative probability
+    areas of the LSH S-curve `1 - (1 - s**rows)**bands` around `threshold`.
+    """
+    similarities = np.linspace(0, 1, 201)
+    below = similarities <= threshold
+    best, best_error = None, np.inf
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        candidate_probability = 1 - (1 - similarities**rows) ** bands
+        error = (
+            candidate_probability[below].sum()
+            + (1 - candidate_probability[~below]).sum()
+        )
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+def candidate_pairs(signatures, bands, rows, max_bucket_size=1000, is_new=None):
+    """
+    Pairs of rows sharing at least one LSH band bucket, as an (n, 2) array with the smaller row first.
+
+    Args:
+        max_bucket_size: Buckets with more members, e.g. boilerplate texts, are skipped.
+        is_new: Boolean mask; only pairs with at least one new row are returned if given.
+    """
+    n_rows = len(signatures)
+    band_weights = np.random.default_rng(2).integers(
+        1, 2**63, size=rows, dtype=np.uint64
+    ) | np.uint64(1)
+    pairs = []
+    for band in range(bands):
+        band_values = signatures[:, band * rows : (band + 1) * rows].astype(np.uint64)
+        keys = (band_values * band_weights).sum(axis=1)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        run_starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        run_lengths = np.diff(np.r_[run_starts, n_rows])
+        # Buckets are expanded into pairs per bucket size, all buckets of a size at once.
+        for size in np.unique(
+            run_lengths[(run_lengths > 1) & (run_lengths <= max_bucket_size)]
+        ):
+            members = order[run_starts[run_lengths == size][:, None] + np.arange(size)]
+            first, second = np.triu_indices(size, 1)
+            pairs.append(
+                np.stack(
+                    [members[:, first].ravel(), members[:, second].ravel()], axis=1
+                )
+            )
+        n_skipped = int((run_lengths > max_bucket_size).sum())
+        if n_skipped:
+            logger.warning(
+                f"{n_skipped} LSH buckets of band {band} over {max_bucket_size} rows skipped."
+            )
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(pairs), axis=1)
+    if is_new is not None:
+        pairs = pairs[is_new[pairs[:, 0]] | is_new[pairs[:, 1]]]
+    keys = np.unique(pairs[:, 0] * n_rows + pairs[:, 1])
+    return np.stack([keys // n_rows, keys % n_rows], axis=1)
+
+
+def signature_similarity(signatures, pairs, chunksize=100000):
+    """
+    Estimated Jaccard similarity of row pairs: the share of equal signature values.
+    """
+    similarity = np.zeros(len(pairs))
+    for start in range(0, len(pairs), chunksize):
+        chunk = pairs[start : start + chunksize]
+        similarity[start : start + chunksize] = (
+            signatures[chunk[:, 0]] == signatures[chunk[:, 1]]
+        ).mean(axis=1)
+    return similarity
+
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures of event descriptions, stored as Parquet parts in a directory next to the event store and
+    extended incrementally; new events are checked against every stored one.
+
+    Args:
+        path: Signature directory; created if missing.
+        threshold: Default estimated Jaccard similarity above which two reports are near-duplicates.
+        num_perm, shingle_size, seed: MinHash parameters, fixed when the directory is created.
+    """
+
+    def __init__(
+        self,
+        path,
+        threshold=0.8,
+        num_perm=128,
+        shingle_size=3,
+        seed=1,
+        max_bucket_size=1000,
+    ):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self.max_bucket_size = max_bucket_size
+        parameters = {"num_perm": num_perm, "shingle_size": shingle_size, "seed": seed}
+        parameters_path = self.path / "parameters.json"
+        if parameters_path.exists():
+            stored = json.loads(parameters_path.read_text())
+            if stored != parameters:
+                raise ValueError(
+                    f"Signatures @ {self.path} were built with {stored}, not {parameters}."
+                )
+        else:
+            parameters_path.write_text(json.dumps(parameters))
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+
+        self.parts = sorted(self.path.glob("signatures_*.parquet"))
+        self.hashes = np.zeros(0, dtype=object)
+        self.urls = np.zeros(0, dtype=object)
+        self.signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        for part in self.parts:
+            self._load_part(part)
+        # `event_keys` of the stored events.
+        self._known = set(
+            event_keys(pd.DataFrame({"hash": self.hashes, "url": self.urls}))
+        )
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def _load_part(self, part):
+        table = pq.read_table(part)
+        signatures = table.column("signature").combine_chunks().values.to_numpy()
+        self.signatures = np.concatenate(
+            [self.signatures, signatures.reshape(-1, self.num_perm)]
+        )
+        self.hashes = np.concatenate(
+            [self.hashes, table.column("hash").to_numpy(zero_copy_only=False)]
+        )
+        self.urls = np.concatenate(
+            [self.urls, table.column("url").to_numpy(zero_copy_only=False)]
+        )
+
+    def add_events(self, events, threshold=None):
+        """
+        Sign the descriptions of events not stored yet, told apart by `event_keys`, store the signatures as a new part
+        and find their near-duplicates among all stored events.
+
+        Args:
+            events: DataFrame with `hash`, `url` and `description` columns.
+
+        Returns:
+            DataFrame of near-duplicate pairs involving a new event, as `pairs`.
+        """
+        keys = event_keys(events)
+        unseen = ~keys.isin(self._known) & ~keys.duplicated()
+        events, keys = events[unseen], keys[unseen]
+        if events.empty:
+            return self._pair_frame(np.zeros((0, 2), dtype=np.int64), np.zeros(0))
+        signatures = minhash_signatures(
+            events["description"].tolist(),
+            num_perm=self.num_perm,
+            shingle_size=self.shingle_size,
+            seed=self.seed,
+        )
+
+        part = self.path / f"signatures_{len(self.parts):05d}.parquet"
+        table = pa.table(
+            {
+                "hash": pa.array(events["hash"].astype(object), pa.string()),
+                "url": pa.array(events["url"].astype(object), pa.string()),
+                "signature": pa.FixedSizeListArray.from_arrays(
+                    pa.array(signatures.ravel()), self.num_perm
+                ),
+            }
+        )
+        tmp_path = part.with_name(f"{part.name}.tmp")
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, part)
+        self.parts.append(part)
+        n_stored = len(self)
+        self._load_part(part)
+        self._known.update(keys)
+        logger.info(f"{len(events)} new events signed @ {part}.")
+
+        is_new = np.zeros(len(self), dtype=bool)
+        is_new[n_stored:] = True
+        return self.pairs(threshold=threshold, is_new=is_new)
+
+    def add_file(self, path, threshold=None):
+        """
+        `add_events` for an events file: a Parquet event store, a legacy events pickle or a raw events CSV.
+        """
+        columns = ["hash", "url", "description"]
+        if Path(path).suffix == ".csv":
+            events = pd.read_csv(path, usecols=columns)
+        else:
+            events = read_event_frame(path, columns=columns)
+        return self.add_events(events, threshold=threshold)
+
+    def _pair_frame(self, pairs, similarity):
+        return pd.DataFrame(
+            {
+                "hash": self.hashes[pairs[:, 0]],
+                "url": self.urls[pairs[:, 0]],
+                "duplicate_hash": self.hashes[pairs[:, 1]],
+                "duplicate_url": self.urls[pairs[:, 1]],
+                "similarity": similarity,
+            }
+        )
+
+    def _similar_pairs(self, threshold, is_new=None):
+        threshold = self.threshold if threshold is None else threshold
+        bands, rows = lsh_parameters(threshold, self.num_perm)
+        # Descriptions without words share the all-maximum signature; they are not duplicates of each other.
+        has_words = (self.signatures != _MAX_UINT32).any(axis=1)
+        pairs = candidate_pairs(
+            self.signatures,
+            bands,
+            rows,
+            max_bucket_size=self.max_bucket_size,
+            is_new=is_new,
+        )
+        pairs = pairs[has_words[pairs[:, 0]] & has_words[pairs[:, 1]]]
+        similarity = signature_similarity(self.signatures, pairs)
+        keep = similarity >= threshold
+        return pairs[keep], similarity[keep]
+
+    def pairs(self, threshold=None, is_new=None):
+        """
+        Returns:
+            DataFrame of near-duplicate pairs with their estimated `similarity`, most similar first.
+        """
+        pairs, similarity = self._similar_pairs(threshold, is_new=is_new)
+        order = np.argsort(-similarity, kind="stable")
+        return self._pair_frame(pairs[order], similarity[order])
+
+    def clusters(self, threshold=None):
+        """
+        Group stored events into clusters of near-duplicates, linked by pairs at least `threshold` similar.
+
+        Returns:
+            DataFrame of `hash`, `url`, `cluster_id` and `cluster_size` for events with at least one near-duplicate,
+            biggest cluster first.
+        """
+        pairs, _ = self._similar_pairs(threshold)
+        graph = coo_matrix(
+            (np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])),
+            shape=(len(self), len(self)),
+        )
+        _, labels = connected_components(graph, directed=False)
+        sizes = np.bincount(labels)
+        members = np.flatnonzero(sizes[labels] > 1)
+        clusters = pd.DataFrame(
+            {
+                "hash": self.hashes[members],
+                "url": self.urls[members],
+                "cluster_size": sizes[labels[members]],
+                "label": labels[members],
+            }
+        ).sort_values(["cluster_size", "label"], ascending=[False, True], kind="stable")
+        clusters["cluster_id"] = pd.factorize(clusters["label"])[0]
+        return clusters[["hash", "url", "cluster_id", "cluster_size"]].reset_index(
+            drop=True
+        )
@@ -52,3 +52,144 @@ Reported\s:\s)
     "description": None,
     "url": None,
 }
+
+# Every report header NUFORC emits, keyed by the field its segment belongs to.
+EVENT_FIELD_HEADERS = {
+    "occurred_time": r"Occurred",
+    "entered_as_time": r"Entered\sas",
+    "reported_time": r"Reported",
+    "posted_time": r"Posted",
+    "location": r"Location",
+    "shape": r"Shape",
+    "duration": r"Duration",
+}
+
+# A leading `\b` keeps `re` from skipping ahead to a literal prefix, so the header patterns below first look ahead
+# for a header's first letter (or start with the header itself) and only then check the word boundary.
+_EVENT_FIELD_HEADER_INITIALS = "".join(
+    sorted({header[0] for header in EVENT_FIELD_HEADERS.values()})
+)
+_EVENT_FIELD_HEADER_PATTERN = (
+    rf"(?=[{_EVENT_FIELD_HEADER_INITIALS}])\b(?:"
+    + "|".join(EVENT_FIELD_HEADERS.values())
+    + r")\s?:"
+)
+
+# All headers as one alternation. Scanning a report with this pattern once splits it into per-field segments; the
+# group name of each match is the field the following segment belongs to.
+EVENT_FIELD_REGEX = re.compile(
+    rf"(?=[{_EVENT_FIELD_HEADER_INITIALS}])\b(?:"
+    + "|".join(
+        f"(?P<{field}>{header})" for field, header in EVENT_FIELD_HEADERS.items()
+    )
+    + r")\s?:\s?"
+)
+
+# Per-field equivalent of a segment produced by scanning with `EVENT_FIELD_REGEX`: the text following the first
+# header up to the next header or the end of the line. Used for column-wise extraction with `Series.str.extract`.
+EVENT_FIELD_SEGMENT_REGEXES = {
+    field: re.compile(
+        rf"{header}(?<!\w{header})\s?:\s?(?P<{field}>.*?)"
+        rf"(?={_EVENT_FIELD_HEADER_PATTERN}|$)",
+        re.MULTILINE,
+    )
+    for field, header in EVENT_FIELD_HEADERS.items()
+}
+
+# Date and time as they follow a time header, e.g. `8/15/2022 21:00` or `1/2/19 3:15:30`.
+DATETIME_REGEX = re.compile(
+    r"""
+(?P<date>[0-3]?[0-9]/[0-3]?[0-9]/(?:[0-9]{2})?[0-9]{2})\s?(?P<hour>2[0-3]|[01]?[0-9]):(?P<minute>[0-5]?[0-9]):?
+(?P<second>[0-5]?[0-9])?
+""",
+    re.VERBOSE,
+)
+
+US_STATE_ABBREVIATION_REGEX = re.compile(
+    "(A[KLRZ]|C[AOT]|D[CE]|FL|GA|HI|I[ADLN]|K[SY]|LA|M[ADEINOST]|N[CDEHJMVY]|O[HKR]|PA|RI|S[CD]|T[NX]|UT|V[AT]|W[AIVY])",
+    re.VERBOSE,
+)
+
+CANADIAN_STATE_ABBREVIATION_REGEX = re.compile(
+    r"(N[BLSTU]|[AMN]B|[BQ]C|ON|PE|SK)",
+    re.VERBOSE,
+)
+
+# Text inside brackets, e.g. the country in `London (UK/England)`.
+BRACKETED_REGEX = re.compile(r"\((.*?)\)")
+
+# Text before the first opening bracket, e.g. the city in `London (UK/England)`.
+BEFORE_BRACKET_REGEX = re.compile(r".+?(?=\()")
+
+COUNTRY_NAME_CHARACTERS_TO_REMOVE_REGEX = re.compile("[+:,]")
+
+# Spelled-out quantities accepted in place of a number in a duration.
+DURATION_NUMBER_WORDS = {
+    "a": 1,
+    "an": 1,
+    "one": 1,
+    "two": 2,
+    "three": 3,
+    "four": 4,
+    "five": 5,
+    "six": 6,
+    "seven": 7,
+    "eight": 8,
+    "nine": 9,
+    "ten": 10,
+    "eleven": 11,
+    "twelve": 12,
+    "fifteen": 15,
+    "twenty": 20,
+    "thirty": 30,
+    "forty-five": 45,
+    "forty": 40,
+    "fifty": 50,
+    "sixty": 60,
+    "half": 0.5,
+}
+
+# Unit spellings (including common typos) keyed by the length of the unit in seconds.
+DURATION_UNITS = {
+    "seconds": (1, r"seconds|second|secs|sec|s"),
+    "minutes": (60, r"minutes|minute|mintues|minuets|mins|min|m"),
+    "hours": (3600, r"hours|hour|hrs|hr|h"),
+    "days": (86400, r"days|day"),
+    "weeks": (604800, r"weeks|week|wks|wk"),
+}
+
+_DURATION_NUMBER_PATTERN = r"\d+/\d+|\d+(?:\.\d+)?|half(?:\s+an?)?|" + "|".join(
+    word for word in DURATION_NUMBER_WORDS if word != "half"
+)
+_DURATION_UNIT_PATTERN = "|".join(
+    f"(?P<{unit}>{pattern})" for unit, (_, pattern) in DURATION_UNITS.items()
+)
+
+# Durations such as `5 minutes`, `1-2 hrs`, `30 sec`, `half an hour` or `1+ hour`. For ranges the upper bound is
+# in `upper`; the group name of the matched unit is the unit of the duration.
+DURATION_REGEX = re.compile(
+    rf"""
+(?<![\w.])(?P<value>{_DURATION_NUMBER_PATTERN})
+(?:\s*(?:-|to|or)\s*(?P<upper>{_DURATION_NUMBER_PATTERN}))?
+\s*\+?\s*
+(?:{_DURATION_UNIT_PATTERN})
+\b
+""",
+    re.VERBOSE | re.IGNORECASE,
+)
+
+# Sequences `clean_time_string` normalizes before handing a duration to `parsedatetime`.
+DURATION_REPLACEMENTS = {"hrs": "hours", ":": "", "mintues": "minutes"}
+DURATION_REPLACEMENTS_REGEX = re.compile(
+    "|".join(re.escape(sequence) for sequence in DURATION_REPLACEMENTS)
+)
+DURATION_CHARACTERS_TO_REMOVE_REGEX = re.compile("[+:]")
+
+# NUFORC timestamp with an optional time of day, e.g. `8/15/22 21:00` on a monthly index page.
+TIMESTAMP_REGEX = re.compile(
+    r"""
+(?P<date>[0-3]?[0-9]/[0-3]?[0-9]/(?:[0-9]{2})?[0-9]{2})
+(?:\s?(?P<hour>2[0-3]|[01]?[0-9]):(?P<minute>[0-5]?[0-9]):?(?P<second>[0-5]?[0-9])?)?
+""",
+    re.VERBOSE,
+)
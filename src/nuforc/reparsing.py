@@ -0,0 +1,81 @@
+import concurrent.futures
+import logging
+import os
+from collections import deque
+from pathlib import Path
+
+import pandas as pd
+from tqdm.autonotebook import tqdm
+
+from nuforc.wrangling import wrangle_frame
+
+logger = logging.getLogger("model.modules.reparsing")
+
+"""
+Re-deriving event fields from stored raw report text.
+"""
+
+
+def reparse_chunk(chunk, text_column="raw_text"):
+    return wrangle_frame(chunk, text_column=text_column)
+
+
+def reparse_events(
+    input_path,
+    output_path=None,
+    chunksize=10000,
+    max_workers=None,
+    text_column="raw_text",
+):
+    """
+    Re-parse every event of a raw events file without recrawling.
+
+    The file is streamed in chunks which are wrangled in a process pool; at most two chunks per worker are in flight
+    and results are written in input order. The output is written to a temporary file and moved into place once
+    complete.
+
+    Args:
+        input_path: CSV file with a raw report text column, e.g. `raw_events/events_2023_08_20.csv`.
+        output_path: Output CSV file; defaults to `<input stem>_reparsed.csv` next to the input.
+        chunksize: Number of events per chunk.
+        max_workers: Number of worker processes; defaults to the number of CPUs.
+        text_column: Name of the column holding the raw report text.
+
+    Returns:
+        Path to the output file.
+    """
+    input_path = Path(input_path)
+    if output_path is None:
+        output_path = input_path.with_name(f"{input_path.stem}_reparsed.csv")
+    output_path = Path(output_path)
+    temporary_path = output_path.with_name(f"{output_path.name}.tmp")
+    max_workers = max_workers or os.cpu_count()
+
+    chunks = pd.read_csv(
+        input_path, chunksize=chunksize, dtype=str, keep_default_na=False
+    )
+    n_events = 0
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers
+    ) as executor, open(temporary_path, "w", newline="", encoding="utf-8") as file:
+        pending = deque()
+        progress = tqdm(desc="Reparsing events. ", unit="event")
+
+        def write_oldest():
+            nonlocal n_events
+            df = pending.popleft().result()
+            df.to_csv(file, header=n_events == 0, index=False)
+            n_events += len(df)
+            progress.update(len(df))
+
+        for chunk in chunks:
+            pending.append(executor.submit(reparse_chunk, chunk, text_column))
+            if len(pending) >= 2 * max_workers:
+                write_oldest()
+        while pending:
+            write_oldest()
+        progress.close()
+
+    os.replace(temporary_path, output_path)
+    logger.info(f"{n_events} events reparsed from {input_path} @ {output_path}")
+    return output_path
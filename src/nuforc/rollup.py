@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .aggregation import hash_file
+from .event_io import read_event_frame
+
+logger = logging.getLogger("model.modules.aggregation")
+
+"""
+Event counts per day, shape, country and state, stored as a sparse cube and rolled up to longer periods on query.
+"""
+
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+CUBE_DIMENSIONS = ["shape", "country", "state"]
+# Only non-empty cells are stored.
+CUBE_SCHEMA = pa.schema(
+    [
+        ("date", pa.date32()),
+        ("shape", _CATEGORY),
+        ("country", _CATEGORY),
+        ("state", _CATEGORY),
+        ("count", pa.int32()),
+    ]
+)
+# Pandas period frequencies of the supported roll-ups; weeks start on Monday.
+PERIODS = {"day": "D", "week": "W-SUN", "month": "M", "year": "Y"}
+_INGESTED_FILES_KEY = b"nuforc.ingested_files"
+
+
+def count_events(events, time_column="occurred_time"):
+    """
+    Cube cells of an events frame: event counts per occurrence day, shape, country and state (the state
+    abbreviation where parsed, else the state name). Events without an occurrence time are left out.
+    """
+    state = events["state"].astype(object)
+    if "state_abbreviation" in events.columns:
+        abbreviation = events["state_abbreviation"].astype(object)
+        state = abbreviation.where(abbreviation.notna(), state)
+    cells = pd.DataFrame(
+        {
+            "date": pd.to_datetime(events[time_column], errors="coerce").dt.normalize(),
+            "shape": events["shape"].astype(object),
+            "country": events["country"].astype(object),
+            "state": state,
+        }
+    ).dropna(subset=["date"])
+    return (
+        cells.groupby(["date", *CUBE_DIMENSIONS], dropna=False, observed=True)
+        .size()
+        .rename("count")
+        .reset_index()
+    )
+
+
+class RollupCube:
+    """
+    Sparse cube of event counts per day × shape × country × state in one Parquet file, updated incrementally.
+
+    Args:
+        path: Cube file; an empty cube if it does not exist yet.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.ingested_files = []
+        if self.path.exists():
+            table = pq.read_table(self.path)
+            metadata = table.schema.metadata or {}
+            self.ingested_files = json.loads(metadata.get(_INGESTED_FILES_KEY, b"[]"))
+            self.cells = table.to_pandas()
+            self.cells["date"] = pd.to_datetime(self.cells["date"])
+        else:
+            self.cells = pd.DataFrame(
+                {
+                    "date": pd.Series(dtype="datetime64[ns]"),
+                    **{name: pd.Series(dtype=object) for name in CUBE_DIMENSIONS},
+                    "count": pd.Series(dtype="int32"),
+                }
+            )
+
+    def __len__(self):
+        return len(self.cells)
+
+    @property
+    def n_events(self):
+        return int(self.cells["count"].sum())
+
+    def add_cells(self, cells):
+        """
+        Add cube cells, e.g. from `count_events`, to the stored counts and save the cube, together with the files
+        marked as counted.
+        """
+        if not cells.empty:
+            merged = pd.concat(
+                [
+                    self.cells.astype({name: object for name in CUBE_DIMENSIONS}),
+                    cells.astype({name: object for name in CUBE_DIMENSIONS}),
+                ],
+                ignore_index=True,
+            )
+            self.cells = (
+                merged.groupby(["date", *CUBE_DIMENSIONS], dropna=False)["count"]
+                .sum()
+                .astype("int32")
+                .reset_index()
+            )
+        self.save()
+
+    def add_events(self, events, time_column="occurred_time"):
+        """
+        Count events into the cube. Events are not deduplicated; add each report once, e.g. after the hash index.
+        """
+        self.add_cells(count_events(events, time_column=time_column))
+
+    def mark_counted(self, paths):
+        """
+        Record files whose events are counted through `add_events`, e.g. by the crawl that wrote them, so `add_file`
+        skips them. Saved with the counts by the next `add_events`.
+        """
+        for path in paths:
+            file_hash = hash_file(path)
+            if file_hash not in self.ingested_files:
+                self.ingested_files.append(file_hash)
+
+    def add_file(self, path):
+        """
+        Count the events of an events file into the cube, unless a file with the same content was added before.
+
+        Returns:
+            Whether the file was added.
+        """
+        file_hash = hash_file(path)
+        if file_hash in self.ingested_files:
+            logger.info(f"{path} is already counted in the cube.")
+            return False
+        columns = ["occurred_time", "shape", "country", "state", "state_abbreviation"]
+        if Path(path).suffix == ".csv":
+            events = pd.read_csv(path, usecols=lambda column: column in columns)
+        else:
+            events = read_event_frame(path, columns=columns)
+        self.ingested_files.append(file_hash)
+        self.add_events(events)
+        logger.info(f"{len(events)} events of {path} counted in the cube.")
+        return True
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # A dimension without values comes out of `groupby` as float NaN, which Arrow cannot dictionary-encode.
+        cells = self.cells.astype({name: object for name in CUBE_DIMENSIONS}).assign(
+            date=self.cells["date"].dt.date
+        )
+        table = pa.Table.from_pandas(cells, schema=CUBE_SCHEMA, preserve_index=False)
+        table = table.replace_schema_metadata(
+            {_INGESTED_FILES_KEY: json.dumps(self.ingested_files).encode()}
+        )
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, self.path)
+
+    def query(
+        self,
+        period="month",
+        by=None,
+        shape=None,
+        country=None,
+        state=None,
+        start=None,
+        end=None,
+    ):
+        """
+        Event counts rolled up to `period`, with every period between the first and last event, zeros included.
+
+        Args:
+            period: `day`, `week`, `month` or `year`.
+            by: Dimension (`shape`, `country` or `state`) to split the counts into columns by, or None.
+            shape, country, state: Value or list of values to keep, matched case-insensitively.
+            start: First day included, or None.
+            end: First day excluded, or None.
+
+        Returns:
+            DataFrame indexed by period, with a `count` column or one column per value of `by`.
+        """
+        cells = self.cells
+        for name, values in (("shape", shape), ("country", country), ("state", state)):
+            if values is not None:
+                values = [values] if isinstance(values, str) else values
+                cells = cells[
+                    cells[name].str.lower().isin([value.lower() for value in values])
+                ]
+        if start is not None:
+            cells = cells[cells["date"] >= pd.Timestamp(start)]
+        if end is not None:
+            cells = cells[cells["date"] < pd.Timestamp(end)]
+
+        periods = cells["date"].dt.to_period(PERIODS[period]).rename("period")
+        keys = (
+            [periods]
+            if by is None
+            else [periods, cells[by].astype(object).fillna("unknown")]
+        )
+        counts = cells["count"].groupby(keys).sum()
+        counts = counts.to_frame() if by is None else counts.unstack(fill_value=0)
+        if counts.empty:
+            return counts
+        full_range = pd.period_range(
+            counts.index.min(), counts.index.max(), freq=PERIODS[period], name="period"
+        )
+        return counts.reindex(full_range, fill_value=0)
@@ -1,7 +1,7 @@
-import concurrent.futures
+import itertools
 import logging
-import pickle
 from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import date, datetime, timedelta
 from pathlib import Path
 from urllib.parse import urljoin
@@ -12,16 +12,57 @@ from dateutil.parser import parse
 from dateutil.relativedelta import *
 from tqdm.autonotebook import tqdm
 
+from src.nuforc.event_io import EventStoreWriter
+from src.nuforc.telemetry import CrawlMetrics, timed
+from src.nuforc.timestamps import parse_timestamp
 from src.nuforc.utility import (
     get_page,
     is_date,
     last_day_of_month,
     make_month_root_lookup,
 )
-from src.nuforc.wrangling import RawEventProcessor, parse_time
+from src.nuforc.wrangling import RawEventProcessor
 
 logger = logging.getLogger("model.modules.scraping")
 
+
+def submit_bounded(executor, fn, items, max_in_flight):
+    """
+    Lazily submit `fn(item)` for items of an iterable, with at most `max_in_flight` futures pending at a time.
+
+    Returns:
+        Generator of (item, future) pairs in completion order.
+    """
+    items = iter(items)
+    in_flight = {
+        executor.submit(fn, item): item
+        for item in itertools.islice(items, max_in_flight)
+    }
+    while in_flight:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield in_flight.pop(future), future
+            for item in itertools.islice(items, 1):
+                in_flight[executor.submit(fn, item)] = item
+
+
+def parse_event_page(page_text):
+    soup = BeautifulSoup(page_text, "html.parser")
+    raw_report = "".join([tag.text for tag in soup.find_all("tr")])
+    return raw_report
+
+
+def make_raw_event(status_code, page_text):
+    """
+    Raw report text of a downloaded event page, or a placeholder for blank and failed downloads.
+    """
+    if status_code == 200:
+        if page_text == "":
+            return "Blank report"
+        return parse_event_page(page_text)
+    return "Unable to download report"
+
+
 # TODO: Whole `scraping` module is now obsolete due to adoption of scrapy for scraping.
 class NUFORCScraper:
     available_scraping_modes = ["full", "timespan"]
@@ -33,6 +74,9 @@ class NUFORCScraper:
         timespan_end=None,
         n_scraping_retries=10,
         output_folder="output",
+        max_workers=32,
+        batch_size=1000,
+        metrics_format="prom",
     ):
         # Setting up lookups.
         self.month_to_url_lookup = make_month_root_lookup(
@@ -60,11 +104,16 @@ class NUFORCScraper:
 
         self.timespan_in_months = self._calculate_timespan_in_months()
         self.n_scraping_retries = n_scraping_retries
-        self.output_folder = None
-        self.parsed_month_root_pages = None
-        self.event_lookup = None
         self.month_root_urls_to_scrape = None
         self.output_folder = output_folder
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.events_path = None
+        self.n_events = 0
+        # Per-stage timings, retries and status codes; written to `metrics_path` ("prom" or "json") after scraping.
+        self.metrics = CrawlMetrics()
+        self.metrics_format = metrics_format
+        self.metrics_path = None
 
     def _validate_timespan_boundaries(self, timespan_start, timespan_end):
         if not is_date(timespan_start):
@@ -121,139 +170,169 @@ class NUFORCScraper:
             url=month_root_url,
             n_scraping_retries=n_scraping_retries,
             page_label="Month root page",
+            metrics=self.metrics,
+            stage="index_fetch",
         )
 
-    def parse_month_root_page(self, url, n_scraping_retries):
+    def read_month_root_page(self, url, n_scraping_retries):
+        """
+        Download a monthly index page and reduce it to its event URLs; the parsed page is dropped right away.
+        """
         response = self._get_month_root_page_response(
             month_root_url=url, n_scraping_retries=n_scraping_retries
         )
         if response and response.status_code == 200:
-            return BeautifulSoup(response.text, "html.parser")
-
-    def parse_month_root_pages(self, month_root_pages, n_scraping_retries):
-        futures = {}
-        with concurrent.futures.ThreadPoolExecutor(max_workers=32) as executor:
-            future_to_url = {
-                executor.submit(
-                    self.parse_month_root_page, url, n_scraping_retries
-                ): url
-                for url in month_root_pages
-            }
-            for future in tqdm(
-                concurrent.futures.as_completed(future_to_url),
-                total=len(month_root_pages),
-                desc="Sifting through month root pages. ",
-            ):
-                url = future_to_url[future]
-                try:
-                    data = future.result()
-                    futures[url] = data
-                except:
-                    logger.critical(
-                        f"Month root page at {url} returned an unhandled exception during scraping attempt."
-                    )
-                    futures[url] = None
-        return futures
-
-    def get_event_url_from_parsed_month_root_page(self, parsed_month_root_page):
-        event_tags = parsed_month_root_page.find_all("a", href=True)[1:]
-        events = {
-            parse_time(tag.text): urljoin(
-                "http://www.nuforc.org/webreports/", tag["href"]
-            )
-            for tag in event_tags
-        }
-
-        return events
-
-    def _make_event_url_lookup(self, parsed_month_root_pages):
-        event_lookup = {}
-        for page in tqdm(
-            parsed_month_root_pages.values(),
-            total=len(parsed_month_root_pages),
-            desc="Reading event dates. ",
+            with self.metrics.time("html_parse"):
+                return list(
+                    self.iter_event_urls(BeautifulSoup(response.text, "html.parser"))
+                )
+        logger.critical(f"Month root page at {url} could not be read.")
+        return []
+
+    def iter_event_urls(self, parsed_month_root_page):
+        """
+        Yield the URL of every event on a monthly index page, restricted to the timespan in "timespan" mode.
+        """
+        for tag in parsed_month_root_page.find_all("a", href=True)[1:]:
+            if self.scraping_mode == "timespan":
+                event_date = parse_timestamp(tag.text)
+                if event_date is None or not (
+                    self.timespan_start <= event_date <= self.timespan_end
+                ):
+                    continue
+            yield urljoin("http://www.nuforc.org/webreports/", tag["href"])
+
+    def iter_month_event_urls(self, executor, month_root_urls):
+        """
+        Yield event URLs of the given monthly index pages as pages finish downloading, skipping repeated URLs.
+        """
+        seen = set()
+        for url, future in submit_bounded(
+            executor,
+            lambda month_root_url: self.read_month_root_page(
+                month_root_url, self.n_scraping_retries
+            ),
+            month_root_urls,
+            max_in_flight=self.max_workers,
         ):
-            page_lookup = self.get_event_url_from_parsed_month_root_page(page)
-            event_lookup.update(page_lookup)
-
-        if self.scraping_mode == "timespan":
-            filtered_event_lookup = {}
-            for event_date, event_url in event_lookup.items():
-                if self.timespan_start <= event_date <= self.timespan_end:
-                    filtered_event_lookup[event_date] = event_url
-            return filtered_event_lookup
-        return event_lookup
+            try:
+                event_urls = future.result()
+            except Exception:
+                logger.critical(
+                    f"Month root page at {url} returned an unhandled exception during scraping attempt."
+                )
+                continue
+            for event_url in event_urls:
+                if event_url not in seen:
+                    seen.add(event_url)
+                    yield event_url
 
     def scrape_event(self, event_url, n_scraping_retries):
         event_scraper = EventScraper(
-            report_url=event_url, n_scraping_retries=n_scraping_retries
+            report_url=event_url,
+            n_scraping_retries=n_scraping_retries,
+            metrics=self.metrics,
         )
         event_scraper.scrape()
         return event_scraper.event
 
-    def _scrape_multiple_events(self, event_urls):
-        futures = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=32) as executor:
-            event_to_url = {
-                executor.submit(
-                    self.scrape_event, event_url, self.n_scraping_retries
-                ): event_url
-                for event_url in event_urls
-            }
-            for future in tqdm(
-                concurrent.futures.as_completed(event_to_url),
-                total=len(event_urls),
-                desc="Reading events. ",
-            ):
-                event_url = event_to_url[future]
-                try:
-                    event = future.result()
-                    futures.append(event)
-                except Exception as e:
-                    logger.critical(
-                        f"NUFORC event at {event_url} returned an unhandled exception during scraping attempt. {e}"
-                    )
-        return futures
-
-    def scrape(self):
+    def iter_events(self, executor, event_urls):
+        for event_url, future in tqdm(
+            submit_bounded(
+                executor,
+                lambda url: self.scrape_event(url, self.n_scraping_retries),
+                event_urls,
+                max_in_flight=self.max_workers * 4,
+            ),
+            desc="Reading events. ",
+        ):
+            try:
+                yield future.result()
+            except Exception as e:
+                self.metrics.inc("failed_events")
+                logger.critical(
+                    f"NUFORC event at {event_url} returned an unhandled exception during scraping attempt. {e}"
+                )
+
+    def select_month_root_urls(self):
         if self.scraping_mode == "full":
-            self.month_root_urls_to_scrape = self.month_to_url_lookup.values()
-        elif self.scraping_mode == "timespan":
-            self.month_root_urls_to_scrape = self.select_month_root_urls_to_scrape()
+            return list(self.month_to_url_lookup.values())
+        return self.select_month_root_urls_to_scrape()
 
-        self.parsed_month_root_pages = self.parse_month_root_pages(
-            month_root_pages=self.month_root_urls_to_scrape,
-            n_scraping_retries=self.n_scraping_retries,
-        )
-        self.event_lookup = self._make_event_url_lookup(
-            parsed_month_root_pages=self.parsed_month_root_pages
+    def make_events_path(self):
+        date_today = date.today().strftime("%Y_%m_%d")
+        return Path(self.output_folder) / f"events_{date_today}.parquet"
+
+    def make_metrics_path(self):
+        date_today = date.today().strftime("%Y_%m_%d")
+        return (
+            Path(self.output_folder)
+            / f"crawl_metrics_{date_today}.{self.metrics_format}"
         )
+
+    def write_batch(self, sink, batch):
+        with self.metrics.time("sink_write"):
+            sink.write(batch)
+        self.metrics.inc("events", len(batch))
+
+    def report_metrics(self):
+        """
+        Log the crawl's per-stage summary and write its metrics to `metrics_path`.
+        """
+        self.metrics.finish()
+        self.metrics.log_summary()
+        self.metrics_path = self.make_metrics_path()
+        self.metrics.write(self.metrics_path)
+        logger.info(f"Crawl metrics saved @ {self.metrics_path}")
+
+    def scrape(self):
+        """
+        Stream events from index pages to the output file; index pages and events are never held all at once, events
+        are flushed to the sink every `batch_size` events.
+        """
+        self.month_root_urls_to_scrape = self.select_month_root_urls()
         logger.info(
-            f"Scraping events from {min(self.event_lookup)} to {max(self.event_lookup)}."
-        )
-        self.events = self._scrape_multiple_events(
-            event_urls=self.event_lookup.values()
+            f"Scraping events from {self.timespan_start} to {self.timespan_end}."
         )
+        self.events_path = self.make_events_path()
+        # Month pages and events run on separate pools, so event downloads start as soon as the first index page is read.
+        with EventStoreWriter(
+            self.events_path, row_group_size=self.batch_size
+        ) as sink, ThreadPoolExecutor(
+            max_workers=self.max_workers
+        ) as month_executor, ThreadPoolExecutor(
+            max_workers=self.max_workers
+        ) as event_executor:
+            event_urls = self.iter_month_event_urls(
+                month_executor, self.month_root_urls_to_scrape
+            )
+            batch = []
+            for event in self.iter_events(event_executor, event_urls):
+                batch.append(event)
+                if len(batch) >= self.batch_size:
+                    self.write_batch(sink, batch)
+                    batch = []
+            self.write_batch(sink, batch)
+        self.n_events = sink.n_events
+        logger.info(f"{self.n_events} events saved @ {self.events_path}")
+        self.report_metrics()
 
     def save_events(self):
-        path = Path(self.output_folder)
-        path.mkdir(parents=True, exist_ok=True)
-        date_today = date.today().strftime("%Y_%m_%d")
-
-        filename_path = path / f"events_{date_today}.pkl"
-        metadata_filename = path / f"events_metadata_{date_today}.pkl"
-        with open(filename_path, "wb") as f:
-            pickle.dump(self.events, f)
-            logger.info(f"Events saved @ {filename_path}")
-        # with open(metadata_filename, "wb") as f:
-        #     pickle.dump(self.events_metadata, f)
+        """
+        Events are written to `events_path` while scraping; kept so callers running `scrape()` then `save_events()`
+        keep working.
+        """
+        if self.events_path is None:
+            raise RuntimeError("No events to save; run `scrape()` first.")
+        logger.info(f"Events saved @ {self.events_path}")
 
 
 class EventScraper:
-    def __init__(self, report_url, n_scraping_retries=10):
+    def __init__(self, report_url, n_scraping_retries=10, metrics=None):
         assert validators.url(report_url), f"{report_url} is not a valid URL."
         self.report_url = report_url
         self.n_scraping_retries = n_scraping_retries
+        self.metrics = metrics
         self.status = "unprocessed"
         self.page = None
         self.start_time = None
@@ -266,26 +345,21 @@ class EventScraper:
             url=self.report_url,
             n_scraping_retries=self.n_scraping_retries,
             page_label="Event page",
+            metrics=self.metrics,
+            stage="event_fetch",
         )
         self.status_code = self.page.status_code
 
     def _parse_event_page(self):
-        soup = BeautifulSoup(self.page.text, "html.parser")
-        raw_report = "".join([tag.text for tag in soup.find_all("tr")])
-        return raw_report
+        return parse_event_page(self.page.text)
 
     def _get_raw_event(self):
         """
         Downloads raw report from URL submitted to __init__ and parses according to page status code and page content.
         """
         self._get_event_page()
-        if self.status_code == 200:
-            if self.page.text == "":
-                self.raw_event = "Blank report"
-            else:
-                self.raw_event = self._parse_event_page()
-        else:
-            self.raw_event = "Unable to download report"
+        with timed(self.metrics, "html_parse"):
+            self.raw_event = make_raw_event(self.status_code, self.page.text)
 
     def _process_event(self):
         """
@@ -295,15 +369,18 @@ class EventScraper:
 
         # Event processing starts here.
         self._get_raw_event()
-        raw_event_processor = RawEventProcessor(
-            raw_event=self.raw_event, report_url=self.report_url
-        )
-        event = raw_event_processor.read_event()
+        with timed(self.metrics, "field_extraction"):
+            raw_event_processor = RawEventProcessor(
+                raw_event=self.raw_event, report_url=self.report_url
+            )
+            event = raw_event_processor.read_event()
         # Event processing ends here.
 
         self.status = "processed"
         self.end_time = datetime.now()
         self.duration = self.end_time - self.start_time
+        if self.metrics is not None:
+            self.metrics.observe("event", self.duration.total_seconds())
         return event
 
     def scrape(self):
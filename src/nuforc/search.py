@@ -0,0 +1,444 @@
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+from itertools import chain
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from nltk.stem import PorterStemmer
+from nltk.tokenize import RegexpTokenizer
+
+from .event_io import event_keys, read_event_frame
+
+logger = logging.getLogger("model.modules.search")
+
+"""
+Full-text search over report descriptions: a positional inverted index scored with BM25.
+
+The index is a directory of immutable segments, one per `add_events` call, and a `manifest.json` listing them; new
+crawl outputs are indexed into a new segment without touching the existing ones.
+"""
+
+DOCUMENT_COLUMNS = ["url", "hash", "shape", "state", "state_abbreviation", "country"]
+_TOKENIZER = RegexpTokenizer(r"\w+")
+_QUERY_TOKEN_REGEX = re.compile(r'"[^"]*"|\(|\)|[^\s()"]+')
+_STEMMER = PorterStemmer()
+
+
+@lru_cache(maxsize=2**18)
+def _stem(word):
+    return _STEMMER.stem(word)
+
+
+def analyze(text):
+    """
+    Lowercased, Porter-stemmed word tokens of a text, e.g. `Three silent triangles.` -> `['three', 'silent',
+    'triangl']`.
+    """
+    if not isinstance(text, str):
+        return []
+    return [_stem(token) for token in _TOKENIZER.tokenize(text.lower())]
+
+
+def _build_segment(texts):
+    """
+    Positional postings of `texts`, sorted by term, then document, then position.
+    """
+    token_lists = [
+        _TOKENIZER.tokenize(text.lower()) if isinstance(text, str) else []
+        for text in texts
+    ]
+    lengths = np.fromiter(map(len, token_lists), dtype=np.int32, count=len(texts))
+    words = np.fromiter(
+        chain.from_iterable(token_lists), dtype=object, count=int(lengths.sum())
+    )
+    # Every distinct word is stemmed once; terms are numbered in sorted order.
+    word_codes, unique_words = pd.factorize(words)
+    terms, word_terms = np.unique(
+        np.array([_stem(word) for word in unique_words], dtype=str), return_inverse=True
+    )
+    token_terms = word_terms.reshape(-1)[word_codes]
+    token_documents = np.repeat(np.arange(len(texts), dtype=np.int32), lengths)
+    token_positions = (
+        np.arange(len(words)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    ).astype(np.int32)
+    order = np.lexsort((token_positions, token_documents, token_terms))
+    token_terms, token_documents = token_terms[order], token_documents[order]
+
+    # One posting per (term, document) pair.
+    is_new_posting = np.ones(len(order), dtype=bool)
+    is_new_posting[1:] = (np.diff(token_terms) != 0) | (np.diff(token_documents) != 0)
+    posting_starts = np.flatnonzero(is_new_posting)
+    return {
+        "terms": terms,
+        "term_offsets": np.searchsorted(
+            token_terms[posting_starts], np.arange(len(terms) + 1)
+        ),
+        "posting_documents": token_documents[posting_starts],
+        "posting_offsets": np.append(posting_starts, len(order)),
+        "positions": token_positions[order],
+        "lengths": lengths,
+    }
+
+
+class _Segment:
+    def __init__(self, arrays, first_document):
+        self.first_document = first_document
+        self.term_offsets = arrays["term_offsets"]
+        self.posting_documents = arrays["posting_documents"]
+        self.posting_offsets = arrays["posting_offsets"]
+        self.positions = arrays["positions"]
+        self.term_ids = {term: i for i, term in enumerate(arrays["terms"].tolist())}
+
+    def postings(self, term):
+        """
+        Returns:
+            (global document ids, term frequencies, index of the first posting) of a term, or None.
+        """
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            return None
+        start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+        frequencies = np.diff(self.posting_offsets[start : end + 1])
+        return (
+            self.first_document + self.posting_documents[start:end],
+            frequencies,
+            start,
+        )
+
+    def position_keys(self, term, offset):
+        """
+        Sorted `document << 32 | position - offset` keys of every occurrence of a term, or None; occurrences of a
+        phrase's terms share a key when they follow each other, `offset` being the term's place in the phrase.
+        """
+        postings = self.postings(term)
+        if postings is None:
+            return None
+        documents, frequencies, first_posting = postings
+        positions = self.positions[
+            self.posting_offsets[first_posting] : self.posting_offsets[
+                first_posting + len(documents)
+            ]
+        ]
+        return (np.repeat(documents.astype(np.int64), frequencies) << 32) | (
+            positions.astype(np.int64) - offset + 2**31
+        )
+
+
+def _intersect_sorted(a, b):
+    """
+    Elements of sorted `a` also in sorted `b`, by binary search instead of `np.intersect1d`'s sort.
+    """
+    if not len(a) or not len(b):
+        return a[:0]
+    index = np.minimum(np.searchsorted(b, a), len(b) - 1)
+    return a[b[index] == a]
+
+
+def _parse_query(query):
+    """
+    Parse a query into a tree of ("and"|"or", children), ("not", child), ("term", term) and ("phrase", terms) nodes.
+    Terms next to each other are ANDed; AND binds tighter than OR.
+    """
+    tokens = _QUERY_TOKEN_REGEX.findall(query)
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    def parse_or():
+        nonlocal position
+        children = [parse_and()]
+        while peek() == "OR":
+            position += 1
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def parse_and():
+        nonlocal position
+        children = [parse_unary()]
+        while peek() not in (None, "OR", ")"):
+            if peek() == "AND":
+                position += 1
+            children.append(parse_unary())
+        return children[0] if len(children) == 1 else ("and", children)
+
+    def parse_unary():
+        nonlocal position
+        token = peek()
+        if token is None:
+            raise ValueError(f"Unexpected end of query: {query!r}")
+        position += 1
+        if token == "NOT":
+            return ("not", parse_unary())
+        if token == "(":
+            node = parse_or()
+            if peek() != ")":
+                raise ValueError(f"Unbalanced parentheses in query: {query!r}")
+            position += 1
+            return node
+        terms = analyze(token.strip('"'))
+        if token.startswith('"') and len(terms) > 1:
+            return ("phrase", terms)
+        # A word that analyzes to nothing, e.g. punctuation, matches nothing.
+        return ("term", terms[0] if terms else None)
+
+    node = parse_or()
+    if peek() is not None:
+        raise ValueError(f"Unexpected {peek()!r} in query: {query!r}")
+    return node
+
+
+class SearchIndex:
+    """
+    Persistent BM25 index of event descriptions, filterable by shape, state, country and occurrence date.
+
+    Args:
+        path: Index directory; created if missing.
+        k1, b: BM25 parameters.
+    """
+
+    def __init__(self, path, k1=1.2, b=0.75):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.k1 = k1
+        self.b = b
+        self.segments = []
+        self.documents = pd.DataFrame(
+            {
+                **{column: pd.Series(dtype="string") for column in DOCUMENT_COLUMNS},
+                "occurred_time": pd.Series(dtype="datetime64[ms]"),
+            }
+        )
+        self.lengths = np.zeros(0, dtype=np.int32)
+        # `event_keys` of the indexed documents.
+        self._keys = set()
+        self._filter_codes = {}
+
+        manifest_path = self.path / "manifest.json"
+        manifest = (
+            json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+        )
+        for name in manifest.get("segments", []):
+            self._load_segment(name)
+        logger.info(
+            f"Search index @ {self.path}: {len(self)} documents in {len(self.segments)} segments."
+        )
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def _load_segment(self, name):
+        with np.load(self.path / f"{name}.npz", allow_pickle=False) as arrays:
+            arrays = dict(arrays)
+        documents = pd.read_parquet(self.path / f"{name}.parquet")
+        self.segments.append(_Segment(arrays, first_document=len(self)))
+        self.lengths = np.concatenate([self.lengths, arrays["lengths"]])
+        self.documents = pd.concat([self.documents, documents], ignore_index=True)
+        self._keys.update(event_keys(documents).dropna())
+        self._filter_codes.clear()
+
+    def add_events(self, events):
+        """
+        Index the `description` of events not indexed yet, as a new segment; events are told apart by `event_keys`.
+
+        Args:
+            events: DataFrame with `description`, `occurred_time` and the `DOCUMENT_COLUMNS`.
+
+        Returns:
+            Number of events indexed.
+        """
+        events = events.reindex(
+            columns=[*DOCUMENT_COLUMNS, "occurred_time", "description"]
+        )
+        keys = event_keys(events)
+        events = events[~keys.isin(self._keys) & ~keys.duplicated()]
+        if events.empty:
+            return 0
+
+        segment = _build_segment(events["description"].tolist())
+        documents = events[DOCUMENT_COLUMNS].astype(object).astype("string")
+        documents["occurred_time"] = pd.to_datetime(
+            events["occurred_time"], errors="coerce"
+        )
+        documents = documents.reset_index(drop=True)
+
+        name = f"segment_{len(self.segments):05d}"
+        np.savez(self.path / f"{name}.npz", **segment)
+        documents.to_parquet(self.path / f"{name}.parquet", index=False)
+        # The manifest is replaced last, so a crash mid-write leaves the index as it was.
+        manifest_path = self.path / "manifest.json"
+        manifest = (
+            json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+        )
+        manifest["segments"] = [*manifest.get("segments", []), name]
+        tmp_path = manifest_path.with_name(f"{manifest_path.name}.tmp")
+        tmp_path.write_text(json.dumps(manifest, indent=1))
+        os.replace(tmp_path, manifest_path)
+
+        self._load_segment(name)
+        logger.info(f"{len(events)} events indexed in {name}.")
+        return len(events)
+
+    def add_file(self, path):
+        """
+        Index new events of an events file: a Parquet event store, a legacy events pickle or a raw events CSV.
+        """
+        columns = [*DOCUMENT_COLUMNS, "occurred_time", "description"]
+        if Path(path).suffix == ".csv":
+            events = pd.read_csv(path, usecols=lambda column: column in columns)
+        else:
+            events = read_event_frame(path, columns=columns)
+        return self.add_events(events)
+
+    def _postings(self, term):
+        """
+        Global document ids, term frequencies and (segment, first posting) of every segment holding a term.
+        """
+        documents, frequencies, locations = [], [], []
+        for segment in self.segments:
+            postings = segment.postings(term) if term is not None else None
+            if postings is not None:
+                documents.append(postings[0])
+                frequencies.append(postings[1])
+                locations.append((segment, postings[2]))
+        if not documents:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), []
+        return np.concatenate(documents), np.concatenate(frequencies), locations
+
+    def _phrase_documents(self, terms):
+        matches = []
+        for segment in self.segments:
+            keys = segment.position_keys(terms[0], 0)
+            for offset, term in enumerate(terms[1:], start=1):
+                if keys is None or not len(keys):
+                    break
+                term_keys = segment.position_keys(term, offset)
+                keys = (
+                    _intersect_sorted(keys, term_keys)
+                    if term_keys is not None
+                    else None
+                )
+            if keys is not None and len(keys):
+                matches.append(np.unique(keys >> 32))
+        return np.concatenate(matches) if matches else np.zeros(0, dtype=np.int64)
+
+    def _evaluate(self, node):
+        kind, argument = node
+        if kind == "term":
+            return self._postings(argument)[0]
+        if kind == "phrase":
+            return self._phrase_documents(argument)
+        if kind == "not":
+            return np.setdiff1d(np.arange(len(self)), self._evaluate(argument))
+        results = [self._evaluate(child) for child in argument]
+        combine = _intersect_sorted if kind == "and" else np.union1d
+        result = results[0]
+        for other in results[1:]:
+            result = combine(result, other)
+        return result
+
+    def _scored_terms(self, node):
+        kind, argument = node
+        if kind == "term":
+            return [argument] if argument is not None else []
+        if kind == "phrase":
+            return list(argument)
+        if kind == "not":
+            return []
+        return [term for child in argument for term in self._scored_terms(child)]
+
+    def _bm25(self, documents, terms):
+        scores = np.zeros(len(documents))
+        if not len(documents):
+            return scores
+        average_length = self.lengths.mean()
+        normalization = self.k1 * (
+            1 - self.b + self.b * self.lengths[documents] / average_length
+        )
+        for term in dict.fromkeys(terms):
+            term_documents, frequencies, _ = self._postings(term)
+            if not len(term_documents):
+                continue
+            idf = np.log(
+                1
+                + (len(self) - len(term_documents) + 0.5) / (len(term_documents) + 0.5)
+            )
+            # Segments hold ascending document ranges, so postings are already sorted.
+            index = np.searchsorted(term_documents, documents)
+            index[index == len(term_documents)] = 0
+            tf = np.where(term_documents[index] == documents, frequencies[index], 0)
+            scores += idf * tf * (self.k1 + 1) / (tf + normalization)
+        return scores
+
+    def _codes(self, column):
+        """
+        Lowercased category codes of a filter column for every document, and the categories.
+        """
+        if column not in self._filter_codes:
+            codes, categories = pd.factorize(self.documents[column].str.lower())
+            self._filter_codes[column] = (codes, pd.Index(categories))
+        return self._filter_codes[column]
+
+    def _isin(self, documents, column, values):
+        values = [values] if isinstance(values, str) else values
+        codes, categories = self._codes(column)
+        wanted = categories.get_indexer([value.lower() for value in values])
+        return np.isin(codes[documents], wanted[wanted >= 0])
+
+    def search(
+        self,
+        query,
+        shape=None,
+        state=None,
+        country=None,
+        start=None,
+        end=None,
+        limit=10,
+    ):
+        """
+        Args:
+            query: Words and "quoted phrases" combined with AND (the default), OR, NOT and parentheses, e.g.
+                `triangle AND silent`, `"bright light" NOT (plane OR drone)`. Words are stemmed, so `triangles`
+                matches `triangle`.
+            shape: Shape or list of shapes.
+            state: State name or abbreviation, or a list of them.
+            country: Country or list of countries.
+            start: First occurrence time included, or None.
+            end: First occurrence time excluded, or None.
+            limit: Number of results; None returns every match.
+
+        Returns:
+            DataFrame of matching documents, best BM25 `score` first.
+        """
+        node = _parse_query(query)
+        documents = self._evaluate(node)
+        mask = np.ones(len(documents), dtype=bool)
+        if shape is not None:
+            mask &= self._isin(documents, "shape", shape)
+        if country is not None:
+            mask &= self._isin(documents, "country", country)
+        if state is not None:
+            mask &= self._isin(documents, "state", state) | self._isin(
+                documents, "state_abbreviation", state
+            )
+        if start is not None or end is not None:
+            times = self.documents["occurred_time"].to_numpy()[documents]
+            if start is not None:
+                mask &= times >= np.datetime64(pd.Timestamp(start))
+            if end is not None:
+                mask &= times < np.datetime64(pd.Timestamp(end))
+        documents = documents[mask]
+
+        scores = self._bm25(documents, self._scored_terms(node))
+        if limit is not None and limit < len(scores):
+            top = np.argpartition(-scores, limit)[:limit]
+            order = top[np.argsort(-scores[top], kind="stable")]
+        else:
+            order = np.argsort(-scores, kind="stable")
+        results = self.documents.iloc[documents[order]].copy()
+        results.insert(0, "score", scores[order])
+        return results
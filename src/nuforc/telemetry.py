@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+logger = logging.getLogger("model.modules.scraping")
+
+"""
+Crawl telemetry: counters and per-stage latency histograms, exported as Prometheus text or a JSON summary.
+"""
+
+# Stages of a crawl, in pipeline order; scrapers may time others too, e.g. whole events.
+STAGES = ["index_fetch", "event_fetch", "html_parse", "field_extraction", "sink_write"]
+# Upper bounds, in seconds, of the latency histogram buckets; the last bucket is unbounded.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+METRIC_PREFIX = "nuforc_crawl"
+
+
+def _round(seconds):
+    return round(seconds, 6) if seconds is not None else None
+
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets; not thread-safe on its own.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """
+        Quantile estimated by linear interpolation within its bucket, as Prometheus' `histogram_quantile` does.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                estimate = lower + (upper - lower) * (rank - cumulative) / count
+                return min(estimate, self.max)
+            cumulative += count
+        return self.max
+
+
+class CrawlMetrics:
+    """
+    Thread-safe counters and per-stage latency histograms of one crawl.
+
+    Stage latencies add up over concurrent workers, so a stage's `busy_seconds` can exceed the crawl's wall time. The
+    `busiest_stage` is where the crawl spends its time, and the first candidate for what bounds throughput.
+    """
+
+    def __init__(self):
+        self.start_time = time.monotonic()
+        self.end_time = None
+        self.histograms = {stage: Histogram() for stage in STAGES}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            if stage not in self.histograms:
+                self.histograms[stage] = Histogram()
+            self.histograms[stage].observe(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted((label, str(v)) for label, v in labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def record_status(self, stage, status_code):
+        self.inc("http_responses", stage=stage, status=status_code)
+
+    def record_retry(self, stage, reason=None):
+        self.inc("retries", stage=stage, reason=reason or "unknown")
+
+    def counter(self, name, **labels):
+        """
+        Sum of a counter over all label values not fixed by `labels`.
+        """
+        wanted = {(label, str(v)) for label, v in labels.items()}
+        with self._lock:
+            return sum(
+                value
+                for (key, key_labels), value in self.counters.items()
+                if key == name and wanted <= set(key_labels)
+            )
+
+    def finish(self):
+        self.end_time = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return (self.end_time or time.monotonic()) - self.start_time
+
+    def summary(self):
+        """
+        Per-stage counts, busy time and latency quantiles, counters, throughput and the busiest stage.
+        """
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": histogram.count,
+                    "busy_seconds": round(histogram.sum, 6),
+                    "mean_seconds": (
+                        round(histogram.sum / histogram.count, 6)
+                        if histogram.count
+                        else None
+                    ),
+                    "p50_seconds": _round(histogram.quantile(0.5)),
+                    "p95_seconds": _round(histogram.quantile(0.95)),
+                    "max_seconds": _round(histogram.max) if histogram.count else None,
+                }
+                for stage, histogram in self.histograms.items()
+            }
+            counters = {}
+            for (name, labels), value in sorted(self.counters.items()):
+                label_text = ",".join(f"{label}={v}" for label, v in labels)
+                counters[f"{name}{{{label_text}}}" if labels else name] = value
+        busy = {stage: stages[stage]["busy_seconds"] for stage in STAGES}
+        elapsed = self.elapsed
+        n_events = self.counter("events")
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "events": n_events,
+            "events_per_second": round(n_events / elapsed, 3) if elapsed else None,
+            "busiest_stage": max(busy, key=busy.get) if any(busy.values()) else None,
+            "stages": stages,
+            "counters": counters,
+        }
+
+    def to_prometheus(self):
+        """
+        Metrics in the Prometheus text exposition format, e.g. for the node exporter's textfile collector.
+        """
+        lines = [
+            f"# HELP {METRIC_PREFIX}_stage_seconds Time spent per crawl stage.",
+            f"# TYPE {METRIC_PREFIX}_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, histogram in self.histograms.items():
+                cumulative = 0
+                for bound, count in zip([*histogram.buckets, "+Inf"], histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f'{METRIC_PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'{METRIC_PREFIX}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}'
+                )
+                lines.append(
+                    f'{METRIC_PREFIX}_stage_seconds_count{{stage="{stage}"}} {histogram.count}'
+                )
+            names = sorted({name for name, _ in self.counters})
+            for name in names:
+                lines.append(f"# TYPE {METRIC_PREFIX}_{name}_total counter")
+                for (key, labels), value in sorted(self.counters.items()):
+                    if key != name:
+                        continue
+                    label_text = ",".join(f'{label}="{v}"' for label, v in labels)
+                    lines.append(
+                        f"{METRIC_PREFIX}_{name}_total{{{label_text}}} {value}"
+                        if labels
+                        else f"{METRIC_PREFIX}_{name}_total {value}"
+                    )
+        lines.append(f"# TYPE {METRIC_PREFIX}_elapsed_seconds gauge")
+        lines.append(f"{METRIC_PREFIX}_elapsed_seconds {self.elapsed}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Write the JSON summary to a `.json` path, else Prometheus text.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == ".json":
+            text = json.dumps(self.summary(), indent=2)
+        else:
+            text = self.to_prometheus()
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        tmp_path.write_text(text)
+        os.replace(tmp_path, path)
+
+    def log_summary(self):
+        summary = self.summary()
+        logger.info(
+            f"{summary['events']} events in {summary['elapsed_seconds']} s "
+            f"({summary['events_per_second']} events/s); busiest stage: {summary['busiest_stage']}."
+        )
+        for stage, values in summary["stages"].items():
+            if values["count"]:
+                logger.info(
+                    f"{stage}: {values['count']} x, {values['busy_seconds']} s busy, "
+                    f"mean {values['mean_seconds']} s, p95 {values['p95_seconds']} s."
+                )
+
+
+def timed(metrics, stage):
+    """
+    `metrics.time(stage)`, or a no-op when there are no metrics.
+    """
+    return metrics.time(stage) if metrics is not None else nullcontext()
@@ -0,0 +1,134 @@
+from datetime import date, datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from nuforc.regexes import DATETIME_REGEX, TIMESTAMP_REGEX
+
+"""
+NUFORC timestamp parsing.
+
+NUFORC always writes timestamps as `M/D/YY[YY] H:MM[:SS]`, so they are read straight from the regex groups instead of
+going through a generic date parser.
+"""
+
+# Two-digit years up to the current one are read as 20YY, later ones as 19YY: NUFORC has no future sightings.
+_TWO_DIGIT_YEAR_PIVOT = date.today().year % 100
+
+
+def expand_year(year):
+    if year >= 100:
+        return year
+    return year + (2000 if year <= _TWO_DIGIT_YEAR_PIVOT else 1900)
+
+
+@lru_cache(maxsize=2**16)
+def datetime_from_groups(event_date, hour=None, minute=None, second=None):
+    """
+    Build a datetime from the `date`, `hour`, `minute` and `second` groups of `DATETIME_REGEX`/`TIMESTAMP_REGEX`.
+
+    Returns:
+        `datetime`, or None if the groups don't form a valid date (e.g. `2/30/22`).
+    """
+    month, day, year = event_date.split("/")
+    try:
+        return datetime(
+            expand_year(int(year)),
+            int(month),
+            int(day),
+            int(hour or 0),
+            int(minute or 0),
+            int(second or 0),
+        )
+    except ValueError:
+        return None
+
+
+def parse_event_time(segment):
+    """
+    Parse the segment following a time header of a report, e.g. `8/15/2022 21:00  (`.
+
+    Returns:
+        `datetime`, or None if the segment is missing or doesn't start with a date and time.
+    """
+    if segment is None:
+        return None
+    match = DATETIME_REGEX.match(segment)
+    if match is None:
+        return None
+    return datetime_from_groups(*match.group("date", "hour", "minute", "second"))
+
+
+@lru_cache(maxsize=2**16)
+def parse_timestamp(text):
+    """
+    Parse the first NUFORC timestamp in a string, e.g. the link text `8/15/22 21:00` of a monthly index page.
+
+    Returns:
+        `datetime`, or None if the string holds no valid timestamp.
+    """
+    match = TIMESTAMP_REGEX.search(text)
+    if match is None:
+        return None
+    return datetime_from_groups(*match.group("date", "hour", "minute", "second"))
+
+
+def datetimes_from_groups(parts):
+    """
+    Column-wise `datetime_from_groups`.
+
+    Args:
+        parts: DataFrame with `date`, `hour`, `minute` and `second` columns as extracted by `Series.str.extract`.
+
+    Returns:
+        `datetime64[s]` array, NaT where the groups are missing or don't form a valid date.
+    """
+    dates = parts["date"].str.split("/", expand=True).reindex(columns=range(3))
+    years = pd.to_numeric(dates[2], errors="coerce")
+    years = years.where(
+        years >= 100,
+        years + np.where(years <= _TWO_DIGIT_YEAR_PIVOT, 2000, 1900),
+    )
+    components = pd.DataFrame(
+        {
+            "year": years,
+            "month": pd.to_numeric(dates[0], errors="coerce"),
+            "day": pd.to_numeric(dates[1], errors="coerce"),
+            "hour": pd.to_numeric(parts["hour"], errors="coerce").fillna(0),
+            "minute": pd.to_numeric(parts["minute"], errors="coerce").fillna(0),
+            "second": pd.to_numeric(parts["second"], errors="coerce").fillna(0),
+        }
+    )
+    return pd.to_datetime(components, errors="coerce").to_numpy(dtype="datetime64[s]")
+
+
+def parse_event_times(segments):
+    """
+    Column-wise `parse_event_time`.
+
+    Args:
+        segments: Series of segments following a time header.
+
+    Returns:
+        `datetime64[s]` array, NaT where no timestamp could be read.
+    """
+    parts = segments.str.extract(
+        r"\A" + DATETIME_REGEX.pattern, flags=DATETIME_REGEX.flags
+    )
+    return datetimes_from_groups(parts)
+
+
+def parse_timestamps(texts):
+    """
+    Column-wise `parse_timestamp`.
+
+    Args:
+        texts: Iterable of strings, e.g. every link text of a monthly index page.
+
+    Returns:
+        `datetime64[s]` array, NaT where no timestamp could be read.
+    """
+    texts = pd.Series(texts, dtype=object)
+    parts = texts.str.extract(TIMESTAMP_REGEX)
+    return datetimes_from_groups(parts)
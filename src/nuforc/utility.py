@@ -1,5 +1,6 @@
 import datetime
 import logging
+import time
 from urllib.parse import urljoin
 
 import requests
@@ -10,12 +11,20 @@ from requests.exceptions import ConnectionError, ConnectTimeout, ReadTimeout
 logger = logging.getLogger("model.modules.utility")
 
 
-def get_page(url, n_scraping_retries=10, page_label=""):
+def get_page(url, n_scraping_retries=10, page_label="", metrics=None, stage="fetch"):
+    """
+    Download a page, retrying connection errors and timeouts. With `metrics`, the download time (retries included),
+    status code and retries are recorded under `stage`.
+    """
     attempt = 0
+    start = time.perf_counter()
     while attempt != n_scraping_retries:
         try:
             page = requests.get(url, timeout=5)
             logger.debug(f"{page_label} {url} downloaded.")
+            if metrics is not None:
+                metrics.observe(stage, time.perf_counter() - start)
+                metrics.record_status(stage, page.status_code)
             return page
         except (ConnectTimeout, ConnectionError, ReadTimeout) as e:
             attempt += 1
@@ -23,10 +32,14 @@ def get_page(url, n_scraping_retries=10, page_label=""):
                 logger.warning(
                     f"{page_label} {url} download failed. Retries left: {n_scraping_retries - attempt}. Cause: {e}"
                 )
+                if metrics is not None:
+                    metrics.record_retry(stage, type(e).__name__)
             elif attempt == n_scraping_retries:
                 logger.critical(
                     f"{page_label} {url} download failed after max retries."
                 )
+                if metrics is not None:
+                    metrics.inc("failed_downloads", stage=stage)
                 return None
 
 
@@ -1,22 +1,177 @@
-import pickle
+import json
+from pathlib import Path
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 
+from .event_io import EVENT_SCHEMA, read_event_frame, read_location_table
 
-def make_playset(events_path, geocoded_path):
-    with open(events_path, "rb") as pickle_file:
-        data = pickle.load(pickle_file)
-    events = pd.DataFrame(data)
+# Playset columns; `raw_text` and `hash` only matter for re-parsing and deduplication.
+PLAYSET_COLUMNS = [
+    name for name in EVENT_SCHEMA.names if name not in ("raw_text", "hash", "address")
+]
 
-    with open(geocoded_path, "rb") as pickle_file:
-        data = pickle.load(pickle_file)
-    geocoded = pd.DataFrame(data)
 
-    df = events.merge(geocoded, on=["city", "state", "state_abbreviation", "country"])
-    return df
+def make_playset(events_path, geocoded_path, columns=PLAYSET_COLUMNS):
+    """
+    Events joined with their coordinates on the integer `location_id`.
+
+    Args:
+        events_path: Parquet event store, or a legacy events pickle.
+        geocoded_path: Location table written by `geocode.py`, or a legacy geocoding output pickle.
+    """
+    events = read_event_frame(events_path, columns=columns)
+    locations = read_location_table(geocoded_path)[
+        ["location_id", "address", "latitude", "longitude"]
+    ]
+    return events.merge(locations, on="location_id")
 
 
 def gdf_to_geo_file(gdf, output_path, filetype=None):
     if not filetype:
         gdf.to_file(output_path)
+    else:
+        gdf.to_file(output_path, driver=filetype)
+
+
+# Half the width of the Web Mercator world square, in meters.
+WEB_MERCATOR_EXTENT = 20037508.342789244
+TILE_SIZE = 256
+
+
+def lonlat_to_web_mercator(longitude, latitude):
+    longitude = np.asarray(longitude, dtype=float)
+    latitude = np.clip(np.asarray(latitude, dtype=float), -85.0511, 85.0511)
+    x = np.radians(longitude) * 6378137.0
+    y = np.log(np.tan(np.pi / 4 + np.radians(latitude) / 2)) * 6378137.0
+    return x, y
+
+
+def _valid_points(gdf):
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(4326)
+    return gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty]
+
+
+def export_tiles(gdf, output_dir, min_zoom=0, max_zoom=10, cmap=("#fff5eb", "#7f2704")):
+    """
+    Render event points into `{z}/{x}/{y}.png` XYZ tiles with datashader.
+
+    Only tiles holding events are written. Colors are log-scaled against the densest pixel of each zoom level, so
+    neighbouring tiles share one color scale.
+
+    Args:
+        gdf: GeoDataFrame of event points.
+        output_dir: Directory for the tile pyramid.
+
+    Returns:
+        Number of tiles written.
+    """
+    import datashader as ds
+    import datashader.transfer_functions as tf
+
+    gdf = _valid_points(gdf)
+    x, y = lonlat_to_web_mercator(gdf.geometry.x, gdf.geometry.y)
+    output_dir = Path(output_dir)
+
+    n_tiles = 0
+    for zoom in range(min_zoom, max_zoom + 1):
+        n = 2**zoom
+        tile_span = 2 * WEB_MERCATOR_EXTENT / n
+        # Global pixel coordinates, rows counted from the top as in XYZ tiles.
+        pixel_x = np.clip(
+            ((x + WEB_MERCATOR_EXTENT) / tile_span * TILE_SIZE).astype(np.int64),
+            0,
+            n * TILE_SIZE - 1,
+        )
+        pixel_y = np.clip(
+            ((WEB_MERCATOR_EXTENT - y) / tile_span * TILE_SIZE).astype(np.int64),
+            0,
+            n * TILE_SIZE - 1,
+        )
+        max_pixel_count = np.unique(
+            pixel_x * n * TILE_SIZE + pixel_y, return_counts=True
+        )[1].max(initial=1)
+
+        tile_keys, tile_codes = np.unique(
+            (pixel_x // TILE_SIZE) * n + pixel_y // TILE_SIZE, return_inverse=True
+        )
+        order = np.argsort(tile_codes, kind="stable")
+        boundaries = np.searchsorted(tile_codes[order], np.arange(len(tile_keys) + 1))
+        for i, tile_key in enumerate(tile_keys):
+            members = order[boundaries[i] : boundaries[i + 1]]
+            tile_x, tile_y = divmod(int(tile_key), n)
+            x_min = -WEB_MERCATOR_EXTENT + tile_x * tile_span
+            y_max = WEB_MERCATOR_EXTENT - tile_y * tile_span
+            canvas = ds.Canvas(
+                plot_width=TILE_SIZE,
+                plot_height=TILE_SIZE,
+                x_range=(x_min, x_min + tile_span),
+                y_range=(y_max - tile_span, y_max),
+            )
+            agg = canvas.points(
+                pd.DataFrame({"x": x[members], "y": y[members]}), "x", "y"
+            )
+            image = tf.shade(
+                agg, cmap=list(cmap), how="log", span=(1, max(max_pixel_count, 2))
+            )
+            image = tf.spread(image, px=1)
+
+            tile_path = output_dir / str(zoom) / str(tile_x) / f"{tile_y}.png"
+            tile_path.parent.mkdir(parents=True, exist_ok=True)
+            image.to_pil().save(tile_path)
+            n_tiles += 1
+    return n_tiles
+
+
+def make_overview_layer(gdf, cell_size=1.0):
+    """
+    Aggregate event points into a `cell_size` degree grid.
+
+    Returns:
+        GeoDataFrame with one point per non-empty cell, at the cell center, and its event `count`.
+    """
+    gdf = _valid_points(gdf)
+    cells = pd.DataFrame(
+        {
+            "cell_x": np.floor(gdf.geometry.x.to_numpy() / cell_size),
+            "cell_y": np.floor(gdf.geometry.y.to_numpy() / cell_size),
+        }
+    )
+    counts = cells.groupby(["cell_x", "cell_y"]).size().rename("count").reset_index()
+    return gpd.GeoDataFrame(
+        {"count": counts["count"]},
+        geometry=gpd.points_from_xy(
+            (counts["cell_x"] + 0.5) * cell_size, (counts["cell_y"] + 0.5) * cell_size
+        ),
+        crs=4326,
+    )
+
+
+def export_dashboard_layers(
+    gdf, output_dir, min_zoom=0, max_zoom=10, overview_cell_size=1.0
+):
+    """
+    Write the dashboard's layers: a `tiles/` pyramid of event tiles, a small `overview.geojson` grid layer and a
+    `metadata.json` describing both. The dashboard loads only the overview at startup; tiles are fetched per view.
+    """
+    gdf = _valid_points(gdf)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    n_tiles = export_tiles(
+        gdf, output_dir / "tiles", min_zoom=min_zoom, max_zoom=max_zoom
+    )
+    overview = make_overview_layer(gdf, cell_size=overview_cell_size)
+    gdf_to_geo_file(overview, output_dir / "overview.geojson", filetype="GeoJSON")
+    metadata = {
+        "n_events": int(len(gdf)),
+        "n_tiles": n_tiles,
+        "min_zoom": min_zoom,
+        "max_zoom": max_zoom,
+        "bounds": [float(bound) for bound in gdf.total_bounds],
+        "overview_cell_size": overview_cell_size,
+    }
+    with open(output_dir / "metadata.json", "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=1)
+    return metadata
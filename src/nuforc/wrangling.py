@@ -1,24 +1,57 @@
 import hashlib
 import logging
-import re
+import sqlite3
+import threading
+from collections import OrderedDict
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
 import parsedatetime
 import us
 from iso3166 import countries
 
+from nuforc.durations import (
+    clean_time_string,
+    parse_duration,
+    parse_duration_seconds,
+    parse_durations,
+)
+from nuforc.geocoding.wrangling import join_address_columns
 from nuforc.lookups.geography_lookups import (
     CAN_PROVINCE_NAMES,
     NON_ISO_3166_COUNTRY_NAMES,
 )
+from nuforc.models.events import NUFORCEvent
+from nuforc.regexes import (
+    BEFORE_BRACKET_REGEX,
+    BRACKETED_REGEX,
+    CANADIAN_STATE_ABBREVIATION_REGEX,
+    COUNTRY_NAME_CHARACTERS_TO_REMOVE_REGEX,
+    EVENT_FIELD_REGEX,
+    EVENT_FIELD_SEGMENT_REGEXES,
+    REGEX_DICT,
+    US_STATE_ABBREVIATION_REGEX,
+)
+from nuforc.timestamps import (
+    datetime_from_groups,
+    parse_event_time,
+    parse_event_times,
+)
 
-from nuforc.regexes import REGEX_DICT
 logger = logging.getLogger("model.modules.wrangling")
 
+LOCATION_FIELDS = ["city", "state", "state_abbreviation", "country"]
+CATEGORICAL_FIELDS = ["shape", "state", "state_abbreviation", "country"]
+LINE_BREAK_PATTERN = r"\r\n|\r|\n"
+# Bump when `parse_location` or the location regexes change, so stale cached locations are not read back.
+_LOCATION_PARSER_VERSION = 1
+
 """
 Raw NUFORC event text wrangling functions.
 """
 
+
 def preprocess_text(response):
     text = " ".join(response).strip()
     return text
@@ -43,45 +76,29 @@ def extract_url(text):
 def extract_city(text):
     location_match = REGEX_DICT["location"].search(text)
     if location_match is not None:
-        location_match = location_match.group()
-        try:
-            info = get_city_from_location(location_match)
-            return info
-        except:
-            return "unparsed"
+        location = get_location_resolver().resolve(location_match.group())
+        return location["city"]
 
 
 def extract_state_abbreviation(text):
     location_match = REGEX_DICT["location"].search(text)
     if location_match is not None:
-        location_match = location_match.group()
-        try:
-            info = get_state_info(location_match)["state_abbreviation"]
-            return info
-        except:
-            return "unparsed"
+        location = get_location_resolver().resolve(location_match.group())
+        return location["state_abbreviation"]
 
 
 def extract_state(text):
     location_match = REGEX_DICT["location"].search(text)
     if location_match is not None:
-        location_match = location_match.group()
-        try:
-            info = get_state_info(location_match)["state"].name
-            return info
-        except:
-            return "unparsed"
+        location = get_location_resolver().resolve(location_match.group())
+        return location["state"]
 
 
 def extract_country(text):
     location_match = REGEX_DICT["location"].search(text)
     if location_match is not None:
-        location_match = location_match.group()
-        try:
-            info = get_country_from_location(location_match)
-            return info
-        except:
-            return "unparsed"
+        location = get_location_resolver().resolve(location_match.group())
+        return location["country"]
 
 
 def extract_duration(text):
@@ -91,46 +108,366 @@ def extract_duration(text):
     match = REGEX_DICT["duration"].search(text)
     if match is not None:
         time_string = match.group()
-        return parse_duration(time_string)
+        return parse_duration_seconds(time_string)
     else:
-        return "unparsed"
+        return np.nan
 
 
 def extract_time(text, time_type):
-    match = REGEX_DICT[time_type].findall(text)
+    match = REGEX_DICT[time_type].search(text)
     if match is not None:
-        try:
-            match = [s for s in match[0] if s != ""][1:]
-            event_date = match[0]
-            event_time = ":".join(match[1:])
-            event_datetime = " ".join([event_date, event_time])
-            return event_datetime
-        except:
-            return "unparsed"
+        return datetime_from_groups(*match.group(2, 3, 4, 5))
 
 
 def extract_shape(text):
     match = REGEX_DICT["shape"].search(text)
     if match is not None:
         info = match.group()
-        return info.lower()
+        return info.strip().lower()
     else:
         return "unparsed"
 
 
-def get_state_info(location):
-    us_state_abbreviation_regex = re.compile(
-        "(A[KLRZ]|C[AOT]|D[CE]|FL|GA|HI|I[ADLN]|K[SY]|LA|M[ADEINOST]|N[CDEHJMVY]|O[HKR]|PA|RI|S[CD]|T[NX]|UT|V[AT]|W[AIVY])",
-        re.VERBOSE,
+def tokenize_event_text(text):
+    """
+    Split a raw report into per-field segments with a single scan of `EVENT_FIELD_REGEX`.
+
+    Args:
+        text: Raw report text.
+
+    Returns:
+        Dictionary mapping a field name (e.g. `location`) to the text following its header, up to the next header
+        or the end of the line. Only the first occurrence of each header is kept.
+    """
+    segments = {}
+    matches = list(EVENT_FIELD_REGEX.finditer(text))
+    for i, match in enumerate(matches):
+        field = match.lastgroup
+        if field in segments:
+            continue
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        line_end = text.find("\n", match.end(), end)
+        if line_end != -1:
+            end = line_end
+        segments[field] = text[match.end() : end]
+    return segments
+
+
+def parse_location(location):
+    """
+    Resolve city, state, state abbreviation and country from a single `Location:` string.
+
+    Args:
+        location: Location string, e.g. `Phoenix, AZ` or `London (UK/England)`; None if the report has none.
+
+    Returns:
+        Dictionary with `city`, `state`, `state_abbreviation` and `country` keys.
+    """
+    if location is None:
+        return {
+            "city": None,
+            "state": None,
+            "state_abbreviation": None,
+            "country": None,
+        }
+
+    location = location.strip()
+    state_info = get_state_info(location)
+    try:
+        city = get_city_from_location(location)
+    except:
+        city = "unparsed"
+
+    if state_info is not None:
+        # US states are `us.states.State` objects, Canadian provinces are plain names.
+        state = getattr(state_info["state"], "name", state_info["state"])
+        state_abbreviation = state_info["state_abbreviation"]
+        country = state_info["country"]
+    else:
+        state = "unparsed"
+        state_abbreviation = "unparsed"
+        try:
+            country = get_country_from_location(location)
+        except:
+            country = "unparsed"
+
+    return {
+        "city": city,
+        "state": state,
+        "state_abbreviation": state_abbreviation,
+        "country": country,
+    }
+
+
+class LocationResolver:
+    """
+    Memoized `parse_location`.
+
+    Resolved locations are kept in a bounded in-memory LRU and, if `cache_path` is given, in an SQLite table that
+    survives between runs. Both are keyed by the whitespace-normalized location string; the table is cleared when it
+    was written by another `_LOCATION_PARSER_VERSION`.
+    """
+
+    def __init__(self, maxsize=2**16, cache_path=None, flush_every=1000):
+        self.maxsize = maxsize
+        self.cache_path = cache_path
+        self.flush_every = flush_every
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._pending_writes = []
+        self._lock = threading.Lock()
+        self._connection = None
+        if cache_path is not None:
+            self._connection = sqlite3.connect(str(cache_path), check_same_thread=False)
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS locations (
+                    location TEXT PRIMARY KEY,
+                    city TEXT,
+                    state TEXT,
+                    state_abbreviation TEXT,
+                    country TEXT
+                )
+                """)
+            (version,) = self._connection.execute("PRAGMA user_version").fetchone()
+            if version != _LOCATION_PARSER_VERSION:
+                self._connection.execute("DELETE FROM locations")
+                self._connection.execute(
+                    f"PRAGMA user_version = {int(_LOCATION_PARSER_VERSION)}"
+                )
+            self._connection.commit()
+
+    @staticmethod
+    def normalize(location):
+        return " ".join(location.split())
+
+    def resolve(self, location):
+        """
+        Resolve a location string into a `parse_location` record.
+
+        The returned dictionary is shared between calls for the same location and must not be modified.
+        """
+        if location is None:
+            return parse_location(None)
+
+        key = self.normalize(location)
+        with self._lock:
+            record = self._cache.get(key)
+            if record is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return record
+
+            record = self._read_from_disk(key)
+            if record is not None:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+                record = parse_location(key)
+                self._write_to_disk(key, record)
+
+            self._cache[key] = record
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+            return record
+
+    def _read_from_disk(self, key):
+        if self._connection is None:
+            return None
+        row = self._connection.execute(
+            "SELECT city, state, state_abbreviation, country FROM locations WHERE location = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("city", "state", "state_abbreviation", "country"), row))
+
+    def _write_to_disk(self, key, record):
+        if self._connection is None:
+            return
+        self._pending_writes.append(
+            (
+                key,
+                record["city"],
+                record["state"],
+                record["state_abbreviation"],
+                record["country"],
+            )
+        )
+        if len(self._pending_writes) >= self.flush_every:
+            self._flush()
+
+    def _flush(self):
+        if self._connection is None or not self._pending_writes:
+            return
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO locations VALUES (?, ?, ?, ?, ?)",
+            self._pending_writes,
+        )
+        self._connection.commit()
+        self._pending_writes = []
+
+    def flush(self):
+        """
+        Write locations resolved since the last flush to the on-disk table.
+        """
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        self.flush()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "size": len(self._cache),
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+
+_location_resolver = LocationResolver()
+
+
+def get_location_resolver():
+    return _location_resolver
+
+
+def set_location_resolver(location_resolver):
+    """
+    Replace the `LocationResolver` used by `parse_event_text` and the `extract_*` location functions, e.g. with one
+    backed by an on-disk table. The previous resolver is flushed and closed.
+    """
+    global _location_resolver
+    _location_resolver.close()
+    _location_resolver = location_resolver
+
+
+def parse_event_text(text):
+    """
+    Parse every field of a raw NUFORC report in one pass.
+
+    The report is tokenized once by `tokenize_event_text` and each field is read from its own segment, so the
+    location is resolved once instead of once per location field.
+
+    Args:
+        text: Raw report text, e.g. the `raw_text` field of `NuforcEventItem`.
+
+    Returns:
+        Dictionary with `url`, `occurred_time`, `reported_time`, `entered_as_time`, `shape`, `duration`, `city`,
+        `state`, `state_abbreviation`, `country` and `description` keys.
+    """
+    lines = text.splitlines()
+    segments = tokenize_event_text(text)
+
+    shape = segments.get("shape")
+    duration = segments.get("duration")
+    record = {
+        "url": lines[0].strip() if lines else "unparsed",
+        "occurred_time": parse_event_time(segments.get("occurred_time")),
+        "reported_time": parse_event_time(segments.get("reported_time")),
+        "entered_as_time": parse_event_time(segments.get("entered_as_time")),
+        "shape": shape.strip().lower() if shape is not None else "unparsed",
+        "duration": parse_duration_seconds(duration),
+    }
+    record.update(get_location_resolver().resolve(segments.get("location")))
+    record["description"] = "".join(lines[2:]).strip()
+    return record
+
+
+class RawEventProcessor:
+    def __init__(self, raw_event, report_url=None):
+        self.raw_event = raw_event
+        self.report_url = report_url
+
+    def read_event(self):
+        """
+        Parse the raw report into a `NUFORCEvent`.
+        """
+        report_ok = self.raw_event not in ("Blank report", "Unable to download report")
+        fields = parse_event_text(self.raw_event)
+        if self.report_url is not None:
+            fields["url"] = self.report_url
+        return NUFORCEvent(report_ok=report_ok, raw_event=self.raw_event, **fields)
+
+
+def _extract_segments(text, field):
+    return text.str.extract(EVENT_FIELD_SEGMENT_REGEXES[field], expand=False)
+
+
+def _resolve_locations(locations):
+    unique_locations = locations.dropna().unique()
+    location_resolver = get_location_resolver()
+    resolved = pd.DataFrame.from_records(
+        [location_resolver.resolve(location) for location in unique_locations],
+        index=unique_locations,
+        columns=LOCATION_FIELDS,
+    )
+    resolved = resolved.reindex(locations.to_numpy())
+    resolved.index = locations.index
+    return resolved
+
+
+def wrangle_frame(df, text_column="raw_text"):
+    """
+    Column-wise equivalent of `parse_event_text` for a whole frame of raw reports.
+
+    Fields are cut out of the report text with `Series.str.extract`, while durations and locations are parsed once
+    per distinct value and mapped back onto the rows.
+
+    Args:
+        df: DataFrame with raw report text, e.g. a saved `raw_events/events_*.csv`.
+        text_column: Name of the column holding the raw report text.
+
+    Returns:
+        Copy of `df` with the parsed event columns and `address`; shape, state, state abbreviation and country are
+        categorical. An existing non-empty `url` is kept.
+    """
+    df = df.copy()
+    text = df[text_column].fillna("").astype(str)
+
+    lines = text.str.split(LINE_BREAK_PATTERN, n=2, regex=True)
+    # The report URL is only read from the text where the frame does not carry it already.
+    parsed_url = lines.str[0].str.strip().where(text != "", "unparsed")
+    if "url" in df.columns:
+        has_url = df["url"].fillna("").astype(str).str.strip() != ""
+        df["url"] = df["url"].where(has_url, parsed_url)
+    else:
+        df["url"] = parsed_url
+    for time_type in ["occurred_time", "reported_time", "entered_as_time"]:
+        df[time_type] = parse_event_times(_extract_segments(text, time_type))
+    df["shape"] = (
+        _extract_segments(text, "shape").str.strip().str.lower().fillna("unparsed")
     )
 
-    canadian_state_abbreviation_regex = re.compile(
-        r"(N[BLSTU]|[AMN]B|[BQ]C|ON|PE|SK)",
-        re.VERBOSE,
+    df["duration"] = parse_durations(_extract_segments(text, "duration"))
+
+    locations = _resolve_locations(_extract_segments(text, "location"))
+    for field in LOCATION_FIELDS:
+        df[field] = locations[field]
+
+    df["description"] = (
+        lines.str[2]
+        .str.replace(LINE_BREAK_PATTERN, "", regex=True)
+        .str.strip()
+        .fillna("")
     )
+    for field in CATEGORICAL_FIELDS:
+        df[field] = df[field].astype("category")
+    df["address"] = join_address_columns(df)
+    return df
+
 
-    if us_state_abbreviation_regex.search(location) is not None:
-        us_state_abbreviation = us_state_abbreviation_regex.search(location).group()
+def get_state_info(location):
+    us_state_abbreviation_match = US_STATE_ABBREVIATION_REGEX.search(location)
+    if us_state_abbreviation_match is not None:
+        us_state_abbreviation = us_state_abbreviation_match.group()
         us_state = us.states.lookup(us_state_abbreviation)
         if us_state is not None:
             state_info = {
@@ -141,10 +478,13 @@ def get_state_info(location):
 
             return state_info
 
-    elif canadian_state_abbreviation_regex.search(location) is not None:
-        canadian_state_abbreviation = canadian_state_abbreviation_regex.search(
-            location
-        ).group()
+        return None
+
+    canadian_state_abbreviation_match = CANADIAN_STATE_ABBREVIATION_REGEX.search(
+        location
+    )
+    if canadian_state_abbreviation_match is not None:
+        canadian_state_abbreviation = canadian_state_abbreviation_match.group()
         canadian_state = CAN_PROVINCE_NAMES.get(canadian_state_abbreviation)
         if canadian_state is not None:
             state_info = {
@@ -167,9 +507,7 @@ def get_valid_country_name(name, custom_lookup=NON_ISO_3166_COUNTRY_NAMES):
     """
 
     # Characters to remove.
-    characters_to_remove = "+:,"
-    pattern = "[" + characters_to_remove + "]"
-    name = re.sub(pattern, "", name)
+    name = COUNTRY_NAME_CHARACTERS_TO_REMOVE_REGEX.sub("", name)
     # Wrangle the string.
     name = name.strip()
     name = name.lower()
@@ -189,13 +527,13 @@ def get_country_from_location(location):
 
     # If location does not contain state name, country information is stored inside brackets and has to checked if
     # it's a valid country name.
-    if get_valid_country_name(location) is not None:
-        return get_valid_country_name(location)
+    valid_country_name = get_valid_country_name(location)
+    if valid_country_name is not None:
+        return valid_country_name
 
     # If location string does not contain a state name nor is a valid country name itself, country information is
     # stored inside brackets and has to extracted with a regex.
-    regex = re.compile(r"\((.*?)\)")
-    match = regex.findall(location)
+    match = BRACKETED_REGEX.findall(location)
     if match is not None and match != []:
         match = match[-1] if len(match) > 1 else match[0]
     if "/" in match:
@@ -208,8 +546,7 @@ def get_country_from_location(location):
 
 def get_city_from_location(location):
     # If location contains brackets, take the sequence before the first bracket.
-    regex = re.compile(r".+?(?=\()")
-    match = regex.search(location)
+    match = BEFORE_BRACKET_REGEX.search(location)
     if match is not None:
         match = match.group()
         if "/" in match:
@@ -229,23 +566,11 @@ def get_city_from_location(location):
     else:
         return location.strip()
 
-#TODO: Consider moving this to geocoder lib.
+
+# TODO: Consider moving this to geocoder lib.
 def create_address(city, state, country):
     values = [str(val) for val in (city, state, country) if val is not None]
-    return ', '.join(values)
-
-def parse_duration(t):
-    t = clean_time_string(t)
-
-    basetime = datetime.now().replace(microsecond=0)
-    cal = parsedatetime.Calendar()
-    time_struct, parse_status = cal.parse(t, sourceTime=basetime)
-    if parse_status == 0:
-        return None
-
-    parsed = datetime(*time_struct[:6])
-    time = parsed - basetime
-    return time
+    return ", ".join(values)
 
 
 def parse_time(t):
@@ -258,25 +583,7 @@ def parse_time(t):
         return time
 
 
-def clean_time_string(t):
-    t = str(t).lower().strip()
-    # Splits.
-    if "-" in t:
-        t = t.split("-")[1]
-    # Characters to remove.
-    characters_to_remove = "+:"
-    pattern = "[" + characters_to_remove + "]"
-    t = re.sub(pattern, "", t)
-
-    # Sequences to replace.
-    replacements = {"hrs": "hours", ":": "", "mintues": "minutes"}
-
-    replacements = dict((re.escape(k), v) for k, v in replacements.items())
-    pattern = re.compile("|".join(replacements.keys()))
-    t = pattern.sub(lambda m: replacements[re.escape(m.group(0))], t)
-    return t
-
 def hash_string(s):
     hash_object = hashlib.sha256()
     hash_object.update(s.encode())
-    return hash_object.hexdigest()
\ No newline at end of file
+    return hash_object.hexdigest()
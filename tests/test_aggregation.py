@@ -0,0 +1,55 @@
+import pandas as pd
+
+from nuforc.aggregation import aggregate_by_polygon, aggregate_file
+
+EVENTS = pd.DataFrame(
+    {
+        "ZCTA5CE10": ["00001", "00001", "00001", "00002", "00002", None],
+        "shape": ["light", "disk", "light", "orb", "disk", "light"],
+        "occurred_time": [
+            "2020-01-01 21:00",
+            "2020-06-01 21:30",
+            "2021-01-01 03:00",
+            None,
+            "2022-01-01 23:59",
+            "2022-01-01 21:00",
+        ],
+    }
+)
+
+
+def test_aggregates_per_polygon():
+    aggregates = aggregate_by_polygon(EVENTS)
+
+    summary = aggregates["summary"]
+    assert summary["count"].to_dict() == {"00001": 3, "00002": 2}
+    # Ties go to the alphabetically first shape.
+    assert summary["most_frequent_shape"].to_dict() == {
+        "00001": "light",
+        "00002": "disk",
+    }
+    assert aggregates["shapes"].loc["00001"].to_dict() == {
+        "disk": 1,
+        "light": 2,
+        "orb": 0,
+    }
+    assert aggregates["hours"].loc["00001", "hour_21"] == 2
+    assert aggregates["hours"].loc["00002"].sum() == 1
+    assert list(aggregates["years"].columns) == ["year_2020", "year_2021", "year_2022"]
+    assert aggregates["years"].loc["00001"].tolist() == [2, 1, 0]
+
+
+def test_aggregates_are_cached_by_file_content(tmp_path):
+    input_path = tmp_path / "randomized_locations.csv"
+    EVENTS.to_csv(input_path, index=False)
+    cache_dir = tmp_path / "cache"
+
+    first = aggregate_file(input_path, cache_dir)
+    assert len(list(cache_dir.iterdir())) == 1
+    cached = aggregate_file(input_path, cache_dir)
+    pd.testing.assert_frame_equal(first["summary"], cached["summary"])
+
+    EVENTS.iloc[:3].to_csv(input_path, index=False)
+    changed = aggregate_file(input_path, cache_dir)
+    assert changed["summary"]["count"].to_dict() == {"00001": 3}
+    assert len(list(cache_dir.iterdir())) == 2
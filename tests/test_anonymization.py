@@ -0,0 +1,60 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import Polygon, box
+
+from nuforc.anonymization import randomize_locations, sample_points_in_polygons
+
+
+def test_points_fall_inside_their_polygons():
+    # A thin ring has a low area to bounding box ratio and needs several rejection rounds.
+    ring = box(0, 0, 10, 10).difference(box(0.1, 0.1, 9.9, 9.9))
+    triangle = Polygon([(0, 0), (1, 0), (0, 1)])
+    geometries = np.array([ring] * 200 + [triangle] * 200 + [Polygon()], dtype=object)
+
+    x, y = sample_points_in_polygons(geometries, seed=0)
+
+    assert shapely.contains_xy(geometries[:400], x[:400], y[:400]).all()
+    assert np.isnan(x[400]) and np.isnan(y[400])
+    assert len(np.unique(x[200:400])) == 200
+
+
+def test_degenerate_polygons_fall_back_to_their_representative_point():
+    # Collapsed onto its diagonal: a positive bounding box area, but no area to sample from.
+    collapsed = Polygon([(0, 0), (1, 1), (2, 2), (0, 0)])
+    bowtie = Polygon([(0, 0), (2, 2), (2, 0), (0, 2)])
+    geometries = np.array([collapsed, bowtie], dtype=object)
+
+    x, y = sample_points_in_polygons(geometries, seed=0)
+
+    assert shapely.intersects_xy(geometries, x, y).all()
+
+    # Polygons still without a point after the last round fall back the same way.
+    ring = box(0, 0, 10, 10).difference(box(0.1, 0.1, 9.9, 9.9))
+    x, y = sample_points_in_polygons(np.array([ring] * 5, dtype=object), max_rounds=0)
+    assert shapely.contains_xy(ring, x, y).all()
+
+
+def test_randomize_locations_matches_notebook_columns():
+    polygons = gpd.GeoDataFrame(
+        {"ZCTA5CE10": ["00001", "00002"]},
+        geometry=[box(0, 0, 1, 1), box(5, 5, 6, 6)],
+        crs="EPSG:4326",
+    )
+    events = pd.DataFrame(
+        {
+            "shape": ["light", "disk", "orb", "cigar"],
+            "longitude": [0.5, 5.5, 5.2, 20.0],
+            "latitude": [0.5, 5.5, 5.9, 20.0],
+        }
+    )
+
+    randomized = randomize_locations(events, polygons, seed=0)
+
+    assert randomized["shape"].tolist() == ["light", "disk", "orb"]
+    assert randomized["ZCTA5CE10"].tolist() == ["00001", "00002", "00002"]
+    inside = polygons.set_index("ZCTA5CE10").geometry.loc[randomized["ZCTA5CE10"]]
+    assert shapely.contains_xy(
+        inside.to_numpy(), randomized["randomized_x"], randomized["randomized_y"]
+    ).all()
@@ -0,0 +1,136 @@
+import asyncio
+import time
+from datetime import datetime
+
+import aiohttp
+import pytest
+
+import src.nuforc.scraping as scraping
+from src.nuforc.async_scraping import AsyncNUFORCScraper, TokenBucket
+
+MONTH_URLS = [
+    "http://www.nuforc.org/webreports/ndxe202201.html",
+    "http://www.nuforc.org/webreports/ndxe202202.html",
+    "http://www.nuforc.org/webreports/ndxe202203.html",
+]
+EVENT_PAGE = (
+    "<html><body><table><tr><td>Occurred : 1/{n}/2022 21:00<br>Location: Springfield, IL<br>"
+    "Shape: Light<br>Duration:5 minutes</td></tr><tr><td>Bright light number {n}.</td></tr>"
+    "</table></body></html>"
+)
+
+
+def make_month_page(event_ids):
+    links = "".join(f'<a href="{event_id}.html">1/1/22</a>' for event_id in event_ids)
+    return f'<html><body><a href="ndxevent.html">Index</a>{links}</body></html>'
+
+
+# Months 1 and 2 share event 4; month 3's index page cannot be downloaded.
+MONTH_PAGES = {
+    MONTH_URLS[0]: make_month_page(["001/S001", "001/S002", "001/S003", "001/S004"]),
+    MONTH_URLS[1]: make_month_page(["001/S004", "001/S005", "001/S006", "001/S007"]),
+}
+
+
+class ListSink:
+    def __init__(self):
+        self.batches = []
+
+    def write(self, batch):
+        self.batches.append(list(batch))
+
+
+@pytest.fixture
+def scraper(monkeypatch, tmp_path):
+    lookup = {datetime(2022, month, 1): url for month, url in enumerate(MONTH_URLS, 1)}
+    monkeypatch.setattr(scraping, "make_month_root_lookup", lambda **kwargs: lookup)
+    return AsyncNUFORCScraper(
+        output_folder=tmp_path,
+        n_scraping_retries=2,
+        batch_size=3,
+        max_connections=4,
+        requests_per_second=1000,
+    )
+
+
+def test_token_bucket_limits_request_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+    async def acquire(bucket, n):
+        start = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # A full bucket serves a burst of `capacity` tokens at once, then one token every 1 / `rate` seconds.
+    assert asyncio.run(acquire(TokenBucket(rate=10, capacity=5), 5)) < 0.05
+    assert asyncio.run(acquire(TokenBucket(rate=20, capacity=1), 5)) >= 0.19
+
+
+def test_fetch_gives_up_after_retries(scraper):
+    class FailingSession:
+        calls = 0
+
+        def get(self, url):
+            FailingSession.calls += 1
+            raise aiohttp.ClientConnectionError("Connection refused")
+
+    status_code, page_text = asyncio.run(
+        scraper._fetch(
+            FailingSession(), TokenBucket(1000), MONTH_URLS[0], stage="index_fetch"
+        )
+    )
+    assert (status_code, page_text) == (None, None)
+    assert FailingSession.calls == scraper.n_scraping_retries
+    assert scraper.metrics.counter("retries", stage="index_fetch") == 1
+    assert scraper.metrics.counter("failed_downloads", stage="index_fetch") == 1
+
+
+def test_scrape_drains_queue_and_flushes_partial_batch(scraper, monkeypatch):
+    async def fetch(session, rate_limiter, url, page_label="", stage="fetch"):
+        await asyncio.sleep(0)
+        if url in MONTH_PAGES:
+            return 200, MONTH_PAGES[url]
+        if url in MONTH_URLS:
+            return None, None
+        return 200, EVENT_PAGE.format(n=url[-6])
+
+    monkeypatch.setattr(scraper, "_fetch", fetch)
+    sink = ListSink()
+    # Workers must all stop once producers are done; a missed shutdown would hang here.
+    asyncio.run(asyncio.wait_for(scraper._scrape(MONTH_URLS, sink), timeout=30))
+
+    batch_sizes = [len(batch) for batch in sink.batches]
+    assert batch_sizes[:2] == [3, 3]
+    # The last, partial batch is flushed after the workers stop.
+    assert batch_sizes[-1] == 1
+    urls = [event.url for batch in sink.batches for event in batch]
+    assert sorted(urls) == [
+        f"http://www.nuforc.org/webreports/001/S00{n}.html" for n in range(1, 8)
+    ]
+    assert scraper.metrics.counter("events") == 7
+
+
+def test_scrape_skips_month_whose_index_page_cannot_be_parsed(scraper, monkeypatch):
+    async def fetch(session, rate_limiter, url, page_label="", stage="fetch"):
+        await asyncio.sleep(0)
+        if url in MONTH_URLS:
+            return 200, MONTH_PAGES.get(url, "malformed")
+        return 200, EVENT_PAGE.format(n=url[-6])
+
+    read_month_root_page = scraper._read_month_root_page
+
+    def read_or_fail(page_text):
+        if page_text == "malformed":
+            raise ValueError("Malformed index page")
+        return read_month_root_page(page_text)
+
+    monkeypatch.setattr(scraper, "_fetch", fetch)
+    monkeypatch.setattr(scraper, "_read_month_root_page", read_or_fail)
+    sink = ListSink()
+    asyncio.run(asyncio.wait_for(scraper._scrape(MONTH_URLS, sink), timeout=30))
+
+    urls = [event.url for batch in sink.batches for event in batch]
+    assert len(urls) == 7
+    assert scraper.metrics.counter("events") == 7
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from nuforc.clustering import NOISE, ClusterStore, cluster_events, neighbor_pairs
+
+# A burst of five reports around Phoenix within a day, and scattered reports elsewhere.
+EVENTS = pd.DataFrame(
+    {
+        "hash": [str(i) for i in range(8)],
+        "latitude": [33.45, 33.50, 33.40, 33.60, 33.30, 40.71, 33.45, 47.61],
+        "longitude": [
+            -112.07,
+            -112.00,
+            -111.90,
+            -112.10,
+            -112.20,
+            -74.00,
+            -112.07,
+            -122.33,
+        ],
+        "occurred_time": pd.to_datetime(
+            [
+                "1997-03-13 19:30",
+                "1997-03-13 20:00",
+                "1997-03-13 20:15",
+                "1997-03-13 22:00",
+                "1997-03-14 01:00",
+                "1997-03-13 20:00",
+                "1997-05-01 20:00",
+                None,
+            ]
+        ),
+    }
+)
+
+
+def test_burst_is_clustered():
+    cluster_ids = cluster_events(EVENTS, eps_km=30, eps_time="1D", min_samples=5)
+
+    assert cluster_ids.tolist() == [0, 0, 0, 0, 0, NOISE, NOISE, NOISE]
+
+
+def test_new_events_join_stored_clusters(tmp_path):
+    path = tmp_path / "clusters.parquet"
+    ClusterStore(path).add_events(EVENTS.iloc[:4])
+    store = ClusterStore(path)
+    assert (store.assignments["cluster_id"] == NOISE).all()
+
+    new = store.add_events(EVENTS)
+    assert new["hash"].tolist() == ["4", "5", "6", "7"]
+    joined = ClusterStore(path).join(EVENTS)
+    assert joined["cluster_id"].tolist() == [0, 0, 0, 0, 0, NOISE, NOISE, NOISE]
+
+    with pytest.raises(ValueError):
+        ClusterStore(path, eps_km=10)
+
+
+def test_fractional_time_windows_are_not_truncated():
+    times = pd.Timestamp("2000-01-01") + pd.to_timedelta([0, 1.6, 3.0], unit="s")
+    i, j = neighbor_pairs(np.zeros(3), np.zeros(3), times, eps_km=1, eps_time="1.5s")
+
+    assert list(zip(i.tolist(), j.tolist())) == [(1, 2)]
+
+
+def test_bridged_stored_clusters_take_the_lowest_id(tmp_path):
+    # Pairs of reports about 55 km apart along the equator, bridged by reports halfway between them.
+    def pair(longitude, first_hash):
+        return pd.DataFrame(
+            {
+                "hash": [str(first_hash), str(first_hash + 1)],
+                "latitude": [0.0, 0.0],
+                "longitude": [longitude, longitude],
+                "occurred_time": pd.to_datetime(["2001-06-01 21:00"] * 2),
+            }
+        )
+
+    path = tmp_path / "clusters.parquet"
+    for longitude, first_hash in [(0.5, 0), (1.0, 2), (0.0, 4)]:
+        ClusterStore(path, min_samples=2).add_events(pair(longitude, first_hash))
+    store = ClusterStore(path, min_samples=2)
+    assert store.assignments["cluster_id"].tolist() == [0, 0, 1, 1, 2, 2]
+
+    new = store.add_events(
+        pd.concat([pair(0.25, 6).iloc[:1], pair(0.75, 7).iloc[:1]], ignore_index=True)
+    )
+    assert new["cluster_id"].tolist() == [0, 0]
+    assert (ClusterStore(path, min_samples=2).assignments["cluster_id"] == 0).all()
@@ -0,0 +1,53 @@
+import os
+
+import geopandas as gpd
+import pandas as pd
+
+from nuforc.dashboard.data import (
+    DashboardData,
+    get_dashboard_data,
+    write_dashboard_events,
+)
+
+EVENTS = gpd.GeoDataFrame(
+    {
+        "shape": ["light", "disk", "orb", "light"],
+        "occurred_time": ["1995-05-01", "2012-07-04", "2012-08-01", "2013-01-01"],
+    },
+    geometry=gpd.points_from_xy(
+        [-87.6, -87.7, -122.4, -87.5], [41.9, 41.8, 37.8, 42.0]
+    ),
+    crs=4326,
+)
+
+
+def test_queries_filter_by_bounding_box_and_time(tmp_path):
+    path = tmp_path / "events.parquet"
+    write_dashboard_events(EVENTS, path, row_group_size=2)
+    data = DashboardData(path)
+
+    window = data.query(
+        bbox=(-90, 40, -85, 43), start="2010", end="2013", columns=["shape"]
+    )
+    assert window["shape"].tolist() == ["disk"]
+    assert list(window.columns) == ["shape", "longitude", "latitude", "geometry"]
+
+    assert len(data.query()) == 4
+    assert data.query(start=pd.Timestamp("2013-01-01")).iloc[0]["shape"] == "light"
+
+    data.query(bbox=(-90, 40, -85, 43), start="2010", end="2013", columns=["shape"])
+    assert data.cache_info().hits == 1
+
+
+def test_shared_data_is_reloaded_once_the_file_is_rebuilt(tmp_path):
+    path = tmp_path / "events.parquet"
+    write_dashboard_events(EVENTS, path)
+    data = get_dashboard_data(path)
+    assert get_dashboard_data(path) is data
+    assert len(data.query()) == 4
+
+    write_dashboard_events(EVENTS.iloc[:2], path)
+    # Make sure the rebuilt file's modification time differs on coarse-grained filesystems.
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert len(get_dashboard_data(path).query()) == 2
@@ -0,0 +1,123 @@
+import pickle
+from datetime import datetime
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from nuforc.event_io import (
+    EVENT_SCHEMA,
+    EventStoreWriter,
+    ParquetEventWriter,
+    load_events,
+    make_location_ids,
+    read_event_frame,
+    read_event_table,
+    write_location_table,
+)
+from nuforc.models.events import NUFORCEvent
+from nuforc.visualisation import make_playset
+from nuforc.wrangling import hash_string
+
+
+def test_single_list_pickles_still_load(tmp_path):
+    path = tmp_path / "events.pkl"
+    with open(path, "wb") as f:
+        pickle.dump([{"url": "a"}, {"url": "b"}], f)
+
+    assert len(load_events(path)) == 2
+
+
+def test_failed_crawl_keeps_previous_output(tmp_path):
+    path = tmp_path / "events.parquet"
+    with ParquetEventWriter(path) as sink:
+        sink.write({"url": "old"})
+
+    with pytest.raises(RuntimeError):
+        with ParquetEventWriter(path) as sink:
+            sink.write({"url": "new"})
+            raise RuntimeError
+
+    assert read_event_table(path, columns=["url"])["url"].to_pylist() == ["old"]
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_parquet_round_trip_keeps_types(tmp_path):
+    path = tmp_path / "events.parquet"
+    records = [
+        {
+            "url": f"http://www.nuforc.org/webreports/{i}.html",
+            "occurred_time": datetime(2022, 1, 2, 21, 0),
+            "shape": "light" if i % 2 else "disk",
+            "duration": 300.0 if i % 3 else float("nan"),
+            "state": "Texas",
+            "hash": str(i),
+        }
+        for i in range(25)
+    ]
+    with ParquetEventWriter(path, row_group_size=10) as sink:
+        for record in records:
+            sink.write(record)
+
+    assert pq.ParquetFile(path).metadata.num_row_groups == 3
+    df = read_event_table(path).to_pandas()
+    assert len(df) == 25
+    assert list(df.columns) == EVENT_SCHEMA.names
+    assert isinstance(df["shape"].dtype, pd.CategoricalDtype)
+    assert df["occurred_time"].iloc[0] == pd.Timestamp(2022, 1, 2, 21)
+    assert df["duration"].isna().sum() == 9
+    assert df["reported_time"].isna().all()
+
+
+def test_event_store_joins_locations_on_integer_ids(tmp_path):
+    events = [
+        NUFORCEvent(city="Austin", state="Texas", country="USA", raw_event="a"),
+        NUFORCEvent(city="Dallas", state="Texas", country="USA", raw_event="b"),
+        NUFORCEvent(city="Austin", state="Texas", country="USA", raw_event="c"),
+    ]
+    with EventStoreWriter(tmp_path / "events.parquet", row_group_size=2) as sink:
+        sink.write(events)
+    with open(tmp_path / "events.pkl", "wb") as f:
+        pickle.dump(events, f)
+
+    df = read_event_frame(tmp_path / "events.parquet")
+    assert isinstance(df["city"].dtype, pd.CategoricalDtype)
+    # Hashed as everywhere else, so events deduplicate against earlier crawls.
+    assert df["hash"].tolist() == [hash_string(text) for text in ["a", "b", "c"]]
+    assert df["location_id"].iloc[0] == df["location_id"].iloc[2]
+    assert df["location_id"].iloc[0] != df["location_id"].iloc[1]
+    # Ids only depend on the location, so legacy pickles get the same ones.
+    assert (
+        read_event_frame(tmp_path / "events.pkl")["location_id"].tolist()
+        == df["location_id"].tolist()
+    )
+
+    locations = df.drop_duplicates("location_id").assign(
+        address=lambda df: df["city"].astype(str),
+        latitude=[30.3, 32.8],
+        longitude=[-97.7, -96.8],
+    )
+    write_location_table(locations, tmp_path / "locations.parquet")
+    playset = make_playset(tmp_path / "events.parquet", tmp_path / "locations.parquet")
+    assert playset["latitude"].tolist() == [30.3, 32.8, 30.3]
+
+
+def test_location_ids_are_pinned():
+    # Ids are persisted and joined across files; they must not change with the pandas version.
+    locations = pd.DataFrame(
+        {
+            "city": ["Austin", None, "Austin"],
+            "state": ["Texas", None, "Texas"],
+            "state_abbreviation": [None, None, None],
+            "country": ["USA", None, "USA"],
+        }
+    )
+    assert make_location_ids(locations).tolist() == [
+        -2291093784555489416,
+        -3632525952361231418,
+        -2291093784555489416,
+    ]
+    assert (
+        make_location_ids(locations.astype("category")).tolist()
+        == make_location_ids(locations).tolist()
+    )
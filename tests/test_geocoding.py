@@ -0,0 +1,269 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from nuforc.geocoding.batch import BatchGeocoder, GeocodeCache, GeocodingError
+from nuforc.geocoding.gazetteer import Gazetteer
+from nuforc.geocoding.nuforc_geocoder import NUFORCGeocoder
+
+GAZETTEER = {
+    "Austin, Texas, USA": (30.27, -97.74),
+    "Toronto, Ontario, Canada": (43.65, -79.38),
+    "Phoenix, Arizona, USA": (33.45, -112.07),
+}
+
+
+class FakeBackend:
+    name = "fake"
+
+    def __init__(self, fail_on=(), crash_on=()):
+        self.fail_on = set(fail_on)
+        self.crash_on = set(crash_on)
+        self.calls = []
+
+    def geocode(self, address):
+        self.calls.append(address)
+        if address in self.crash_on:
+            raise RuntimeError("interrupted")
+        if address in self.fail_on:
+            raise GeocodingError("timeout")
+        return GAZETTEER.get(address)
+
+
+def make_geocoder(backend, cache):
+    return BatchGeocoder(
+        backend, cache, requests_per_second=None, retry_delay=0, checkpoint_every=100
+    )
+
+
+def test_only_new_unique_addresses_reach_the_backend(tmp_path):
+    cache = GeocodeCache(tmp_path / "geocodes.sqlite")
+    backend = FakeBackend(fail_on={"Phoenix, Arizona, USA"})
+    addresses = list(GAZETTEER) + ["Austin, Texas, USA", "Nowhere", None, ""]
+
+    result = make_geocoder(backend, cache).geocode(addresses)
+
+    assert result["address"].tolist() == list(GAZETTEER) + ["Nowhere"]
+    assert result.set_index("address").loc["Austin, Texas, USA"].tolist() == [
+        30.27,
+        -97.74,
+    ]
+    assert result["latitude"].isna().sum() == 2
+    # Transient failures are retried, then left out of the cache.
+    assert backend.calls.count("Phoenix, Arizona, USA") == 3
+    assert len(cache) == 3
+
+    backend = FakeBackend()
+    geocoder = make_geocoder(backend, cache)
+    geocoder.geocode(addresses)
+    assert backend.calls == ["Phoenix, Arizona, USA"]
+    assert geocoder.stats == {
+        "hits": 3,
+        "offline_hits": 0,
+        "misses": 1,
+        "failures": 0,
+    }
+
+
+def test_interrupted_run_resumes_from_checkpoint(tmp_path):
+    cache_path = tmp_path / "geocodes.sqlite"
+    addresses = list(GAZETTEER)
+    backend = FakeBackend(crash_on={addresses[2]})
+    with pytest.raises(RuntimeError):
+        make_geocoder(backend, GeocodeCache(cache_path)).geocode(addresses)
+
+    backend = FakeBackend()
+    result = make_geocoder(backend, GeocodeCache(cache_path)).geocode(addresses)
+    assert backend.calls == [addresses[2]]
+    assert result["latitude"].notna().all()
+
+
+class InterruptingBackend:
+    """
+    Backend whose `n_calls`-th lookup is interrupted, as by Ctrl+C; every other lookup resolves.
+    """
+
+    name = "fake"
+
+    def __init__(self, n_calls):
+        self.n_calls = n_calls
+        self.calls = 0
+        self.resolved = []
+        self._lock = threading.Lock()
+
+    def geocode(self, address):
+        with self._lock:
+            self.calls += 1
+            if self.calls == self.n_calls:
+                raise KeyboardInterrupt
+        coordinates = (float(len(address)), 0.0)
+        with self._lock:
+            self.resolved.append(address)
+        return coordinates
+
+
+def test_interrupted_run_keeps_finished_geocodes(tmp_path):
+    cache_path = tmp_path / "geocodes.sqlite"
+    addresses = [f"Town {i}, Texas, USA" for i in range(12)]
+    backend = InterruptingBackend(n_calls=6)
+    geocoder = BatchGeocoder(
+        backend,
+        GeocodeCache(cache_path),
+        max_workers=3,
+        requests_per_second=None,
+        checkpoint_every=100,
+    )
+    with pytest.raises(KeyboardInterrupt):
+        geocoder.geocode(addresses)
+
+    # Nothing reached a periodic checkpoint; every finished lookup is saved on the way out.
+    assert backend.resolved
+    cached = GeocodeCache(cache_path).get_many(addresses)
+    assert sorted(cached) == sorted(backend.resolved)
+
+
+def test_nuforc_geocoder_geocodes_only_new_addresses(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = GeocodeCache(tmp_path / "geocodes.sqlite")
+    cache.put_many({"Austin, Texas, USA": (30.27, -97.74)})
+    events = pd.DataFrame(
+        {
+            "city": ["Austin", "Austin", "Toronto", "unparsed"],
+            "state": ["Texas", "Texas", "Ontario", None],
+            "state_abbreviation": [None, None, None, None],
+            "country": ["USA", "USA", "Canada", None],
+        }
+    )
+    backend = FakeBackend()
+    # Only this input's addresses are looked up, never the whole cache.
+    monkeypatch.setattr(cache, "to_frame", None)
+
+    geocoder = NUFORCGeocoder(
+        input=events, cache=cache, backend=backend, requests_per_second=None
+    )
+    output = geocoder.run()
+
+    assert backend.calls == ["Toronto, Ontario, Canada"]
+    assert geocoder.stats == {
+        "addresses": 2,
+        "hits": 1,
+        "misses": 1,
+        "offline_hits": 0,
+        "failures": 0,
+    }
+    assert output["latitude"].tolist()[:3] == [30.27, 30.27, 43.65]
+    assert pd.isna(output["latitude"].iloc[3])
+    assert len(cache) == 2
+    # Saving the output is left to the caller.
+    assert not (tmp_path / "geocoding_output.pkl").exists()
+
+
+GEONAMES_ROWS = [
+    # geonameid, name, asciiname, alternatenames, latitude, longitude, feature class, feature code, country code,
+    # cc2, admin1 code, admin2, admin3, admin4, population, ...
+    [
+        "1",
+        "Austin",
+        "Austin",
+        "",
+        "30.27",
+        "-97.74",
+        "P",
+        "PPLA",
+        "US",
+        "",
+        "TX",
+        "",
+        "",
+        "",
+        "961855",
+    ],
+    [
+        "2",
+        "Austin",
+        "Austin",
+        "",
+        "43.67",
+        "-92.97",
+        "P",
+        "PPLA2",
+        "US",
+        "",
+        "MN",
+        "",
+        "",
+        "",
+        "25000",
+    ],
+    [
+        "3",
+        "Montréal",
+        "Montreal",
+        "",
+        "45.51",
+        "-73.59",
+        "P",
+        "PPLA2",
+        "CA",
+        "",
+        "10",
+        "",
+        "",
+        "",
+        "1600000",
+    ],
+    [
+        "4",
+        "London",
+        "London",
+        "",
+        "51.51",
+        "-0.13",
+        "P",
+        "PPLC",
+        "GB",
+        "",
+        "ENG",
+        "",
+        "",
+        "",
+        "8961989",
+    ],
+]
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    path = tmp_path / "cities500.txt"
+    path.write_text(
+        "\n".join("\t".join(row + ["", "", "", ""]) for row in GEONAMES_ROWS)
+    )
+    return Gazetteer.load(path)
+
+
+def test_gazetteer_lookups(gazetteer):
+    assert gazetteer.geocode("Austin, Texas, TX, USA") == (30.27, -97.74)
+    assert gazetteer.geocode("Austin, Minnesota, USA") == (43.67, -92.97)
+    assert gazetteer.geocode("Montreal, Quebec, QC, Canada") == (45.51, -73.59)
+    assert gazetteer.geocode("Montréal, QC, Canada") == (45.51, -73.59)
+    assert gazetteer.geocode("London, England") == (51.51, -0.13)
+    # Misspellings fall back to the trigram index of the same state.
+    assert gazetteer.geocode("Austn, Texas, USA") == (30.27, -97.74)
+    assert gazetteer.geocode("Austin, Ohio, USA") is None
+    assert gazetteer.geocode("Austin") is None
+
+
+def test_gazetteer_is_consulted_before_the_backend(tmp_path, gazetteer):
+    backend = FakeBackend()
+    geocoder = BatchGeocoder(
+        backend,
+        GeocodeCache(tmp_path / "geocodes.sqlite"),
+        requests_per_second=None,
+        gazetteer=gazetteer,
+    )
+    result = geocoder.geocode(["Austin, Texas, USA", "Toronto, Ontario, Canada"])
+
+    assert backend.calls == ["Toronto, Ontario, Canada"]
+    assert result["latitude"].tolist() == [30.27, 43.65]
+    assert geocoder.stats["offline_hits"] == 1
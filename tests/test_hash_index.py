@@ -0,0 +1,52 @@
+import pandas as pd
+
+from nuforc.event_io import ParquetEventWriter
+from nuforc.hash_index import HashIndex, merge_event_files
+from nuforc.wrangling import hash_string
+
+
+def test_hashes_persist_across_instances(tmp_path):
+    path = tmp_path / "hash_index.sqlite"
+    index = HashIndex(path)
+    assert index.add_many(["a", "b", "a"], ["u1", "u2", "u3"]) == [True, True, False]
+    index.close()
+
+    index = HashIndex(path)
+    assert "a" in index
+    assert "c" not in index
+    assert index.contains_url("u2")
+    assert not index.contains_url("u3")
+    assert len(index) == 2
+    index.close()
+
+
+def test_merge_keeps_first_occurrence_across_formats(tmp_path):
+    pd.DataFrame(
+        {
+            "url": ["u1", "u2", "u3"],
+            "raw_text": ["one", "two", "one"],
+            "hash": [hash_string("one"), hash_string("two"), hash_string("one")],
+        }
+    ).to_csv(tmp_path / "events_2023_01_01.csv", index=False)
+    # Older dumps without a hash column get one computed from the raw text.
+    pd.DataFrame({"raw_text": ["three", "two"], "url": ["u4", "u5"]}).to_csv(
+        tmp_path / "events_2023_01_02.csv", index=False
+    )
+    with ParquetEventWriter(tmp_path / "events_2023_01_03.parquet") as sink:
+        sink.write({"url": "u6", "raw_text": "four", "hash": hash_string("four")})
+        sink.write({"url": "u7", "raw_text": "three", "hash": hash_string("three")})
+
+    index = HashIndex(tmp_path / "hash_index.sqlite")
+    output_path = tmp_path / "merged.csv"
+    n_read, n_kept = merge_event_files(
+        sorted(tmp_path.glob("events_*")), index, output_path=output_path, chunksize=2
+    )
+
+    assert (n_read, n_kept) == (7, 4)
+    merged = pd.read_csv(output_path)
+    assert list(merged.columns) == ["url", "raw_text", "hash"]
+    assert merged["url"].tolist() == ["u1", "u2", "u4", "u6"]
+
+    # Merging again against the same index keeps nothing.
+    assert merge_event_files(sorted(tmp_path.glob("events_*")), index) == (7, 0)
+    index.close()
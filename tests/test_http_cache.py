@@ -0,0 +1,100 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from scrapy.http import HtmlResponse, Request, Response
+from scrapy.utils.test import get_crawler
+
+from nuforc.client import NUFORC_HTTP_Client
+from nuforc_scrapy.middlewares import ConditionalCacheMiddleware
+
+PAGE = b"<html><body>Monthly index</body></html>"
+ETAG = '"v1"'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in_url():
+    StandInHandler.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/ndxevent.html"
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_revalidates_cached_page(stand_in_url, tmp_path):
+    client = NUFORC_HTTP_Client(n_retries=0, cache_dir=tmp_path)
+
+    first = client.get_response(stand_in_url)
+    assert first.status_code == 200
+    assert not first.from_cache
+
+    second = client.get_response(stand_in_url)
+    assert second.status_code == 200
+    assert second.from_cache
+    assert second.content == PAGE
+    assert StandInHandler.requests_seen[1]["If-None-Match"] == ETAG
+
+
+def test_middleware_replays_cached_page_on_not_modified(tmp_path):
+    crawler = get_crawler(settings_dict={"HTTP_CONDITIONAL_CACHE_DIR": str(tmp_path)})
+    middleware = ConditionalCacheMiddleware.from_crawler(crawler)
+    url = "https://nuforc.org/webreports/ndxevent.html"
+
+    first = Request(url)
+    assert middleware.process_request(first, None) is None
+    assert b"If-None-Match" not in first.headers
+    stored = Response(
+        url,
+        status=200,
+        headers={"ETag": ETAG, "Content-Type": "text/html", "Server": "nginx"},
+        body=PAGE,
+        request=first,
+    )
+    assert middleware.process_response(first, stored, None) is stored
+    assert crawler.stats.get_value("conditional_cache/stored") == 1
+
+    second = Request(url)
+    middleware.process_request(second, None)
+    assert second.headers[b"If-None-Match"] == ETAG.encode()
+    not_modified = Response(
+        url,
+        status=304,
+        headers={"Date": "Mon, 21 Aug 2023 10:00:00 GMT"},
+        request=second,
+    )
+    replayed = middleware.process_response(second, not_modified, None)
+    assert isinstance(replayed, HtmlResponse)
+    assert replayed.status == 200
+    assert replayed.body == PAGE
+    assert "cached" in replayed.flags
+    # Headers of the 304 are kept, with the cached ones merged over them.
+    assert replayed.headers[b"Date"] == b"Mon, 21 Aug 2023 10:00:00 GMT"
+    assert replayed.headers[b"Etag"] == ETAG.encode()
+    assert crawler.stats.get_value("conditional_cache/not_modified") == 1
+
+    # A 304 for a page that is not cached is passed on unchanged.
+    other = Request("https://nuforc.org/webreports/ndxe202201.html")
+    unknown = Response(other.url, status=304, request=other)
+    assert middleware.process_response(other, unknown, None) is unknown
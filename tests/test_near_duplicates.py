@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+from nuforc.near_duplicates import NearDuplicateIndex, minhash_signatures
+
+REPORT = (
+    "I saw a bright orange light moving slowly across the sky from west to east, then it vanished "
+    "without a sound over the trees near the highway."
+)
+OTHER_REPORT = (
+    "Three silent black triangles hovered over the lake for ten minutes before speeding away to the "
+    "north, leaving a faint humming noise."
+)
+
+
+def test_signatures_estimate_similarity():
+    signatures = minhash_signatures(
+        [REPORT, REPORT.replace("orange", "red"), OTHER_REPORT, ""]
+    )
+
+    assert (signatures[0] == signatures[1]).mean() > 0.6
+    assert (signatures[0] == signatures[2]).mean() < 0.1
+    assert (signatures[3] == 2**32 - 1).all()
+
+
+def test_new_events_are_checked_against_stored_signatures(tmp_path):
+    index = NearDuplicateIndex(tmp_path, threshold=0.7)
+    index.add_events(
+        pd.DataFrame(
+            {
+                "hash": ["1", "2"],
+                "url": ["a", "b"],
+                "description": [REPORT, OTHER_REPORT],
+            }
+        )
+    )
+
+    reopened = NearDuplicateIndex(tmp_path, threshold=0.7)
+    pairs = reopened.add_events(
+        pd.DataFrame(
+            {
+                "hash": ["1", "3", "4", "5"],
+                "url": ["a", "c", "d", "e"],
+                "description": [REPORT, REPORT.replace("orange", "red"), "", ""],
+            }
+        )
+    )
+    assert len(reopened) == 5
+    assert pairs[["url", "duplicate_url"]].values.tolist() == [["a", "c"]]
+
+    clusters = reopened.clusters()
+    assert clusters["url"].tolist() == ["a", "c"]
+    assert clusters["cluster_size"].tolist() == [2, 2]
+    assert reopened.clusters(threshold=0.99).empty
+
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(tmp_path, num_perm=64)
+
+
+def test_events_without_a_hash_are_told_apart_by_url(tmp_path):
+    events = pd.DataFrame(
+        {
+            "hash": [None, None, "1"],
+            "url": ["a", "b", "c"],
+            "description": [REPORT, OTHER_REPORT, REPORT.replace("orange", "red")],
+        }
+    )
+    index = NearDuplicateIndex(tmp_path, threshold=0.7)
+    pairs = index.add_events(events)
+    assert len(index) == 3
+    assert pairs[["url", "duplicate_url"]].values.tolist() == [["a", "c"]]
+
+    reopened = NearDuplicateIndex(tmp_path, threshold=0.7)
+    assert reopened.add_events(events).empty
+    assert len(reopened) == 3
@@ -0,0 +1,159 @@
+import json
+
+import pandas as pd
+from scrapy import signals
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+from twisted.python.failure import Failure
+
+from nuforc.hash_index import HashIndex
+from nuforc_scrapy.spiders.nuforc_spider import NuforcSpider
+
+BASE_URL = "https://nuforc.org/webreports/"
+EVENT_PAGE = (
+    "<html><body><table><tr><td>Occurred : 8/15/2022 21:00  (Entered as : 08/15/22 21:00) "
+    "Reported: 8/16/2022 5:21:26 AM 05:21 Posted: 8/20/2022 Location: Phoenix, AZ Shape: Light "
+    "Duration:5 minutes</td></tr><tr><td>A bright light.</td></tr></table></body></html>"
+)
+
+
+def make_response(url, body, request=None):
+    return HtmlResponse(url=url, body=body.encode(), encoding="utf-8", request=request)
+
+
+def test_incremental_crawl_records_month_counts_once_events_are_processed(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    (tmp_path / "crawl_state.json").write_text(
+        json.dumps(
+            {
+                "month_report_counts": {
+                    f"{BASE_URL}ndxe202201.html": 2,
+                    f"{BASE_URL}ndxe202202.html": 1,
+                }
+            }
+        )
+    )
+    index = HashIndex(tmp_path / "hash_index.sqlite")
+    index.add("stored", f"{BASE_URL}S0.html")
+    index.close()
+    crawler = get_crawler(
+        NuforcSpider, {"HASH_INDEX_PATH": str(tmp_path / "hash_index.sqlite")}
+    )
+    spider = NuforcSpider.from_crawler(crawler, mode="incremental")
+
+    index_page = "".join(
+        f'<tr><td><a href="ndxe2022{month}.html">{month}/2022</a></td><td>{count}</td></tr>'
+        for month, count in [("01", 2), ("02", 3), ("03", 1)]
+    )
+    month_requests = list(
+        spider.parse(
+            make_response(f"{BASE_URL}ndxevent.html", f"<table>{index_page}</table>")
+        )
+    )
+    # January is unchanged; February changed and March is new.
+    assert [request.url for request in month_requests] == [
+        f"{BASE_URL}ndxe202202.html",
+        f"{BASE_URL}ndxe202203.html",
+    ]
+    assert crawler.stats.get_value("incremental/skipped_months") == 1
+
+    february, march = month_requests
+    event_requests = list(
+        february.callback(
+            make_response(
+                february.url, '<a href="S0.html">0</a><a href="S1.html">1</a>'
+            ),
+            **february.cb_kwargs,
+        )
+    )
+    assert [request.url for request in event_requests] == [f"{BASE_URL}S1.html"]
+    assert spider.crawl_state.month_report_counts[february.url] == 1
+
+    (event_request,) = event_requests
+    response = make_response(event_request.url, EVENT_PAGE, request=event_request)
+    items = list(event_request.callback(response, **event_request.cb_kwargs))
+    assert items[0]["shape"] == "light"
+    # February only counts as crawled once the pipelines stored its event.
+    assert spider.crawl_state.month_report_counts[february.url] == 1
+    crawler.signals.send_catch_log(
+        signals.item_scraped, item=items[0], response=response, spider=spider
+    )
+    assert spider.crawl_state.month_report_counts[february.url] == 3
+
+    # March's only event page fails to download, so March is crawled again next time.
+    (failed_request,) = march.callback(
+        make_response(march.url, '<a href="S2.html">2</a>'), **march.cb_kwargs
+    )
+    failure = Failure(ConnectionError("Connection refused"))
+    failure.request = failed_request
+    failed_request.errback(failure)
+
+    spider.closed("finished")
+    saved = json.loads((tmp_path / "crawl_state.json").read_text())
+    assert saved["month_report_counts"] == {
+        f"{BASE_URL}ndxe202201.html": 2,
+        f"{BASE_URL}ndxe202202.html": 3,
+    }
+
+
+def test_month_with_an_unstored_event_is_crawled_again(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    crawler = get_crawler(
+        NuforcSpider, {"HASH_INDEX_PATH": str(tmp_path / "hash_index.sqlite")}
+    )
+    spider = NuforcSpider.from_crawler(crawler, mode="incremental")
+    (month_request,) = spider.parse(
+        make_response(
+            f"{BASE_URL}ndxevent.html",
+            '<table><tr><td><a href="ndxe202201.html">01/2022</a></td><td>2</td></tr></table>',
+        )
+    )
+    event_requests = list(
+        month_request.callback(
+            make_response(
+                month_request.url, '<a href="S1.html">1</a><a href="S2.html">2</a>'
+            ),
+            **month_request.cb_kwargs,
+        )
+    )
+    for event_request, signal in zip(
+        event_requests, [signals.item_dropped, signals.item_error]
+    ):
+        response = make_response(event_request.url, EVENT_PAGE, request=event_request)
+        (item,) = event_request.callback(response, **event_request.cb_kwargs)
+        kwargs = (
+            {"exception": Exception("Duplicate")}
+            if signal is signals.item_dropped
+            else {"failure": Failure(OSError("Disk full"))}
+        )
+        crawler.signals.send_catch_log(
+            signal, item=item, response=response, spider=spider, **kwargs
+        )
+
+    # A pipeline failed to store the second event, so the month's count is not recorded.
+    spider.closed("finished")
+    saved = json.loads((tmp_path / "crawl_state.json").read_text())
+    assert saved["month_report_counts"] == {}
+
+
+def test_hash_index_is_seeded_from_parquet_event_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    (tmp_path / "raw_events").mkdir()
+    pd.DataFrame(
+        {
+            "url": [f"{BASE_URL}S1.html", f"{BASE_URL}S2.html"],
+            "raw_text": ["one", "two"],
+            "hash": ["hash of one", "hash of two"],
+        }
+    ).to_parquet(tmp_path / "raw_events" / "events_2022_01_01.parquet")
+    crawler = get_crawler(
+        NuforcSpider, {"HASH_INDEX_PATH": str(tmp_path / "hash_index.sqlite")}
+    )
+    spider = NuforcSpider.from_crawler(crawler)
+
+    assert len(spider.hash_index) == 2
+    assert "hash of one" in spider.hash_index
+    assert spider.hash_index.contains_url(f"{BASE_URL}S2.html")
+    spider.hash_index.close()
@@ -0,0 +1,163 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from scrapy import Spider, signals
+from scrapy.exceptions import DropItem
+from scrapy.utils.test import get_crawler
+
+from nuforc.hash_index import HashIndex
+from nuforc.rollup import RollupCube
+from nuforc_scrapy.pipelines import (
+    CsvPipeline,
+    DeduplicationPipeline,
+    ParquetPipeline,
+    RollupPipeline,
+)
+
+
+class FailingSink:
+    """
+    Output pipeline that cannot store reports with "unstorable" raw text.
+    """
+
+    def __init__(self):
+        self.stored = []
+
+    def process_item(self, item, spider):
+        if item["raw_text"] == "unstorable":
+            raise OSError("Disk full")
+        self.stored.append(item["url"])
+        return item
+
+
+def run_pipelines(crawler, spider, pipelines, items):
+    # As Scrapy's scraper does: items pass the pipelines in order, signals report the outcome, and pipelines are
+    # closed in reverse order.
+    for pipeline in pipelines:
+        if hasattr(pipeline, "open_spider"):
+            pipeline.open_spider(spider)
+    for item in items:
+        try:
+            for pipeline in pipelines:
+                item = pipeline.process_item(item, spider)
+        except DropItem:
+            continue
+        except Exception as e:
+            crawler.signals.send_catch_log(
+                signals.item_error, item=item, response=None, spider=spider, failure=e
+            )
+            continue
+        crawler.signals.send_catch_log(
+            signals.item_scraped, item=item, response=None, spider=spider
+        )
+    for pipeline in reversed(pipelines):
+        if hasattr(pipeline, "close_spider"):
+            pipeline.close_spider(spider)
+
+
+def make_item(url, raw_text):
+    return {"url": url, "raw_text": raw_text, "hash": f"hash of {raw_text}"}
+
+
+@pytest.fixture
+def crawler(tmp_path):
+    return get_crawler(
+        Spider,
+        {
+            "HASH_INDEX_PATH": str(tmp_path / "hash_index.sqlite"),
+            "ROLLUP_CUBE_PATH": str(tmp_path / "rollup_cube.parquet"),
+        },
+    )
+
+
+def test_deduplication_records_only_stored_reports(tmp_path, crawler):
+    spider = Spider(name="test")
+    sink = FailingSink()
+    run_pipelines(
+        crawler,
+        spider,
+        [DeduplicationPipeline.from_crawler(crawler), sink],
+        [
+            make_item("u1", "one"),
+            make_item("u2", "unstorable"),
+            make_item("u3", "one"),
+            make_item("u4", "two"),
+        ],
+    )
+    assert sink.stored == ["u1", "u4"]
+    assert crawler.stats.get_value("deduplication/duplicate_events") == 1
+
+    index = HashIndex(tmp_path / "hash_index.sqlite")
+    assert "hash of one" in index
+    assert "hash of two" in index
+    # The report the sink failed on is not marked as stored, so the next crawl picks it up again.
+    assert "hash of unstorable" not in index
+    index.close()
+
+    sink = FailingSink()
+    run_pipelines(
+        crawler,
+        spider,
+        [DeduplicationPipeline.from_crawler(crawler), sink],
+        [make_item("u2", "retried"), make_item("u1", "one")],
+    )
+    assert sink.stored == ["u2"]
+
+
+def test_crawls_on_the_same_day_keep_their_outputs(tmp_path, monkeypatch, crawler):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    output_paths = []
+    for urls in [["u1", "u2"], ["u1", "u3"]]:
+        spider = Spider(name="test")
+        pipelines = [
+            DeduplicationPipeline.from_crawler(crawler),
+            CsvPipeline(),
+            ParquetPipeline(),
+        ]
+        run_pipelines(crawler, spider, pipelines, [make_item(url, url) for url in urls])
+        output_paths.append(spider.output_paths)
+
+    # The second crawl's report "u1" is dropped as already stored, so the first crawl's files must survive.
+    for paths, urls in zip(output_paths, [["u1", "u2"], ["u3"]]):
+        csv_paths = [path for path in paths if path.suffix == ".csv"]
+        (parquet_path,) = [path for path in paths if path.suffix == ".parquet"]
+        assert len(csv_paths) == 2
+        for csv_path in csv_paths:
+            assert pd.read_csv(csv_path)["url"].tolist() == urls
+        assert pd.read_parquet(parquet_path)["url"].tolist() == urls
+    assert len({path for paths in output_paths for path in paths}) == 6
+
+
+def test_rollup_marks_the_crawl_output_as_counted(tmp_path, monkeypatch, crawler):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    cube_path = tmp_path / "rollup_cube.parquet"
+    spider = Spider(name="test")
+    parquet_pipeline = ParquetPipeline(row_group_size=2)
+    rollup_pipeline = RollupPipeline.from_crawler(crawler)
+    items = [
+        {
+            **make_item(f"u{i}", f"report {i}"),
+            "occurred_time": datetime(2022, 1, i + 1),
+            "shape": "light",
+            "country": "USA",
+            "state": "Texas",
+        }
+        for i in range(3)
+    ]
+    run_pipelines(
+        crawler,
+        spider,
+        [parquet_pipeline, rollup_pipeline],
+        items,
+    )
+    crawler.signals.send_catch_log(
+        signals.spider_closed, spider=spider, reason="finished"
+    )
+
+    assert spider.output_paths == [parquet_pipeline.output_filepath]
+    cube = RollupCube(cube_path)
+    assert cube.n_events == 3
+    # Counting the crawl's output file again would count its events twice.
+    assert not cube.add_file(parquet_pipeline.output_filepath)
+    assert RollupCube(cube_path).n_events == 3
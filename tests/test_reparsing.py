@@ -0,0 +1,33 @@
+import pandas as pd
+
+from nuforc.reparsing import reparse_events
+
+RAW_EVENT = (
+    "https://nuforc.org/webreports/reports/171/S171234.html\n"
+    "NUFORC UFO Event Report\n"
+    "Occurred : 8/15/2022 21:00  (Entered as : 08/15/22 21:00) Reported: 8/16/2022 5:21:26 AM 05:21 "
+    "Posted: 8/20/2022 Location: Phoenix, AZ Shape: {shape} Duration:{minutes} minutes"
+)
+
+
+def test_reparsed_events_keep_input_order_and_urls(tmp_path):
+    input_path = tmp_path / "events.csv"
+    pd.DataFrame(
+        {
+            "url": [f"https://nuforc.org/webreports/S{i}.html" for i in range(25)],
+            "raw_text": [
+                RAW_EVENT.format(shape="Disk" if i % 2 else "Light", minutes=i + 1)
+                for i in range(25)
+            ],
+        }
+    ).to_csv(input_path, index=False)
+
+    output_path = reparse_events(input_path, chunksize=3, max_workers=2)
+
+    df = pd.read_csv(output_path)
+    assert df["url"].tolist() == [
+        f"https://nuforc.org/webreports/S{i}.html" for i in range(25)
+    ]
+    assert df["duration"].tolist() == [60.0 * (i + 1) for i in range(25)]
+    assert df["shape"].tolist() == ["disk" if i % 2 else "light" for i in range(25)]
+    assert not (tmp_path / "events_reparsed.csv.tmp").exists()
@@ -0,0 +1,48 @@
+import pandas as pd
+
+from nuforc.rollup import RollupCube
+
+EVENTS = pd.DataFrame(
+    {
+        "occurred_time": pd.to_datetime(
+            ["2000-01-03 21:00", "2000-01-03 22:30", "2000-03-15 12:00", None]
+        ),
+        "shape": ["light", "light", "disk", "light"],
+        "country": ["USA", "USA", "USA", "USA"],
+        "state": ["Texas", "Texas", "Ohio", "Texas"],
+        "state_abbreviation": ["TX", "TX", None, "TX"],
+    }
+)
+
+
+def test_cube_counts_events_incrementally(tmp_path):
+    path = tmp_path / "cube.parquet"
+    RollupCube(path).add_events(EVENTS)
+    cube = RollupCube(path)
+    cube.add_events(EVENTS.iloc[:1])
+
+    assert len(cube) == 2
+    assert cube.n_events == 4
+    monthly = cube.query(period="month")
+    assert monthly["count"].tolist() == [3, 0, 1]
+    assert str(monthly.index[1]) == "2000-02"
+
+    by_state = cube.query(period="year", by="state", shape="Light")
+    assert by_state.to_dict("records") == [{"TX": 3}]
+
+
+def test_events_without_a_dimension_are_counted(tmp_path):
+    cube = RollupCube(tmp_path / "cube.parquet")
+    cube.add_events(EVENTS.assign(country=None))
+
+    assert RollupCube(tmp_path / "cube.parquet").n_events == 3
+
+
+def test_same_file_is_counted_once(tmp_path):
+    events_path = tmp_path / "events.csv"
+    EVENTS.to_csv(events_path, index=False)
+    cube = RollupCube(tmp_path / "cube.parquet")
+
+    assert cube.add_file(events_path)
+    assert not RollupCube(tmp_path / "cube.parquet").add_file(events_path)
+    assert RollupCube(tmp_path / "cube.parquet").n_events == 3
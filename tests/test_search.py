@@ -0,0 +1,61 @@
+import pandas as pd
+
+from nuforc.search import SearchIndex
+
+EVENTS = pd.DataFrame(
+    {
+        "url": ["a", "b", "c", "d"],
+        "hash": ["1", "2", "3", "4"],
+        "shape": ["triangle", "light", "triangle", "disk"],
+        "state": ["Texas", "Ohio", "Texas", None],
+        "state_abbreviation": ["TX", "OH", "TX", None],
+        "country": ["USA", "USA", "USA", "Canada"],
+        "occurred_time": ["2020-01-01", "2021-01-01", "2022-05-01", None],
+        "description": [
+            "A silent black triangle hovered over the lake.",
+            "Bright light, silent, moving fast.",
+            "Triangles with three lights, humming noise.",
+            "A silver disk.",
+        ],
+    }
+)
+
+
+def urls(results):
+    return sorted(results["url"])
+
+
+def test_boolean_phrase_and_filtered_queries(tmp_path):
+    index = SearchIndex(tmp_path)
+    index.add_events(EVENTS.iloc[:2])
+    index.add_events(EVENTS.iloc[2:])
+
+    assert urls(index.search("triangle AND silent")) == ["a"]
+    assert urls(index.search("triangles")) == ["a", "c"]
+    assert urls(index.search('"black triangle" OR disk')) == ["a", "d"]
+    assert urls(index.search('"triangle black"')) == []
+    assert urls(index.search("silent NOT (light OR lights)")) == ["a"]
+    assert urls(index.search("triangle", state="tx", start="2022-01-01")) == ["c"]
+    assert urls(index.search("disk OR light", country="canada")) == ["d"]
+
+
+def test_index_is_persisted_and_skips_indexed_events(tmp_path):
+    index = SearchIndex(tmp_path)
+    assert index.add_events(EVENTS.iloc[:3]) == 3
+
+    reopened = SearchIndex(tmp_path)
+    assert len(reopened) == 3
+    assert reopened.add_events(EVENTS) == 1
+    results = reopened.search("silent")
+    # The shorter report mentioning `silent` ranks first.
+    assert results["url"].tolist() == ["b", "a"]
+    assert results["score"].is_monotonic_decreasing
+
+
+def test_events_without_a_hash_are_told_apart_by_url(tmp_path):
+    events = EVENTS.assign(hash=["1", None, "1", None])
+    index = SearchIndex(tmp_path)
+    assert index.add_events(events) == 3
+    assert urls(index.search("silent OR disk")) == ["a", "b", "d"]
+
+    assert SearchIndex(tmp_path).add_events(events) == 0
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+from scrapy import Spider
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.test import get_crawler
+
+from nuforc.telemetry import CrawlMetrics
+from nuforc_scrapy.extensions import CrawlTelemetry
+
+
+def test_metrics_are_exported_as_prometheus_text_and_json(tmp_path):
+    metrics = CrawlMetrics()
+    for seconds in [0.2, 0.3, 0.4, 3.0]:
+        metrics.observe("event_fetch", seconds)
+    metrics.observe("html_parse", 0.002)
+    metrics.record_status("event_fetch", 200)
+    metrics.record_status("event_fetch", 200)
+    metrics.record_status("event_fetch", 404)
+    metrics.record_retry("event_fetch", "ReadTimeout")
+    metrics.inc("events", 2)
+    metrics.finish()
+
+    metrics.write(tmp_path / "metrics.prom")
+    text = (tmp_path / "metrics.prom").read_text()
+    assert 'nuforc_crawl_stage_seconds_bucket{stage="event_fetch",le="0.25"} 1' in text
+    assert 'nuforc_crawl_stage_seconds_bucket{stage="event_fetch",le="+Inf"} 4' in text
+    assert (
+        'nuforc_crawl_http_responses_total{stage="event_fetch",status="200"} 2' in text
+    )
+
+    metrics.write(tmp_path / "metrics.json")
+    summary = json.loads((tmp_path / "metrics.json").read_text())
+    assert summary["busiest_stage"] == "event_fetch"
+    assert summary["events"] == 2
+    assert summary["stages"]["event_fetch"]["count"] == 4
+    assert 0.25 <= summary["stages"]["event_fetch"]["p50_seconds"] <= 0.5
+    assert summary["counters"]["retries{reason=ReadTimeout,stage=event_fetch}"] == 1
+    assert metrics.counter("http_responses", status=200) == 2
+
+
+def test_telemetry_is_disabled_without_an_output_path(monkeypatch, tmp_path):
+    monkeypatch.delenv("DATA_DIR", raising=False)
+    with pytest.raises(NotConfigured):
+        CrawlTelemetry.from_crawler(get_crawler(Spider))
+
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    extension = CrawlTelemetry.from_crawler(get_crawler(Spider))
+    assert extension.metrics_path.parent == tmp_path
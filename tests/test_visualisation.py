@@ -0,0 +1,41 @@
+import json
+
+import geopandas as gpd
+
+from nuforc.visualisation import export_dashboard_layers, make_overview_layer
+
+EVENTS = gpd.GeoDataFrame(
+    geometry=gpd.points_from_xy([-87.6, -87.7, -122.4, 2.35], [41.9, 41.8, 37.8, 48.9]),
+    crs=4326,
+)
+
+
+def test_overview_layer_counts_events_per_cell():
+    overview = make_overview_layer(EVENTS, cell_size=1.0)
+
+    counts = {
+        (point.x, point.y): count
+        for point, count in zip(overview.geometry, overview["count"])
+    }
+    assert counts == {(-87.5, 41.5): 2, (-122.5, 37.5): 1, (2.5, 48.5): 1}
+
+
+def test_dashboard_layers_only_hold_non_empty_tiles(tmp_path):
+    metadata = export_dashboard_layers(EVENTS, tmp_path, max_zoom=2)
+
+    tiles = sorted(
+        str(path.relative_to(tmp_path / "tiles"))
+        for path in (tmp_path / "tiles").rglob("*.png")
+    )
+    # Paris leaves the American tile at zoom 1, San Francisco and Chicago part at zoom 2.
+    assert tiles == [
+        "0/0/0.png",
+        "1/0/0.png",
+        "1/1/0.png",
+        "2/0/1.png",
+        "2/1/1.png",
+        "2/2/1.png",
+    ]
+    assert metadata["n_tiles"] == 6
+    assert json.loads((tmp_path / "metadata.json").read_text())["n_events"] == 4
+    assert len(gpd.read_file(tmp_path / "overview.geojson")) == 3
@@ -0,0 +1,171 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nuforc import wrangling
+from nuforc.durations import parse_duration_seconds, parse_durations
+from nuforc.timestamps import parse_timestamp, parse_timestamps
+from nuforc.wrangling import (
+    LocationResolver,
+    extract_city,
+    extract_country,
+    extract_state_abbreviation,
+    extract_time,
+    parse_event_text,
+    wrangle_frame,
+)
+
+RAW_EVENT = (
+    "https://nuforc.org/webreports/reports/171/S171234.html\n"
+    "NUFORC UFO Event Report\n"
+    "Occurred : 8/15/2022 21:00  (Entered as : 08/15/22 21:00) Reported: 8/16/2022 5:21:26 AM 05:21 "
+    "Posted: 8/20/2022 Location: Phoenix, AZ Shape: Light Duration:5 minutes"
+)
+
+
+def test_parse_event_text_matches_field_extractors():
+    record = parse_event_text(RAW_EVENT)
+    assert record["url"] == "https://nuforc.org/webreports/reports/171/S171234.html"
+    assert record["occurred_time"] == datetime(2022, 8, 15, 21, 0)
+    assert record["occurred_time"] == extract_time(RAW_EVENT, "occurred_time")
+    assert record["reported_time"] == extract_time(RAW_EVENT, "reported_time")
+    assert record["entered_as_time"] == extract_time(RAW_EVENT, "entered_as_time")
+    assert record["shape"] == "light"
+    assert record["duration"] == 300.0
+    assert record["city"] == extract_city(RAW_EVENT) == "Phoenix"
+    assert record["state"] == "Arizona"
+    assert record["state_abbreviation"] == extract_state_abbreviation(RAW_EVENT)
+    assert record["country"] == extract_country(RAW_EVENT) == "USA"
+
+
+@pytest.mark.parametrize(
+    "location, expected",
+    [
+        ("Toronto, ON", ("Toronto", "Ontario", "ON", "Canada")),
+        ("London (UK/England)", ("London", "unparsed", "unparsed", "England")),
+    ],
+)
+def test_parse_event_text_locations(location, expected):
+    record = parse_event_text(f"Location: {location} Shape: Disk Duration: 30 sec")
+    assert (
+        record["city"],
+        record["state"],
+        record["state_abbreviation"],
+        record["country"],
+    ) == expected
+
+
+def test_parse_event_text_without_headers():
+    record = parse_event_text("garbage text with nothing")
+    assert record["occurred_time"] is None
+    assert record["shape"] == "unparsed"
+    assert record["city"] is None
+
+
+def test_location_resolver_persists_between_runs(tmp_path):
+    cache_path = tmp_path / "locations.sqlite"
+    resolver = LocationResolver(cache_path=cache_path)
+    first = resolver.resolve("Phoenix,  AZ")
+    assert resolver.resolve("Phoenix, AZ") is first
+    assert resolver.stats()["hits"] == 1
+    assert resolver.stats()["misses"] == 1
+    resolver.close()
+
+    resolver = LocationResolver(cache_path=cache_path)
+    assert resolver.resolve("Phoenix, AZ") == first
+    assert resolver.stats()["disk_hits"] == 1
+    resolver.close()
+
+
+def test_location_resolver_ignores_locations_cached_by_another_parser_version(
+    tmp_path, monkeypatch
+):
+    cache_path = tmp_path / "locations.sqlite"
+    resolver = LocationResolver(cache_path=cache_path)
+    resolver.resolve("Phoenix, AZ")
+    resolver.close()
+
+    monkeypatch.setattr(wrangling, "_LOCATION_PARSER_VERSION", 2)
+    resolver = LocationResolver(cache_path=cache_path)
+    resolver.resolve("Phoenix, AZ")
+    assert resolver.stats()["disk_hits"] == 0
+    assert resolver.stats()["misses"] == 1
+    resolver.close()
+
+    resolver = LocationResolver(cache_path=cache_path)
+    resolver.resolve("Phoenix, AZ")
+    assert resolver.stats()["disk_hits"] == 1
+    resolver.close()
+
+
+def test_wrangle_frame_matches_parse_event_text():
+    raw_events = [
+        RAW_EVENT,
+        "Location: Toronto, ON Shape: Triangle Duration: 30 sec",
+        "garbage text with nothing",
+    ]
+    df = wrangle_frame(pd.DataFrame({"raw_text": raw_events}))
+    assert df["shape"].dtype == "category"
+    for raw_event, (_, row) in zip(raw_events, df.iterrows()):
+        for field, value in parse_event_text(raw_event).items():
+            if value is None or pd.isna(value):
+                assert pd.isna(row[field])
+            else:
+                assert row[field] == value
+    assert df.loc[0, "address"] == "Phoenix, Arizona, USA"
+
+
+def test_wrangle_frame_keeps_existing_urls():
+    df = wrangle_frame(
+        pd.DataFrame(
+            {
+                "url": ["https://nuforc.org/webreports/S1.html", None],
+                "raw_text": [RAW_EVENT, RAW_EVENT],
+            }
+        )
+    )
+    assert df["url"].tolist() == [
+        "https://nuforc.org/webreports/S1.html",
+        "https://nuforc.org/webreports/reports/171/S171234.html",
+    ]
+
+
+@pytest.mark.parametrize(
+    "duration, seconds",
+    [
+        ("5 minutes", 300.0),
+        ("1-2 hrs", 7200.0),
+        ("30 sec", 30.0),
+        ("half an hour", 1800.0),
+        ("10 mintues", 600.0),
+    ],
+)
+def test_parse_duration_seconds(duration, seconds):
+    assert parse_duration_seconds(duration) == seconds
+    assert parse_durations(pd.Series([duration])).iloc[0] == seconds
+
+
+def test_parse_duration_seconds_unparseable():
+    assert np.isnan(parse_duration_seconds("unknown"))
+    assert parse_durations(pd.Series(["unknown", None])).isna().all()
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("8/15/22 21:00", datetime(2022, 8, 15, 21, 0)),
+        ("1/2/2019 03:15:30", datetime(2019, 1, 2, 3, 15, 30)),
+        ("6/1/95", datetime(1995, 6, 1)),
+        ("2/30/22 1:00", None),
+        ("no date", None),
+    ],
+)
+def test_parse_timestamp(text, expected):
+    assert parse_timestamp(text) == expected
+    parsed = parse_timestamps([text])[0]
+    if expected is None:
+        assert np.isnat(parsed)
+    else:
+        assert parsed == np.datetime64(expected, "s")